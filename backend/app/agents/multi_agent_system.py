@@ -1,30 +1,183 @@
 """基于 LangChain 的多智能体旅行规划系统"""
 
 import json
+import math
 import asyncio
-from typing import TypedDict, List, Optional, Dict, Any, AsyncIterator
+from typing import TypedDict, List, Optional, Dict, Any, AsyncIterator, Callable, Tuple
 from datetime import datetime, timedelta
+import numpy as np
 from langchain_core.messages import HumanMessage, SystemMessage
+from ..config import get_settings
 from ..services.llm_service import get_llm
 from ..services.amap_service import get_amap_service
-from ..tools import AmapPOISearchTool, AmapWeatherTool, AmapRouteTool
+from ..services.distance_matrix import DistanceMatrix, distance_type_for, get_distance_matrix_service
+from ..services.route_geometry import attach_day_routes
+from ..services.json_stream import JSONArrayStreamParser
+from ..services.day_partition import nearest_indices, partition_by_day
+from ..services.itinerary_optimizer import optimize_itinerary
+from ..services.weather_assignment import apply_weather_assignment
+from ..services.hotel_ranking import choose_hotels, hotel_quality_cost, parse_numbers, update_hotel_budget
+from ..services.attraction_scoring import aload_popularity, popularity_counts, score_attractions, select_spread
+from ..services.day_scheduler import matrix_estimator, schedule_plan, straight_line_estimator
+from ..tools import AmapPOISearchTool, AmapWeatherTool, AmapRouteTool, AmapAPIError
+from ..tools.amap_tools import POI_PAGE_SIZE
 from ..models.schemas import (
     TripRequest, TripPlan, DayPlan, Attraction, Meal, WeatherInfo, 
-    Location, Hotel, Budget, POIInfo
+    Location, Hotel, Budget
 )
+from ..models.poi_record import POICollection, POIRecord, resolve_poi_ids
+
+# 候选数量: 每天景点数 + 冗余，酒店至少10个
+# 景点先搜索 ATTRACTION_POOL_FACTOR 倍(至少15个)的候选池，打分后只保留需要的数量
+ATTRACTIONS_PER_DAY = 3
+ATTRACTION_SLACK = 5
+ATTRACTION_POOL_FACTOR = 2
+MIN_ATTRACTION_POOL = 15
+MIN_HOTEL_CANDIDATES = 10
+
+
+def attraction_candidate_count(travel_days: int) -> int:
+    """根据旅行天数计算需要的候选景点数量"""
+    return travel_days * ATTRACTIONS_PER_DAY + ATTRACTION_SLACK
+
+
+def attraction_pool_count(travel_days: int) -> int:
+    """根据旅行天数计算需要搜索的景点候选池大小"""
+    return max(MIN_ATTRACTION_POOL, ATTRACTION_POOL_FACTOR * attraction_candidate_count(travel_days))
+
+
+def hotel_candidate_count(travel_days: int) -> int:
+    """根据旅行天数计算需要的候选酒店数量"""
+    return max(MIN_HOTEL_CANDIDATES, travel_days)
+
+
+# 多标签合并排序: 在某个标签结果中排第 r 位的POI得分 1 / (1 + r * TAG_RANK_DECAY)，
+# 同一POI命中多个标签时得分累加
+DEFAULT_ATTRACTION_KEYWORD = "景点"
+TAG_RANK_DECAY = 0.1
+
+# 规划提示词中的天气调整要求(整体规划和逐天规划共用)
+WEATHER_PLANNING_RULES = """1. **根据天气调整行程安排**:
+   - 如果某天是雨天、雪天或恶劣天气，必须优先安排室内景点（博物馆、美术馆、购物中心、室内娱乐场所等），避免安排户外景点
+   - 如果某天是雨天或雪天，必须调整交通方式，避免步行，建议使用公共交通或打车
+   - 如果某天是高温天气（≥30°C），避免在正午时段（11:00-15:00）安排户外活动
+   - 如果某天是低温天气（≤5°C），减少户外活动时间，多安排室内景点
+   - 如果某天是大风天气，避免安排高空或危险区域的户外活动
+   - 在每天的行程描述中，必须说明为什么这样安排（考虑天气因素）
+"""
+
+# 进度回调，接收与SSE相同结构的事件字典
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# 规划模式
+PLANNER_MODE_SINGLE = "single"
+PLANNER_MODE_PARALLEL = "parallel"
+PLANNER_MODE_AUTO = "auto"
+PLANNER_MODE_OPTIMIZER = "optimizer"
+PLANNER_MODES = (PLANNER_MODE_SINGLE, PLANNER_MODE_PARALLEL, PLANNER_MODE_OPTIMIZER)
+
+# 未知游览时长时的默认值(分钟)
+DEFAULT_VISIT_DURATION = 120
+
+# 逐天规划时每次调用提供给LLM的酒店数量
+HOTELS_PER_CHUNK = 5
+
+# 酒店排序时在每天景点中心周边补充的酒店数量及其高德类型
+HOTELS_NEAR_DAY = 5
+HOTEL_POI_TYPE = "住宿服务"
+
+# 预算估算: 每日交通费用(元)
+DAILY_TRANSPORTATION_COST = 50
+
+
+def resolve_planner_mode(travel_days: int) -> str:
+    """根据配置和天数确定规划模式(single/parallel/optimizer)"""
+    settings = get_settings()
+    mode = (settings.planner_mode or PLANNER_MODE_AUTO).lower()
+    
+    if mode == PLANNER_MODE_AUTO:
+        return PLANNER_MODE_PARALLEL if travel_days >= settings.planner_parallel_min_days else PLANNER_MODE_SINGLE
+    if mode not in PLANNER_MODES:
+        print(f"⚠️ 未知的规划模式 {mode}，使用 {PLANNER_MODE_SINGLE}")
+        return PLANNER_MODE_SINGLE
+    return mode
+
+
+def estimate_budget(days: List[DayPlan]) -> Budget:
+    """根据每日行程中的门票、酒店和餐饮费用汇总预算"""
+    total_attractions = sum(a.ticket_price for day in days for a in day.attractions)
+    total_hotels = sum(day.hotel.estimated_cost for day in days if day.hotel)
+    total_meals = sum(m.estimated_cost for day in days for m in day.meals)
+    total_transportation = DAILY_TRANSPORTATION_COST * len(days)
+    return Budget(
+        total_attractions=total_attractions,
+        total_hotels=total_hotels,
+        total_meals=total_meals,
+        total_transportation=total_transportation,
+        total=total_attractions + total_hotels + total_meals + total_transportation
+    )
+
+
+def plan_tag_searches(
+    preferences: List[str],
+    needed: int,
+    max_tags: int,
+    max_calls: int
+) -> Tuple[List[str], int]:
+    """
+    确定按哪些偏好标签搜索以及每个标签获取的POI数量
+
+    Args:
+        preferences: 用户偏好标签
+        needed: 需要的候选景点数量
+        max_tags: 最多搜索的标签数
+        max_calls: 所有标签合计最多请求的POI页数
+
+    Returns:
+        (搜索关键词列表, 每个关键词获取的POI数量)
+    """
+    tags = list(dict.fromkeys(p.strip() for p in preferences if p and p.strip()))
+    tags = tags[:max(1, min(max_tags, max_calls))] or [DEFAULT_ATTRACTION_KEYWORD]
+    
+    pages_per_tag = max(1, min(math.ceil(needed / POI_PAGE_SIZE), max_calls // len(tags)))
+    return tags, pages_per_tag * POI_PAGE_SIZE
+
+
+def merge_tag_results(results: List[List[POIRecord]]) -> List[POIRecord]:
+    """
+    按POI ID合并多个标签的搜索结果，按相关度得分降序排列(同分保持首次出现顺序)
+
+    Args:
+        results: 每个标签的搜索结果(按高德相关度排序)
+
+    Returns:
+        合并后的POI列表
+    """
+    scores: Dict[str, float] = {}
+    records: Dict[str, POIRecord] = {}
+    for pois in results:
+        for rank, poi in enumerate(pois):
+            key = poi.id or poi.name
+            scores[key] = scores.get(key, 0.0) + 1.0 / (1.0 + rank * TAG_RANK_DECAY)
+            records.setdefault(key, poi)
+    
+    return [records[key] for key in sorted(records, key=lambda key: -scores[key])]
 
 
 class TripPlanningState(TypedDict):
     """旅行规划状态"""
     request: TripRequest
-    attractions: List[POIInfo]
+    attractions: POICollection  # 候选景点(内部记录，坐标另存为数组)
     weather: List[WeatherInfo]
-    hotels: List[Dict[str, Any]]
+    hotels: POICollection
     plan: Optional[TripPlan]
     errors: List[str]
     progress: Dict[str, Any]  # 进度信息
     messages: List[Any]  # 消息历史
     memory_context: Optional[str]  # 用户记忆上下文
+    popularity: Dict[str, int]  # 景点在该城市历史行程中出现的次数(POI ID/名称)
+    distance_matrix: Optional[DistanceMatrix]  # 候选景点和酒店之间的路程/耗时矩阵
+    published_days: Dict[int, Dict[str, Any]]  # 已通过 day 事件发送给客户端的单日行程(按天下标)
 
 
 class MultiAgentTripPlanner:
@@ -44,77 +197,75 @@ class MultiAgentTripPlanner:
         
         print("✅ 多智能体系统初始化成功")
     
-    async def _search_attractions_node(self, state: TripPlanningState) -> TripPlanningState:
-        """景点搜索节点"""
+    async def _search_attractions_node(
+        self,
+        state: TripPlanningState,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> TripPlanningState:
+        """景点搜索节点：每个偏好标签并发搜索一次，合并排序"""
         print("📍 景点搜索智能体：开始搜索景点...")
         
         try:
             state["progress"]["attractions"]["status"] = "running"
-            state["progress"]["attractions"]["progress"] = 50
+            state["progress"]["attractions"]["progress"] = 10
             
             request = state["request"]
+            settings = get_settings()
             
-            # 构建搜索关键词
-            keywords = "景点"
-            if request.preferences:
-                # 使用第一个偏好作为关键词
-                keywords = request.preferences[0]
-            
-            # 调用工具搜索景点
-            result_str = await self.poi_tool._arun(
-                keywords=keywords,
-                city=request.city,
-                citylimit=True
+            # 按偏好标签拆分搜索，总请求页数受限
+            tags, per_tag_limit = plan_tag_searches(
+                request.preferences,
+                attraction_pool_count(request.travel_days),
+                settings.attraction_search_max_tags,
+                settings.attraction_search_max_calls
             )
+            print(f"🔍 景点搜索关键词: {', '.join(tags)}（每个最多 {per_tag_limit} 个）")
             
-            result = json.loads(result_str)
+            finished = 0
+            failed = 0
             
-            if result.get("error"):
-                state["errors"].append(f"景点搜索失败: {result['error']}")
-                state["progress"]["attractions"]["status"] = "failed"
-                return state
+            async def search_tag(tag: str) -> List[POIRecord]:
+                nonlocal finished, failed
+                try:
+                    result = await self.poi_tool.asearch_pages(
+                        keywords=tag,
+                        city=request.city,
+                        limit=per_tag_limit,
+                        citylimit=True
+                    )
+                    pois, status, message = result.pois, "completed", f"“{tag}”相关景点搜索完成，找到 {len(result.pois)} 个"
+                except Exception as e:
+                    print(f"⚠️ “{tag}”景点搜索失败: {str(e)}")
+                    failed += 1
+                    pois, status, message = [], "failed", f"“{tag}”相关景点搜索失败: {str(e)}"
+                
+                finished += 1
+                progress = 10 + 80 * finished // len(tags)
+                state["progress"]["attractions"]["progress"] = progress
+                if on_progress is not None:
+                    on_progress({
+                        "type": "progress",
+                        "agent": "attractions",
+                        "status": "running",
+                        "progress": progress,
+                        "keyword": tag,
+                        "keyword_status": status,
+                        "message": message
+                    })
+                return pois
             
-            # 解析POI数据
-            pois_data = result.get("pois", [])
-            attractions = []
+            results = await asyncio.gather(*[search_tag(tag) for tag in tags])
+            if failed == len(tags):
+                raise ValueError("所有偏好标签的搜索均失败")
             
-            for poi_data in pois_data[:15]:  # 限制数量
-                location = Location(
-                    longitude=poi_data.get("location", {}).get("longitude", 0.0),
-                    latitude=poi_data.get("location", {}).get("latitude", 0.0)
-                )
-                
-                # 处理 tel 字段：可能是字符串、列表或 None
-                tel_value = poi_data.get("tel", "")
-                if isinstance(tel_value, list):
-                    # 如果是列表，取第一个元素或转为字符串
-                    tel_value = tel_value[0] if tel_value else None
-                elif not tel_value or tel_value == "":
-                    tel_value = None
-                
-                # 处理 address 字段：可能是字符串、列表或 None
-                address_value = poi_data.get("address", "")
-                if isinstance(address_value, list):
-                    # 如果是列表，取第一个元素或转为字符串
-                    address_value = address_value[0] if address_value else ""
-                elif not address_value:
-                    address_value = ""
-                
-                poi_info = POIInfo(
-                    id=poi_data.get("id", ""),
-                    name=poi_data.get("name", ""),
-                    address=address_value,
-                    location=location,
-                    type=poi_data.get("type", ""),
-                    tel=tel_value
-                )
-                attractions.append(poi_info)
+            pool = POICollection(merge_tag_results(results))
+            attractions = self._select_attractions(request, pool, state.get("popularity"))
             
             state["attractions"] = attractions
             state["progress"]["attractions"]["status"] = "completed"
             state["progress"]["attractions"]["progress"] = 100
             
-            print(f"✅ 景点搜索完成，找到 {len(attractions)} 个景点")
+            print(f"✅ 景点搜索完成，找到 {len(pool)} 个景点，保留得分最高的 {len(attractions)} 个")
             
         except Exception as e:
             error_msg = f"景点搜索失败: {str(e)}"
@@ -136,21 +287,16 @@ class MultiAgentTripPlanner:
             print(f"🔍 查询城市: {request.city}")
             
             # 调用工具查询天气
-            result_str = await self.weather_tool._arun(city=request.city)
-            print(f"🔍 天气API原始响应: {result_str[:500]}...")  # 只打印前500字符
-            result = json.loads(result_str)
-            
-            if result.get("error"):
-                print(f"❌ 天气API返回错误: {result['error']}")
-                state["errors"].append(f"天气查询失败: {result['error']}")
+            try:
+                forecasts = await self.weather_tool.aget_forecasts(request.city)
+            except AmapAPIError as e:
+                print(f"❌ 天气API返回错误: {str(e)}")
+                state["errors"].append(f"天气查询失败: {str(e)}")
                 state["progress"]["weather"]["status"] = "failed"
                 return state
             
-            # 解析天气数据
-            forecasts = result.get("forecasts", [])
             print(f"🔍 解析到的forecasts数量: {len(forecasts)}")
-            if forecasts:
-                print(f"🔍 第一个forecast示例: {forecasts[0]}")
+            forecasts_by_date = {forecast.date: forecast for forecast in forecasts}
             weather_list = []
             
             # 计算日期范围
@@ -160,54 +306,25 @@ class MultiAgentTripPlanner:
             for i in range(request.travel_days):
                 current_date = start_date + timedelta(days=i)
                 date_str = current_date.strftime("%Y-%m-%d")
-                print(f"🔍 查找日期 {date_str} 的天气数据...")
                 
                 # 查找匹配的天气数据
-                weather_data = None
-                for forecast in forecasts:
-                    forecast_date = forecast.get("date", "")
-                    print(f"  - 对比: API日期={forecast_date}, 需要日期={date_str}")
-                    if forecast_date == date_str:
-                        weather_data = forecast
-                        print(f"  ✅ 找到匹配的天气数据")
-                        break
+                forecast = forecasts_by_date.get(date_str)
+                if forecast is None:
+                    print(f"⚠️ 未找到日期 {date_str} 的天气数据")
+                    continue
                 
-                if weather_data:
-                    # 生成穿着建议和活动建议
-                    day_weather = weather_data.get("dayweather", "")
-                    day_temp = weather_data.get("daytemp", 0)
-                    night_temp = weather_data.get("nighttemp", 0)
-                    
-                    # 解析温度（可能是字符串）
-                    try:
-                        if isinstance(day_temp, str):
-                            day_temp = int(day_temp.replace("°C", "").replace("℃", "").strip())
-                        if isinstance(night_temp, str):
-                            night_temp = int(night_temp.replace("°C", "").replace("℃", "").strip())
-                    except:
-                        day_temp = 20
-                        night_temp = 15
-                    
-                    avg_temp = (day_temp + night_temp) / 2
-                    
-                    # 生成穿着建议
-                    clothing_suggestion = self._generate_clothing_suggestion(day_weather, avg_temp, day_temp, night_temp)
-                    
-                    # 生成活动建议
-                    activity_suggestion = self._generate_activity_suggestion(day_weather, avg_temp)
-                    
-                    weather_info = WeatherInfo(
-                        date=date_str,
-                        day_weather=day_weather,
-                        night_weather=weather_data.get("nightweather", ""),
-                        day_temp=day_temp,
-                        night_temp=night_temp,
-                        wind_direction=weather_data.get("daywind", ""),
-                        wind_power=weather_data.get("daypower", ""),
-                        clothing_suggestion=clothing_suggestion,
-                        activity_suggestion=activity_suggestion
-                    )
-                    weather_list.append(weather_info)
+                # 温度已由 WeatherInfo 解析为整数
+                day_temp = forecast.day_temp if isinstance(forecast.day_temp, int) else 20
+                night_temp = forecast.night_temp if isinstance(forecast.night_temp, int) else 15
+                avg_temp = (day_temp + night_temp) / 2
+                
+                # 生成穿着建议和活动建议
+                weather_list.append(forecast.model_copy(update={
+                    "clothing_suggestion": self._generate_clothing_suggestion(
+                        forecast.day_weather, avg_temp, day_temp, night_temp
+                    ),
+                    "activity_suggestion": self._generate_activity_suggestion(forecast.day_weather, avg_temp),
+                }))
             
             state["weather"] = weather_list
             state["progress"]["weather"]["status"] = "completed"
@@ -320,6 +437,38 @@ class MultiAgentTripPlanner:
         
         return "；".join(suggestions) if suggestions else "根据天气情况合理安排活动"
     
+    def _select_attractions(
+        self,
+        request: TripRequest,
+        pool: POICollection,
+        popularity: Optional[Dict[str, int]] = None
+    ) -> POICollection:
+        """
+        从候选池中选出行程需要数量的景点
+
+        综合偏好标签匹配、评分、在历史行程中的热度和搜索相关度打分，
+        再按得分贪心选取，与已选景点过近的扣分以保证地理分散。
+
+        Args:
+            request: 旅行请求
+            pool: 按搜索相关度排序的候选池
+            popularity: POI ID/名称 → 历史行程中出现的次数
+
+        Returns:
+            选中的景点(按得分由高到低)
+        """
+        records = pool.records
+        ids = [poi.id for poi in records]
+        names = [poi.name for poi in records]
+        scores = score_attractions(
+            [poi.type for poi in records],
+            names,
+            parse_numbers([poi.rating for poi in records]),
+            popularity_counts(ids, names, popularity),
+            request.preferences
+        )
+        return pool.take(select_spread(pool.lons, pool.lats, scores, attraction_candidate_count(request.travel_days)))
+    
     async def _search_hotels_node(self, state: TripPlanningState) -> TripPlanningState:
         """酒店搜索节点"""
         print("🏨 酒店推荐智能体：开始搜索酒店...")
@@ -333,40 +482,14 @@ class MultiAgentTripPlanner:
             # 构建搜索关键词
             keywords = request.accommodation or "酒店"
             
-            # 调用工具搜索酒店
-            result_str = await self.poi_tool._arun(
+            # 按行程天数并发获取多页酒店
+            result = await self.poi_tool.asearch_pages(
                 keywords=keywords,
                 city=request.city,
+                limit=hotel_candidate_count(request.travel_days),
                 citylimit=True
             )
-            
-            result = json.loads(result_str)
-            
-            if result.get("error"):
-                state["errors"].append(f"酒店搜索失败: {result['error']}")
-                state["progress"]["hotels"]["status"] = "failed"
-                return state
-            
-            # 解析酒店数据
-            pois_data = result.get("pois", [])
-            hotels = []
-            
-            for poi_data in pois_data[:10]:  # 限制数量
-                location = Location(
-                    longitude=poi_data.get("location", {}).get("longitude", 0.0),
-                    latitude=poi_data.get("location", {}).get("latitude", 0.0)
-                )
-                
-                hotel_info = {
-                    "name": poi_data.get("name", ""),
-                    "address": poi_data.get("address", ""),
-                    "location": location,
-                    "type": poi_data.get("type", ""),
-                    "tel": poi_data.get("tel", ""),
-                    "rating": poi_data.get("rating", ""),
-                    "cost": poi_data.get("cost", "")
-                }
-                hotels.append(hotel_info)
+            hotels = POICollection(result.pois)
             
             state["hotels"] = hotels
             state["progress"]["hotels"]["status"] = "completed"
@@ -382,8 +505,12 @@ class MultiAgentTripPlanner:
         
         return state
     
-    async def _plan_trip_node(self, state: TripPlanningState) -> TripPlanningState:
-        """行程规划节点：整合所有信息生成计划"""
+    async def _plan_trip_node(
+        self,
+        state: TripPlanningState,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> TripPlanningState:
+        """行程规划节点：整合所有信息生成计划(提供 on_progress 时流式输出，每完成一天发布 day 事件)"""
         print("📋 行程规划智能体：开始生成行程计划...")
         
         try:
@@ -396,27 +523,66 @@ class MultiAgentTripPlanner:
             # 注意：在 LangGraph 中，节点会自动等待前置节点完成
             # 但我们需要确保数据已准备好
             
-            # 构建规划提示词
-            memory_context = state.get("memory_context") or ""
-            planner_prompt = self._build_planner_prompt(
-                request, 
-                state["attractions"], 
-                state["weather"], 
-                state["hotels"],
-                memory_context
+            # 计算候选景点和酒店之间的实际路程/耗时
+            state["distance_matrix"] = await self._build_distance_matrix(
+                request, state["attractions"], state["hotels"]
             )
             
-            # 调用 LLM 生成计划
-            messages = [
-                SystemMessage(content="你是一个专业的旅行规划助手。请根据提供的信息生成详细的旅行计划，返回JSON格式。"),
-                HumanMessage(content=planner_prompt)
-            ]
+            # 长行程按天并行规划，optimizer 模式不调用LLM，否则一次生成全部天数
+            mode = resolve_planner_mode(request.travel_days)
+            print(f"🧭 规划模式: {mode}")
+            if mode == PLANNER_MODE_OPTIMIZER:
+                trip_plan = self._plan_with_optimizer(state, on_progress)
+            elif mode == PLANNER_MODE_PARALLEL:
+                trip_plan = await self._plan_days_parallel(state, on_progress)
+            else:
+                trip_plan = await self._plan_single(state, on_progress)
             
-            response = await self.llm.ainvoke(messages)
-            plan_text = response.content
+            # LLM输出的景点没有POI ID，按名称对应回搜索到的景点，距离矩阵和高德类型才能按ID查到
+            resolved = resolve_poi_ids(trip_plan, state["attractions"].records)
+            if resolved:
+                print(f"🔗 按名称匹配到 {resolved} 个景点的POI ID")
             
-            # 解析响应
-            trip_plan = self._parse_plan_response(plan_text, request)
+            # 恶劣天气的日子换成室内景点
+            if get_settings().weather_assignment_enabled:
+                try:
+                    moved = apply_weather_assignment(
+                        trip_plan, {poi.id: poi.type for poi in state["attractions"]}
+                    )
+                    print(f"🌧️ 天气分配完成，调整 {moved} 个景点")
+                except Exception as e:
+                    print(f"⚠️ 天气分配失败: {str(e)}")
+            
+            # 按离每天景点的距离、评分和价格选择酒店
+            if get_settings().hotel_ranking_enabled:
+                try:
+                    await self._rank_hotels(state, trip_plan)
+                except Exception as e:
+                    print(f"⚠️ 酒店排序失败: {str(e)}")
+            
+            # 为景点和三餐安排起止时间，放不下的景点顺延或放弃
+            if get_settings().schedule_enabled:
+                try:
+                    travel = matrix_estimator(
+                        state["distance_matrix"], straight_line_estimator(request.transportation),
+                        state["attractions"].records + state["hotels"].records
+                    )
+                    dropped = schedule_plan(trip_plan, request.transportation, travel)
+                    print(f"⏰ 日程时间安排完成，未能安排 {dropped} 个景点")
+                except Exception as e:
+                    print(f"⚠️ 日程时间安排失败: {str(e)}")
+            
+            # 发布客户端还没收到或与已发布内容不同的天(未流式输出时在这里首次发布)
+            if on_progress is not None:
+                for day in trip_plan.days:
+                    self._publish_day(state, on_progress, day, state["progress"]["planning"]["progress"])
+            
+            # 获取每天的实际路线(所有天并发)
+            try:
+                routed = await attach_day_routes(trip_plan)
+                print(f"🗺️ 每日路线获取完成: {routed}/{len(trip_plan.days)} 天")
+            except Exception as e:
+                print(f"⚠️ 每日路线获取失败: {str(e)}")
             
             state["plan"] = trip_plan
             state["progress"]["planning"]["status"] = "completed"
@@ -436,18 +602,577 @@ class MultiAgentTripPlanner:
         
         return state
     
+    async def _plan_single(
+        self,
+        state: TripPlanningState,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> TripPlan:
+        """一次LLM调用生成全部天数的计划"""
+        request = state["request"]
+        
+        # 构建规划提示词
+        memory_context = state.get("memory_context") or ""
+        planner_prompt = self._build_planner_prompt(
+            request, 
+            state["attractions"], 
+            state["weather"], 
+            state["hotels"],
+            memory_context,
+            state["distance_matrix"]
+        )
+        
+        # 调用 LLM 生成计划
+        messages = [
+            SystemMessage(content="你是一个专业的旅行规划助手。请根据提供的信息生成详细的旅行计划，返回JSON格式。"),
+            HumanMessage(content=planner_prompt)
+        ]
+        
+        plan_text = await self._invoke_planner(messages, state, on_progress)
+        
+        # 解析响应(完整校验)
+        return self._parse_plan_response(plan_text, request)
+    
+    async def _plan_days_parallel(
+        self,
+        state: TripPlanningState,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> TripPlan:
+        """
+        逐天并行规划
+
+        先按地理方位把候选景点分到每一天，再按天(每次 planner_chunk_days 天)并发调用LLM，
+        并发数受 planner_concurrency 限制，最后合并为一个 TripPlan。某次调用失败时对应天数使用备用行程。
+
+        Args:
+            state: 规划状态
+            on_progress: 事件回调，每完成一次调用发布对应天数的 day 事件
+
+        Returns:
+            合并后的旅行计划
+        """
+        request = state["request"]
+        settings = get_settings()
+        travel_days = request.travel_days
+        
+        start_date = datetime.strptime(request.start_date, "%Y-%m-%d")
+        dates = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(travel_days)]
+        
+        # 按方位把候选景点分到每一天
+        candidates = state["attractions"][:attraction_candidate_count(travel_days)].located()
+        groups = [candidates.take(idx) for idx in partition_by_day(candidates.lons, candidates.lats, travel_days)]
+        hotels = state["hotels"][:hotel_candidate_count(travel_days)].located()
+        
+        chunk_size = max(1, settings.planner_chunk_days)
+        chunks = [list(range(i, min(i + chunk_size, travel_days))) for i in range(0, travel_days, chunk_size)]
+        semaphore = asyncio.Semaphore(max(1, settings.planner_concurrency))
+        memory_context = state.get("memory_context") or ""
+        finished = 0
+        
+        async def plan_chunk(day_indices: List[int]) -> List[DayPlan]:
+            nonlocal finished
+            async with semaphore:
+                try:
+                    prompt = self._build_day_chunk_prompt(
+                        request, day_indices, dates, groups, state["weather"], hotels,
+                        memory_context, state["distance_matrix"]
+                    )
+                    response = await self.llm.ainvoke([
+                        SystemMessage(content="你是一个专业的旅行规划助手。请根据提供的信息生成指定日期的详细行程，返回JSON格式。"),
+                        HumanMessage(content=prompt)
+                    ])
+                    day_plans = self._parse_day_chunk(response.content, request, day_indices, dates, groups)
+                except Exception as e:
+                    print(f"⚠️ 第{day_indices[0] + 1}-{day_indices[-1] + 1}天规划失败，使用备用行程: {str(e)}")
+                    day_plans = [self._fallback_day(request, i, dates[i], groups[i]) for i in day_indices]
+            
+            finished += len(day_indices)
+            progress = min(95, 50 + 45 * finished // travel_days)
+            state["progress"]["planning"]["progress"] = progress
+            if on_progress is not None:
+                for day_plan in day_plans:
+                    self._publish_day(state, on_progress, day_plan, progress)
+            return day_plans
+        
+        results = await asyncio.gather(*[plan_chunk(chunk) for chunk in chunks])
+        days = [day_plan for day_plans in results for day_plan in day_plans]
+        print(f"📝 逐天并行规划完成: {len(days)} 天，{len(chunks)} 次LLM调用")
+        
+        bad_weather = [w.date for w in state["weather"] if any(k in w.day_weather for k in ("雨", "雪"))]
+        suggestions = f"这是为您规划的{request.city}{travel_days}日游行程，每天的景点已按地理位置分组，建议提前查看各景点的开放时间。"
+        if bad_weather:
+            suggestions += f"{'、'.join(bad_weather)} 有雨雪天气，当天已优先安排室内景点，请携带雨具。"
+        
+        return TripPlan(
+            city=request.city,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            days=days,
+            weather_info=state["weather"],
+            overall_suggestions=suggestions,
+            budget=estimate_budget(days)
+        )
+    
+    def _build_day_chunk_prompt(
+        self,
+        request: TripRequest,
+        day_indices: List[int],
+        dates: List[str],
+        groups: List[POICollection],
+        weather: List[WeatherInfo],
+        hotels: POICollection,
+        memory_context: str = "",
+        distance_matrix: Optional[DistanceMatrix] = None
+    ) -> str:
+        """构建逐天规划提示词(只包含这几天分到的景点、天气和附近酒店)"""
+        weather_by_date = {w.date: w for w in weather}
+        chunk_attractions = POICollection([poi for i in day_indices for poi in groups[i]])
+        
+        day_sections = []
+        for i in day_indices:
+            attractions_text = "\n".join(f"  - {a.name} ({a.address})" for a in groups[i]) or "  - 无候选景点，请推荐该城市的其他景点"
+            w = weather_by_date.get(dates[i])
+            weather_text = (
+                f"白天{w.day_weather} {w.day_temp}°C, 夜间{w.night_weather} {w.night_temp}°C；活动建议: {w.activity_suggestion}"
+                if w else "暂无天气数据"
+            )
+            day_sections.append(f"第{i + 1}天 ({dates[i]}, day_index={i}):\n- 天气: {weather_text}\n- 候选景点:\n{attractions_text}")
+        
+        # 离这几天景点中心最近的酒店
+        if len(chunk_attractions):
+            nearby = nearest_indices(
+                hotels.lons, hotels.lats,
+                float(chunk_attractions.lons.mean()), float(chunk_attractions.lats.mean()),
+                HOTELS_PER_CHUNK
+            )
+            chunk_hotels = hotels.take(nearby)
+        else:
+            chunk_hotels = hotels[:HOTELS_PER_CHUNK]
+        hotels_text = "\n".join(f"- {h.name} ({h.address})" for h in chunk_hotels)
+        
+        prompt = f"""请为{request.city}的{request.travel_days}天旅行计划生成以下{len(day_indices)}天的详细行程（其余天数另行规划，请只使用下面分给这几天的候选景点）:
+
+**基本信息:**
+- 城市: {request.city}
+- 交通方式: {request.transportation}
+- 住宿: {request.accommodation}
+- 偏好: {', '.join(request.preferences) if request.preferences else '无'}
+
+"""
+        if memory_context:
+            prompt += f"**用户历史偏好和对话记忆:**\n{memory_context}\n\n"
+        
+        prompt += "**需要规划的日期:**\n" + "\n\n".join(day_sections) + "\n\n"
+        prompt += f"**可用酒店:**\n{hotels_text}\n\n"
+        
+        if distance_matrix is not None:
+            distance_text = self._build_distance_text(chunk_attractions, chunk_hotels, distance_matrix)
+            if distance_text:
+                prompt += f"**景点间交通参考（{request.transportation}，路程/耗时）:**\n{distance_text}\n\n"
+        
+        prompt += f"""**重要要求（必须严格遵守）:**
+{WEATHER_PLANNING_RULES}
+2. 每天安排2-3个景点（优先使用当天的候选景点，根据天气情况灵活调整）
+3. 每天必须包含早中晚三餐
+4. 每天推荐一个具体的酒店(从可用酒店中选择)
+5. 返回的 days 数组按日期顺序包含上面列出的每一天，date 和 day_index 与上面一致
+
+请严格按照以下JSON格式返回:
+{{
+  "days": [
+{self._day_json_template(request)}
+  ]
+}}
+"""
+        if request.free_text_input:
+            prompt += f"\n**额外要求:** {request.free_text_input}"
+        
+        return prompt
+    
+    def _parse_day_chunk(
+        self,
+        response: str,
+        request: TripRequest,
+        day_indices: List[int],
+        dates: List[str],
+        groups: List[POICollection]
+    ) -> List[DayPlan]:
+        """解析逐天规划的响应，缺失或校验失败的天使用备用行程"""
+        parsed: Dict[int, DayPlan] = {}
+        for position, day in JSONArrayStreamParser("days").feed(response):
+            if position >= len(day_indices) or not isinstance(day, dict):
+                continue
+            i = day_indices[position]
+            day["day_index"] = i
+            day["date"] = dates[i]
+            try:
+                parsed[i] = DayPlan(**day)
+            except Exception as e:
+                print(f"⚠️ 第{i + 1}天行程校验失败，使用备用行程: {str(e)}")
+        
+        return [parsed.get(i) or self._fallback_day(request, i, dates[i], groups[i]) for i in day_indices]
+    
+    def _fallback_day(self, request: TripRequest, day_index: int, date: str, attractions: POICollection) -> DayPlan:
+        """用分到当天的候选景点生成备用单日行程"""
+        return DayPlan(
+            date=date,
+            day_index=day_index,
+            description=f"第{day_index + 1}天行程",
+            transportation=request.transportation,
+            accommodation=request.accommodation,
+            attractions=[
+                self._attraction_from_poi(request, poi)
+                for poi in attractions.records[:ATTRACTIONS_PER_DAY]
+            ],
+            meals=self._fallback_meals(day_index)
+        )
+    
+    def _attraction_from_poi(self, request: TripRequest, poi: POIRecord) -> Attraction:
+        """由候选POI构建景点(不经LLM时使用)"""
+        try:
+            rating = float(poi.rating) if poi.rating else None
+        except ValueError:
+            rating = None
+        return Attraction(
+            name=poi.name,
+            address=poi.address,
+            location=Location(longitude=poi.lon, latitude=poi.lat),
+            visit_duration=DEFAULT_VISIT_DURATION,
+            description=f"{request.city}景点：{poi.name}",
+            category=poi.type.split(";")[0] or "景点",
+            rating=rating,
+            poi_id=poi.id
+        )
+    
+    def _hotel_from_poi(self, request: TripRequest, poi: POIRecord, distance: float) -> Hotel:
+        """由候选POI构建酒店(不经LLM时使用)"""
+        try:
+            estimated_cost = int(float(poi.cost)) if poi.cost else 0
+        except ValueError:
+            estimated_cost = 0
+        return Hotel(
+            name=poi.name,
+            address=poi.address,
+            location=Location(longitude=poi.lon, latitude=poi.lat),
+            rating=poi.rating or "",
+            distance=f"距当天景点中心约{distance / 1000:.1f}公里",
+            type=request.accommodation,
+            estimated_cost=estimated_cost
+        )
+    
+    async def _rank_hotels(self, state: TripPlanningState, trip_plan: TripPlan):
+        """
+        为每天选择酒店(原地修改 trip_plan)
+
+        候选为全城搜索到的酒店加上每天景点中心周边的酒店(见 _nearby_hotels)。
+        以当天景点中心为目标，综合往返路程、评分和价格排序候选酒店，
+        换酒店省下的路程超过 hotel_switch_penalty 时才按天换酒店，否则整个行程住同一家。
+
+        Args:
+            state: 规划状态
+            trip_plan: 旅行计划
+        """
+        request = state["request"]
+        if not trip_plan.days:
+            return
+        
+        center_lons = np.full(len(trip_plan.days), np.nan)
+        center_lats = np.full(len(trip_plan.days), np.nan)
+        for d, day in enumerate(trip_plan.days):
+            located = [a.location for a in day.attractions if a.location.longitude and a.location.latitude]
+            if located:
+                center_lons[d] = sum(loc.longitude for loc in located) / len(located)
+                center_lats[d] = sum(loc.latitude for loc in located) / len(located)
+        
+        candidates = {poi.id: poi for poi in state["hotels"]}
+        for poi in await self._nearby_hotels(request, center_lons, center_lats):
+            candidates.setdefault(poi.id, poi)
+        hotels = POICollection(list(candidates.values())).located()
+        if not hotels:
+            return
+        
+        quality = hotel_quality_cost(
+            parse_numbers([h.rating for h in hotels]),
+            parse_numbers([h.cost for h in hotels])
+        )
+        choice = choose_hotels(
+            hotels.lons, hotels.lats, quality, center_lons, center_lats,
+            get_settings().hotel_switch_penalty
+        )
+        
+        for day, h, distance in zip(trip_plan.days, choice.hotels, choice.distances):
+            day.hotel = self._hotel_from_poi(request, hotels[h], distance)
+        update_hotel_budget(trip_plan)
+        
+        print(f"🏨 酒店排序完成: {len(set(choice.hotels))} 家酒店，换酒店 {choice.switches} 次，"
+              f"平均距景点中心 {sum(choice.distances) / len(choice.distances) / 1000:.1f} 公里")
+    
+    async def _nearby_hotels(
+        self,
+        request: TripRequest,
+        center_lons: np.ndarray,
+        center_lats: np.ndarray
+    ) -> List[POIRecord]:
+        """
+        每天景点中心周边最近的酒店(所有天并发)
+
+        优先查本地POI空间索引，周边酒店不足时请求高德周边搜索；单天查询失败时忽略该天。
+
+        Args:
+            request: 旅行请求
+            center_lons: 每天景点中心经度(NaN 表示当天没有景点)
+            center_lats: 每天景点中心纬度
+
+        Returns:
+            周边酒店(可能重复)
+        """
+        radius = get_settings().hotel_nearby_radius
+        centers = [(lon, lat) for lon, lat in zip(center_lons, center_lats) if not np.isnan(lon)]
+        if radius <= 0 or not centers:
+            return []
+        
+        results = await asyncio.gather(*(
+            self.poi_tool.anearby(
+                float(lon), float(lat), radius,
+                keywords=request.accommodation or "酒店",
+                types=HOTEL_POI_TYPE,
+                type_filter=HOTEL_POI_TYPE,
+                k=HOTELS_NEAR_DAY
+            )
+            for lon, lat in centers
+        ), return_exceptions=True)
+        
+        hotels: List[POIRecord] = []
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"⚠️ 周边酒店查询失败: {str(result)}")
+                continue
+            hotels.extend(poi for _, poi in result)
+        return hotels
+    
+    def _plan_with_optimizer(
+        self,
+        state: TripPlanningState,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> TripPlan:
+        """
+        不调用LLM的确定性规划
+
+        候选景点经均衡聚类分到每一天，每天保留最相关的若干景点，
+        分配离当天景点中心最近的酒店，再按最近邻 + 2-opt 排定游览顺序。
+
+        Args:
+            state: 规划状态
+            on_progress: 事件回调，每天发布一个 day 事件
+
+        Returns:
+            旅行计划
+        """
+        request = state["request"]
+        travel_days = request.travel_days
+        start_date = datetime.strptime(request.start_date, "%Y-%m-%d")
+        weather_by_date = {w.date: w for w in state["weather"]}
+        
+        attractions = state["attractions"].located()
+        hotels = state["hotels"].located()
+        assignments = optimize_itinerary(
+            attractions.lons, attractions.lats, travel_days,
+            hotels.lons, hotels.lats,
+            per_day=ATTRACTIONS_PER_DAY
+        )
+        
+        days = []
+        for i, assignment in enumerate(assignments):
+            date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
+            day_attractions = [self._attraction_from_poi(request, attractions[j]) for j in assignment.attractions]
+            
+            description = f"第{i + 1}天: " + (" → ".join(a.name for a in day_attractions) or "自由活动")
+            weather = weather_by_date.get(date)
+            if weather is not None and weather.activity_suggestion:
+                description += f"。天气{weather.day_weather}，{weather.activity_suggestion.split('；')[0]}"
+            
+            day_plan = DayPlan(
+                date=date,
+                day_index=i,
+                description=description,
+                transportation=request.transportation,
+                accommodation=request.accommodation,
+                hotel=(
+                    self._hotel_from_poi(request, hotels[assignment.hotel], assignment.hotel_distance)
+                    if assignment.hotel is not None else None
+                ),
+                attractions=day_attractions,
+                meals=self._fallback_meals(i)
+            )
+            days.append(day_plan)
+            if on_progress is not None:
+                self._publish_day(state, on_progress, day_plan, min(95, 50 + 45 * (i + 1) // travel_days))
+        
+        print(f"🧮 优化器规划完成: {travel_days} 天，直线总路程 {sum(a.route_distance for a in assignments) / 1000:.1f} 公里")
+        
+        return TripPlan(
+            city=request.city,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            days=days,
+            weather_info=state["weather"],
+            overall_suggestions=f"这是按地理位置自动优化的{request.city}{travel_days}日游行程，每天的景点相互邻近并按顺路顺序排列，建议提前查看各景点的开放时间。",
+            budget=estimate_budget(days)
+        )
+    
+    def _fallback_meals(self, day_index: int) -> List[Meal]:
+        """备用行程的三餐"""
+        return [
+            Meal(type="breakfast", name=f"第{day_index+1}天早餐", description="当地特色早餐"),
+            Meal(type="lunch", name=f"第{day_index+1}天午餐", description="午餐推荐"),
+            Meal(type="dinner", name=f"第{day_index+1}天晚餐", description="晚餐推荐")
+        ]
+    
+    def _publish_day(
+        self,
+        state: TripPlanningState,
+        on_progress: ProgressCallback,
+        day_plan: DayPlan,
+        progress: int
+    ) -> bool:
+        """
+        发布单日行程事件，并记录到 state["published_days"]
+
+        同一天再次发布时作为更新(替换客户端已有的这一天)，内容与上次发布相同时不发送。
+
+        Returns:
+            是否发送了事件
+        """
+        day = day_plan.dict()
+        previous = state["published_days"].get(day_plan.day_index)
+        if previous == day:
+            return False
+        
+        state["published_days"][day_plan.day_index] = day
+        on_progress({
+            "type": "day",
+            "agent": "planning",
+            "day_index": day_plan.day_index,
+            "progress": progress,
+            "day": day,
+            "message": f"第{day_plan.day_index + 1}天行程已{'生成' if previous is None else '更新'}"
+        })
+        return True
+    
+    async def _invoke_planner(
+        self,
+        messages: List[Any],
+        state: TripPlanningState,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> str:
+        """
+        调用LLM生成计划文本
+
+        流式模式下边接收 token 边增量解析，days 数组中每闭合一个对象就校验为 DayPlan 并发布 day 事件。
+
+        Args:
+            messages: 提示消息
+            state: 规划状态
+            on_progress: 事件回调(为None或关闭流式配置时一次性调用)
+
+        Returns:
+            LLM输出的完整文本
+        """
+        if on_progress is None or not get_settings().enable_streaming:
+            response = await self.llm.ainvoke(messages)
+            return response.content
+        
+        travel_days = state["request"].travel_days
+        parser = JSONArrayStreamParser("days")
+        async for chunk in self.llm.astream(messages):
+            content = chunk.content if isinstance(chunk.content, str) else ""
+            for index, day in parser.feed(content):
+                if not isinstance(day, dict):
+                    continue
+                day["day_index"] = index
+                try:
+                    day_plan = DayPlan(**day)
+                except Exception as e:
+                    print(f"⚠️ 第{index + 1}天行程校验失败，等待完整解析: {str(e)}")
+                    continue
+                
+                progress = min(95, 50 + 45 * (index + 1) // max(travel_days, 1))
+                state["progress"]["planning"]["progress"] = progress
+                self._publish_day(state, on_progress, day_plan, progress)
+        
+        print(f"📝 流式生成完成，解析出 {parser.count} 天行程")
+        return parser.text
+    
+    async def _build_distance_matrix(
+        self,
+        request: TripRequest,
+        attractions: POICollection,
+        hotels: POICollection
+    ) -> Optional[DistanceMatrix]:
+        """为提示词中的候选景点和酒店构建距离矩阵(景点在前，优先使用高德测距)"""
+        points = [
+            (poi.id, lon, lat)
+            for candidates in (
+                attractions[:attraction_candidate_count(request.travel_days)].located(),
+                hotels[:hotel_candidate_count(request.travel_days)].located(),
+            )
+            for poi, lon, lat in zip(candidates.records, candidates.lons.tolist(), candidates.lats.tolist())
+        ]
+        if len(points) < 2:
+            return None
+        
+        try:
+            matrix = await get_distance_matrix_service().abuild(
+                points, distance_type_for(request.transportation)
+            )
+            print(f"📏 距离矩阵计算完成: {len(matrix)} 个点，实测点对 {int((~matrix.estimated).sum()) - len(matrix)} 个")
+            return matrix
+        except Exception as e:
+            print(f"⚠️ 距离矩阵计算失败: {str(e)}")
+            return None
+    
+    def _build_distance_text(
+        self,
+        attractions: POICollection,
+        hotels: POICollection,
+        distance_matrix: DistanceMatrix,
+        k: int = 3
+    ) -> str:
+        """为每个景点列出最近的景点和酒店(路程/耗时)"""
+        names = {poi.id: poi.name for candidates in (attractions, hotels) for poi in candidates}
+        attraction_idx = [distance_matrix.index[a.id] for a in attractions if a.id in distance_matrix.index]
+        hotel_idx = [distance_matrix.index[h.id] for h in hotels if h.id in distance_matrix.index]
+        
+        def describe(i: int, j: int) -> str:
+            km = distance_matrix.distances[i, j] / 1000
+            minutes = distance_matrix.durations[i, j] / 60
+            return f"{names[distance_matrix.ids[j]]} {km:.1f}公里/约{minutes:.0f}分钟"
+        
+        lines = []
+        for i in attraction_idx:
+            nearby = [describe(i, j) for j in distance_matrix.nearest(i, k, attraction_idx)]
+            nearest_hotel = distance_matrix.nearest(i, 1, hotel_idx)
+            line = f"- {names[distance_matrix.ids[i]]}: 邻近景点 " + "、".join(nearby)
+            if nearest_hotel:
+                line += f"; 最近酒店 {describe(i, nearest_hotel[0])}"
+            lines.append(line)
+        return "\n".join(lines)
+    
     def _build_planner_prompt(
         self, 
         request: TripRequest, 
-        attractions: List[POIInfo], 
+        attractions: POICollection, 
         weather: List[WeatherInfo], 
-        hotels: List[Dict[str, Any]],
-        memory_context: str = ""
+        hotels: POICollection,
+        memory_context: str = "",
+        distance_matrix: Optional[DistanceMatrix] = None
     ) -> str:
         """构建规划提示词"""
+        attraction_candidates = attractions[:attraction_candidate_count(request.travel_days)]
+        hotel_candidates = hotels[:hotel_candidate_count(request.travel_days)]
+        
         attractions_text = "\n".join([
             f"- {attr.name} ({attr.address})"
-            for attr in attractions[:20]
+            for attr in attraction_candidates
         ])
         
         weather_text = "\n".join([
@@ -458,8 +1183,8 @@ class MultiAgentTripPlanner:
         ])
         
         hotels_text = "\n".join([
-            f"- {h['name']} ({h['address']})"
-            for h in hotels[:10]
+            f"- {h.name} ({h.address})"
+            for h in hotel_candidates
         ])
         
         prompt = f"""请根据以下信息生成{request.city}的{request.travel_days}天旅行计划:
@@ -486,19 +1211,21 @@ class MultiAgentTripPlanner:
 **可用酒店:**
 {hotels_text}
 
-**重要要求（必须严格遵守）:**
-1. **根据天气调整行程安排**:
-   - 如果某天是雨天、雪天或恶劣天气，必须优先安排室内景点（博物馆、美术馆、购物中心、室内娱乐场所等），避免安排户外景点
-   - 如果某天是雨天或雪天，必须调整交通方式，避免步行，建议使用公共交通或打车
-   - 如果某天是高温天气（≥30°C），避免在正午时段（11:00-15:00）安排户外活动
-   - 如果某天是低温天气（≤5°C），减少户外活动时间，多安排室内景点
-   - 如果某天是大风天气，避免安排高空或危险区域的户外活动
-   - 在每天的行程描述中，必须说明为什么这样安排（考虑天气因素）
+"""
+        if distance_matrix is not None:
+            distance_text = self._build_distance_text(attraction_candidates, hotel_candidates, distance_matrix)
+            if distance_text:
+                prompt += f"""**景点间交通参考（{request.transportation}，路程/耗时）:**
+{distance_text}
 
+"""
+        
+        prompt += f"""**重要要求（必须严格遵守）:**
+{WEATHER_PLANNING_RULES}
 2. 每天安排2-3个景点（根据天气情况灵活调整）
 3. 每天必须包含早中晚三餐
 4. 每天推荐一个具体的酒店(从可用酒店中选择)
-5. 考虑景点之间的距离和交通方式（雨天/雪天避免步行）
+5. 考虑景点之间的距离和交通方式（雨天/雪天避免步行），同一天尽量安排相互邻近的景点
 6. 返回完整的JSON格式数据
 7. 景点的经纬度坐标要真实准确
 
@@ -508,7 +1235,28 @@ class MultiAgentTripPlanner:
   "start_date": "{request.start_date}",
   "end_date": "{request.end_date}",
   "days": [
-    {{
+{self._day_json_template(request)}
+  ],
+  "weather_info": {json.dumps([w.dict() for w in weather], ensure_ascii=False)},
+  "overall_suggestions": "总体建议",
+  "budget": {{
+    "total_attractions": 180,
+    "total_hotels": 1200,
+    "total_meals": 480,
+    "total_transportation": 200,
+    "total": 2060
+  }}
+}}
+"""
+        
+        if request.free_text_input:
+            prompt += f"\n**额外要求:** {request.free_text_input}"
+        
+        return prompt
+    
+    def _day_json_template(self, request: TripRequest) -> str:
+        """单日行程的JSON格式示例(嵌入在 days 数组中)"""
+        return f"""    {{
       "date": "YYYY-MM-DD",
       "day_index": 0,
       "description": "第1天行程概述",
@@ -540,24 +1288,7 @@ class MultiAgentTripPlanner:
         {{"type": "lunch", "name": "午餐推荐", "description": "午餐描述", "estimated_cost": 50}},
         {{"type": "dinner", "name": "晚餐推荐", "description": "晚餐描述", "estimated_cost": 80}}
       ]
-    }}
-  ],
-  "weather_info": {json.dumps([w.dict() for w in weather], ensure_ascii=False)},
-  "overall_suggestions": "总体建议",
-  "budget": {{
-    "total_attractions": 180,
-    "total_hotels": 1200,
-    "total_meals": 480,
-    "total_transportation": 200,
-    "total": 2060
-  }}
-}}
-"""
-        
-        if request.free_text_input:
-            prompt += f"\n**额外要求:** {request.free_text_input}"
-        
-        return prompt
+    }}"""
     
     def _parse_plan_response(self, response: str, request: TripRequest) -> TripPlan:
         """解析规划响应"""
@@ -707,11 +1438,7 @@ class MultiAgentTripPlanner:
                     )
                     for j in range(2)
                 ],
-                meals=[
-                    Meal(type="breakfast", name=f"第{i+1}天早餐", description="当地特色早餐"),
-                    Meal(type="lunch", name=f"第{i+1}天午餐", description="午餐推荐"),
-                    Meal(type="dinner", name=f"第{i+1}天晚餐", description="晚餐推荐")
-                ]
+                meals=self._fallback_meals(i)
             )
             days.append(day_plan)
         
@@ -749,12 +1476,14 @@ class MultiAgentTripPlanner:
         print(f"天数: {request.travel_days}天")
         print(f"{'='*60}\n")
         
+        popularity = await aload_popularity(request.city)
+        
         # 初始化状态
         state: TripPlanningState = {
             "request": request,
-            "attractions": [],
+            "attractions": POICollection(),
             "weather": [],
-            "hotels": [],
+            "hotels": POICollection(),
             "plan": None,
             "errors": [],
             "progress": {
@@ -764,7 +1493,10 @@ class MultiAgentTripPlanner:
                 "planning": {"status": "pending", "progress": 0}
             },
             "messages": [],
-            "memory_context": memory_context
+            "memory_context": memory_context,
+            "popularity": popularity,
+            "distance_matrix": None,
+            "published_days": {}
         }
         
         # 并行执行三个搜索任务
@@ -821,12 +1553,14 @@ class MultiAgentTripPlanner:
             finally:
                 db.close()
         
+        popularity = await aload_popularity(request.city)
+        
         # 初始化状态
         state: TripPlanningState = {
             "request": request,
-            "attractions": [],
+            "attractions": POICollection(),
             "weather": [],
-            "hotels": [],
+            "hotels": POICollection(),
             "plan": None,
             "errors": [],
             "progress": {
@@ -836,176 +1570,107 @@ class MultiAgentTripPlanner:
                 "planning": {"status": "pending", "progress": 0}
             },
             "messages": [],
-            "memory_context": memory_context
+            "memory_context": memory_context,
+            "popularity": popularity,
+            "distance_matrix": None,
+            "published_days": {}
         }
         
-        # 创建带进度回调的节点函数（包装为协程，收集事件）
-        async def search_attractions_with_progress():
-            events = []
-            try:
-                state["progress"]["attractions"]["status"] = "running"
-                state["progress"]["attractions"]["progress"] = 10
-                events.append({
-                    "type": "progress",
-                    "agent": "attractions",
-                    "status": "running",
-                    "progress": 10,
-                    "message": "正在搜索景点..."
-                })
-                
-                await self._search_attractions_node(state)
-                
-                # 确保状态正确更新
-                final_status = state["progress"]["attractions"]["status"]
-                final_progress = state["progress"]["attractions"]["progress"]
-                
-                events.append({
-                    "type": "progress",
-                    "agent": "attractions",
-                    "status": final_status,
-                    "progress": final_progress,
-                    "message": "景点搜索完成" if final_status == "completed" else "景点搜索失败"
-                })
-                
-                if state["attractions"]:
-                    events.append({
-                        "type": "data",
-                        "agent": "attractions",
-                        "data": [attr.dict() for attr in state["attractions"][:5]]
-                    })
-            except Exception as e:
-                error_msg = f"景点搜索异常: {str(e)}"
-                print(f"❌ {error_msg}")
-                state["progress"]["attractions"]["status"] = "failed"
-                state["progress"]["attractions"]["progress"] = 0
-                events.append({
-                    "type": "progress",
-                    "agent": "attractions",
-                    "status": "failed",
-                    "progress": 0,
-                    "message": error_msg
-                })
-            
-            return events
+        # 事件队列：各节点在事件发生时立即发布，主循环按到达顺序转发
+        queue: asyncio.Queue = asyncio.Queue()
+        publish: ProgressCallback = queue.put_nowait
         
-        async def search_weather_with_progress():
-            events = []
+        async def run_agent(
+            agent: str,
+            node: Callable[..., Any],
+            label: str,
+            running_message: str,
+            data: Callable[[], List[Dict[str, Any]]],
+            **node_kwargs: Any
+        ):
+            """运行单个节点并发布其进度和数据事件，结束时发布 None 作为完成标记"""
             try:
-                state["progress"]["weather"]["status"] = "running"
-                state["progress"]["weather"]["progress"] = 10
-                events.append({
+                state["progress"][agent]["status"] = "running"
+                state["progress"][agent]["progress"] = 10
+                publish({
                     "type": "progress",
-                    "agent": "weather",
+                    "agent": agent,
                     "status": "running",
                     "progress": 10,
-                    "message": "正在查询天气..."
+                    "message": running_message
                 })
                 
-                await self._search_weather_node(state)
+                await node(state, **node_kwargs)
                 
                 # 确保状态正确更新
-                final_status = state["progress"]["weather"]["status"]
-                final_progress = state["progress"]["weather"]["progress"]
+                final_status = state["progress"][agent]["status"]
+                final_progress = state["progress"][agent]["progress"]
                 
-                events.append({
+                publish({
                     "type": "progress",
-                    "agent": "weather",
+                    "agent": agent,
                     "status": final_status,
                     "progress": final_progress,
-                    "message": "天气查询完成" if final_status == "completed" else "天气查询失败"
+                    "message": f"{label}完成" if final_status == "completed" else f"{label}失败"
                 })
                 
-                if state["weather"]:
-                    events.append({
+                items = data()
+                if items:
+                    publish({
                         "type": "data",
-                        "agent": "weather",
-                        "data": [w.dict() for w in state["weather"]]
+                        "agent": agent,
+                        "data": items
                     })
             except Exception as e:
-                error_msg = f"天气查询异常: {str(e)}"
+                error_msg = f"{label}异常: {str(e)}"
                 print(f"❌ {error_msg}")
-                state["progress"]["weather"]["status"] = "failed"
-                state["progress"]["weather"]["progress"] = 0
-                events.append({
+                state["progress"][agent]["status"] = "failed"
+                state["progress"][agent]["progress"] = 0
+                publish({
                     "type": "progress",
-                    "agent": "weather",
+                    "agent": agent,
                     "status": "failed",
                     "progress": 0,
                     "message": error_msg
                 })
-            
-            return events
+            finally:
+                publish(None)
         
-        async def search_hotels_with_progress():
-            events = []
+        async def drain(tasks: List[asyncio.Task]) -> AsyncIterator[Dict[str, Any]]:
+            """边执行边转发事件，直到所有任务都发布了完成标记"""
             try:
-                state["progress"]["hotels"]["status"] = "running"
-                state["progress"]["hotels"]["progress"] = 10
-                events.append({
-                    "type": "progress",
-                    "agent": "hotels",
-                    "status": "running",
-                    "progress": 10,
-                    "message": "正在搜索酒店..."
-                })
-                
-                await self._search_hotels_node(state)
-                
-                # 确保状态正确更新
-                final_status = state["progress"]["hotels"]["status"]
-                final_progress = state["progress"]["hotels"]["progress"]
-                
-                events.append({
-                    "type": "progress",
-                    "agent": "hotels",
-                    "status": final_status,
-                    "progress": final_progress,
-                    "message": "酒店搜索完成" if final_status == "completed" else "酒店搜索失败"
-                })
-                
-                if state["hotels"]:
-                    events.append({
-                        "type": "data",
-                        "agent": "hotels",
-                        "data": state["hotels"][:5]
-                    })
-            except Exception as e:
-                error_msg = f"酒店搜索异常: {str(e)}"
-                print(f"❌ {error_msg}")
-                state["progress"]["hotels"]["status"] = "failed"
-                state["progress"]["hotels"]["progress"] = 0
-                events.append({
-                    "type": "progress",
-                    "agent": "hotels",
-                    "status": "failed",
-                    "progress": 0,
-                    "message": error_msg
-                })
-            
-            return events
+                remaining = len(tasks)
+                while remaining:
+                    event = await queue.get()
+                    if event is None:
+                        remaining -= 1
+                        continue
+                    yield event
+            finally:
+                # 客户端断开时取消仍在运行的任务
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
         
-        # 并行执行三个搜索任务并收集所有事件
+        # 并行执行三个搜索任务
         tasks = [
-            search_attractions_with_progress(),
-            search_weather_with_progress(),
-            search_hotels_with_progress()
+            asyncio.create_task(run_agent(
+                "attractions", self._search_attractions_node, "景点搜索", "正在搜索景点...",
+                lambda: state["attractions"].to_dicts(limit=5),
+                on_progress=publish
+            )),
+            asyncio.create_task(run_agent(
+                "weather", self._search_weather_node, "天气查询", "正在查询天气...",
+                lambda: [w.dict() for w in state["weather"]]
+            )),
+            asyncio.create_task(run_agent(
+                "hotels", self._search_hotels_node, "酒店搜索", "正在搜索酒店...",
+                lambda: state["hotels"].to_dicts(limit=5)
+            )),
         ]
         
-        # 使用 asyncio.gather 并行执行，并收集所有事件
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 处理所有事件
-        for result in results:
-            if isinstance(result, Exception):
-                yield {
-                    "type": "error",
-                    "message": f"任务执行失败: {str(result)}"
-                }
-                continue
-            # result 现在是一个事件列表
-            if isinstance(result, list):
-                for event in result:
-                    yield event
+        async for event in drain(tasks):
+            yield event
         
         # 生成最终计划
         state["progress"]["planning"]["status"] = "running"
@@ -1018,7 +1683,14 @@ class MultiAgentTripPlanner:
             "message": "正在生成行程计划..."
         }
         
-        state = await self._plan_trip_node(state)
+        async def run_planning():
+            try:
+                await self._plan_trip_node(state, on_progress=publish)
+            finally:
+                publish(None)
+        
+        async for event in drain([asyncio.create_task(run_planning())]):
+            yield event
         
         if state.get("plan"):
             plan = state["plan"]
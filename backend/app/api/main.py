@@ -3,6 +3,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from ..config import get_settings, validate_config, print_config
+from ..services.resilience import get_breaker_states
 from .routes import trip, poi, map as map_routes, auth, history
 
 # 获取配置
@@ -45,6 +46,14 @@ async def startup_event():
     from ..models.database import init_db
     init_db()
     
+    # 预热地理编码缓存
+    from ..services.geocode_cache import load_geocode_cache
+    load_geocode_cache()
+    
+    # 初始化共享HTTP连接池
+    from ..services.http_client import init_http_clients
+    await init_http_clients()
+    
     # 打印配置信息
     print_config()
     
@@ -68,6 +77,11 @@ async def shutdown_event():
     """应用关闭事件"""
     print("\n" + "="*60)
     print("👋 应用正在关闭...")
+    
+    # 释放共享HTTP连接池
+    from ..services.http_client import close_http_clients
+    await close_http_clients()
+    
     print("="*60 + "\n")
 
 
@@ -85,11 +99,14 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """健康检查"""
+    """健康检查(包含外部依赖的熔断状态)"""
+    dependencies = get_breaker_states()
+    degraded = any(dep["state"] != "closed" for dep in dependencies.values())
     return {
-        "status": "healthy",
+        "status": "degraded" if degraded else "healthy",
         "service": settings.app_name,
-        "version": settings.app_version
+        "version": settings.app_version,
+        "dependencies": dependencies
     }
 
 
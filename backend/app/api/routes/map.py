@@ -1,7 +1,7 @@
 """地图服务API路由"""
 
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from typing import Any, Dict, Optional
 from ...models.schemas import (
     POISearchRequest,
     POISearchResponse,
@@ -10,6 +10,14 @@ from ...models.schemas import (
     WeatherResponse
 )
 from ...services.amap_service import get_amap_service
+from ...services.cache import get_cache_stats
+from ...services.geocode_cache import get_geocode_cache
+from ...services.weather_cache import get_forecast_cache
+from ...services.singleflight import get_singleflight_stats
+from ...services.rate_limiter import get_amap_key_pool
+from ...services.spatial_index import get_spatial_index
+from ...services.amap_stub import get_amap_stub, is_amap_stub_enabled
+from ...tools.amap_tools import get_amap_batcher
 
 router = APIRouter(prefix="/map", tags=["地图服务"])
 
@@ -41,7 +49,7 @@ async def search_poi(
         service = get_amap_service()
         
         # 搜索POI
-        pois = service.search_poi(keywords, city, citylimit)
+        pois = await service.asearch_poi(keywords, city, citylimit)
         
         return POISearchResponse(
             success=True,
@@ -80,7 +88,7 @@ async def get_weather(
         service = get_amap_service()
         
         # 查询天气
-        weather_info = service.get_weather(city)
+        weather_info = await service.aget_weather(city)
         
         return WeatherResponse(
             success=True,
@@ -117,7 +125,7 @@ async def plan_route(request: RouteRequest):
         service = get_amap_service()
         
         # 规划路线
-        route_info = service.plan_route(
+        route_info = await service.aplan_route(
             origin_address=request.origin_address,
             destination_address=request.destination_address,
             origin_city=request.origin_city,
@@ -139,6 +147,14 @@ async def plan_route(request: RouteRequest):
         )
 
 
+def _rate_limiter_stats() -> Dict[str, Any]:
+    """限流统计(未配置高德API Key时只报告未配置，不影响健康检查)"""
+    try:
+        return get_amap_key_pool().stats()
+    except ValueError:
+        return {"configured": False}
+
+
 @router.get(
     "/health",
     summary="健康检查",
@@ -150,10 +166,20 @@ async def health_check():
         # 检查服务是否可用
         service = get_amap_service()
         
-        return {
+        result = {
             "status": "healthy",
-            "service": "map-service"
+            "service": "map-service",
+            "caches": get_cache_stats(),
+            "geocode_cache": get_geocode_cache().stats(),
+            "forecast_cache": get_forecast_cache().stats(),
+            "singleflight": get_singleflight_stats(),
+            "rate_limiter": _rate_limiter_stats(),
+            "batch": get_amap_batcher().stats(),
+            "spatial_index": get_spatial_index().stats()
         }
+        if is_amap_stub_enabled():
+            result["amap_stub"] = get_amap_stub().stats()
+        return result
     except Exception as e:
         raise HTTPException(
             status_code=503,
@@ -36,7 +36,7 @@ async def get_poi_detail(poi_id: str):
         amap_service = get_amap_service()
         
         # 调用高德地图POI详情API
-        result = amap_service.get_poi_detail(poi_id)
+        result = await amap_service.aget_poi_detail(poi_id)
         
         return POIDetailResponse(
             success=True,
@@ -70,7 +70,7 @@ async def search_poi(keywords: str, city: str = "北京"):
     """
     try:
         amap_service = get_amap_service()
-        result = amap_service.search_poi(keywords, city)
+        result = await amap_service.asearch_poi(keywords, city)
 
         return {
             "success": True,
@@ -2,7 +2,7 @@
 
 import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -16,6 +16,10 @@ if parent_env.exists():
     load_dotenv(parent_env, override=False)  # 不覆盖已有的环境变量
 
 
+# 模拟模式下未配置 AMAP_API_KEY 时使用的占位Key
+AMAP_STUB_API_KEY = "stub"
+
+
 class Settings(BaseSettings):
     """应用配置"""
 
@@ -31,8 +35,84 @@ class Settings(BaseSettings):
     # CORS配置 - 使用字符串,在代码中分割
     cors_origins: str = "http://localhost:5173,http://localhost:3000,http://127.0.0.1:5173,http://127.0.0.1:3000"
 
-    # 高德地图API配置
+    # 高德地图API配置 - 多个Key用逗号分隔，调用按剩余配额分摊到各Key
     amap_api_key: str = ""
+    amap_qps: float = 3.0  # 单个Key的QPS上限
+    amap_burst: int = 3  # 单个Key的突发请求数
+    amap_batch_enabled: bool = True  # 是否将并发请求合并为 /v3/batch 调用
+    amap_batch_window_ms: int = 10  # 合并窗口(毫秒)
+    amap_batch_max_size: int = 20  # 单次批量最大子请求数(高德上限20，实际不超过 amap_burst)
+
+    # 高德本地模拟配置(离线压测/CI，无需网络和真实配额)
+    amap_backend: str = "live"  # live: 真实高德API; stub: 进程内模拟(数据来自 app/fixtures)
+    amap_stub_latency_ms: float = 50.0  # 模拟延迟中位数(毫秒)
+    amap_stub_latency_sigma: float = 0.5  # 延迟对数正态分布的sigma(0为固定延迟)
+    amap_stub_error_rate: float = 0.0  # 返回HTTP 503的概率
+    amap_stub_quota_error_rate: float = 0.0  # 返回QPS超限错误的概率
+    amap_stub_qps: float = 0.0  # 模拟单Key QPS上限(0为不限制)
+    amap_stub_seed: Optional[int] = None  # 随机种子(复现注入的延迟和错误)
+
+    # HTTP连接池配置(高德等外部API共享)
+    http_timeout: float = 10.0  # 请求超时时间(秒)
+    http_max_connections: int = 100  # 最大连接数
+    http_max_keepalive_connections: int = 20  # 最大保持活动连接数
+    http_keepalive_expiry: float = 30.0  # 空闲连接保持时间(秒)
+    http2_enabled: bool = False  # 是否启用HTTP/2(需要安装 h2)
+
+    # 高德POI搜索缓存配置
+    poi_cache_ttl: int = 24 * 3600  # 缓存过期时间(秒)
+    poi_cache_max_entries: int = 2000  # 最大缓存条目数
+    poi_cache_max_bytes: int = 32 * 1024 * 1024  # 最大缓存字节数
+
+    # POI空间索引配置
+    spatial_index_max_points: int = 50000  # 索引最多保存的POI数量
+    spatial_index_min_results: int = 5  # 本地结果少于该数量时请求高德周边搜索
+
+    # 景点搜索配置
+    attraction_search_max_tags: int = 4  # 最多按几个偏好标签分别搜索
+    attraction_search_max_calls: int = 8  # 所有偏好标签合计最多请求的POI页数
+    attraction_popularity_trips: int = 200  # 统计景点热度时读取的该城市最近历史行程数(0表示不统计)
+
+    # 地理编码缓存配置
+    geocode_negative_ttl: int = 300  # 查询失败地址的缓存时间(秒)
+    geocode_negative_max_entries: int = 10000  # 查询失败地址最多缓存的条目数
+
+    # 天气预报缓存配置
+    weather_refresh_interval: int = 3 * 3600  # 高德预报刷新间隔(秒)，从report_time起算
+    weather_min_ttl: int = 600  # 最短缓存时间(秒)
+    weather_stale_ttl: int = 6 * 3600  # 过期后仍可返回旧数据并后台刷新的时间(秒)
+
+    # 距离矩阵配置
+    distance_matrix_max_points: int = 10  # 通过高德测距的最大点数，其余点按直线距离估算(0表示全部估算)
+    distance_matrix_max_wait: float = 1.0  # 测距可接受的限流等待时间(秒)，超出时减少测距点数
+    distance_cache_ttl: int = 7 * 24 * 3600  # 点对距离缓存时间(秒)
+    distance_cache_max_entries: int = 50000  # 最大缓存点对数
+
+    # 每日路线配置
+    day_route_enabled: bool = True  # 是否为每天的行程获取实际路线
+    route_simplify_tolerance: float = 10.0  # 路线简化容差(米)
+
+    # 行程规划配置
+    planner_mode: str = "auto"  # single: 一次生成全部天数; parallel: 按天并行生成; optimizer: 不调用LLM的确定性规划; auto: 天数达到阈值时并行
+    planner_parallel_min_days: int = 5  # auto 模式下并行规划的最少天数
+    planner_chunk_days: int = 1  # 并行规划时每次LLM调用负责的天数
+    planner_concurrency: int = 4  # 并行规划的最大并发LLM调用数
+
+    # 天气分配配置
+    weather_assignment_enabled: bool = True  # 是否按天气在各天之间调整景点(雨雪等天气优先室内景点)
+
+    # 酒店排序配置
+    hotel_ranking_enabled: bool = True  # 是否按离每天景点的距离、评分和价格重新选择酒店
+    hotel_switch_penalty: int = 5000  # 每换一次酒店折合的路程(米)，越大越倾向整个行程住同一家
+    hotel_nearby_radius: int = 3000  # 在每天景点中心该半径(米)内补充候选酒店(0表示不补充)
+
+    # 日程时间安排配置
+    schedule_enabled: bool = True  # 是否为每天的景点和三餐安排起止时间
+    schedule_day_start: str = "09:00"  # 每日行程开始时间
+    schedule_day_end: str = "21:00"  # 每日行程结束时间(含晚餐)
+    schedule_lunch_time: str = "12:00"  # 午餐时间
+    schedule_dinner_time: str = "18:00"  # 晚餐时间
+    schedule_meal_duration: int = 60  # 午餐/晚餐时长(分钟)
 
     # Unsplash API配置
     unsplash_access_key: str = ""
@@ -50,10 +130,15 @@ class Settings(BaseSettings):
     enable_streaming: bool = True
     streaming_timeout: int = 300  # 流式响应超时时间(秒)
     
-    # 任务超时和重试配置
-    task_timeout: int = 120  # 任务超时时间(秒)
+    # 任务超时和重试配置(高德/Unsplash/LLM 外部调用共用)
+    task_timeout: int = 120  # 任务超时时间(秒)，单次调用含重试的总时长上限
     max_retries: int = 3  # 最大重试次数
-    retry_delay: int = 1  # 重试延迟(秒)
+    retry_delay: int = 1  # 重试延迟(秒)，按指数退避并加随机抖动
+    retry_max_delay: float = 10.0  # 单次重试最大延迟(秒)
+
+    # 熔断配置
+    circuit_failure_threshold: int = 5  # 连续失败多少次后熔断
+    circuit_recovery_timeout: int = 30  # 熔断后多久尝试恢复(秒)
 
     # JWT配置
     jwt_secret_key: str = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
@@ -69,6 +154,13 @@ class Settings(BaseSettings):
         """获取CORS origins列表"""
         return [origin.strip() for origin in self.cors_origins.split(',')]
 
+    def get_amap_api_keys(self) -> List[str]:
+        """获取高德API Key列表(模拟模式下未配置时使用占位Key，无需真实Key)"""
+        keys = [key.strip() for key in self.amap_api_key.split(',') if key.strip()]
+        if not keys and self.amap_backend == "stub":
+            return [AMAP_STUB_API_KEY]
+        return keys
+
 
 # 创建全局配置实例
 settings = Settings()
@@ -85,7 +177,7 @@ def validate_config():
     errors = []
     warnings = []
 
-    if not settings.amap_api_key:
+    if not settings.get_amap_api_keys():
         errors.append("AMAP_API_KEY未配置")
 
     # LLM会自动从LLM_API_KEY读取,不强制要求OPENAI_API_KEY
@@ -111,7 +203,8 @@ def print_config():
     print(f"应用名称: {settings.app_name}")
     print(f"版本: {settings.app_version}")
     print(f"服务器: {settings.host}:{settings.port}")
-    print(f"高德地图API Key: {'已配置' if settings.amap_api_key else '未配置'}")
+    amap_keys = settings.get_amap_api_keys()
+    print(f"高德地图API Key: {f'已配置 {len(amap_keys)} 个' if amap_keys else '未配置'}")
 
     # 检查LLM配置
     llm_api_key = os.getenv("LLM_API_KEY") or os.getenv("OPENAI_API_KEY")
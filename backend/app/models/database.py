@@ -73,6 +73,19 @@ class UserPreferences(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+# 地理编码缓存模型
+class GeocodeCacheEntry(Base):
+    __tablename__ = "geocode_cache"
+    
+    address = Column(String, primary_key=True)  # 规范化后的地址
+    adcode = Column(String, nullable=True)
+    location = Column(String, nullable=True)  # "经度,纬度"
+    formatted_address = Column(String, nullable=True)
+    city = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 # 数据库依赖注入
 def get_db():
     """获取数据库会话"""
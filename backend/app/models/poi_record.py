@@ -0,0 +1,205 @@
+"""POI内部表示 - 规划流程中使用的紧凑POI记录"""
+
+import re
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+import numpy as np
+from .schemas import Location, POIInfo, TripPlan
+
+# 名称中的括号说明(分店、入口等)，匹配时忽略
+_BRACKETED = re.compile(r"[(（][^)）]*[)）]")
+
+# 按包含关系匹配名称时，较短的名称至少的字数
+MIN_PARTIAL_NAME = 2
+
+
+class POIRecord:
+    """
+    紧凑的POI记录(规划流程内部使用)
+
+    使用 __slots__ 避免每个实例的 __dict__，类型字符串经 sys.intern 驻留，
+    同类POI共享同一个字符串对象。只在API边界通过 to_poi_info / to_dict 转换为 pydantic 模型或字典。
+    """
+
+    __slots__ = ("id", "name", "type", "address", "lon", "lat", "tel", "rating", "cost", "distance")
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        type: str,
+        address: str,
+        lon: float,
+        lat: float,
+        tel: Optional[str] = None,
+        rating: Optional[str] = None,
+        cost: Optional[str] = None,
+        distance: Optional[str] = None,
+    ):
+        self.id = id
+        self.name = name
+        self.type = sys.intern(type)
+        self.address = address
+        self.lon = lon
+        self.lat = lat
+        self.tel = tel
+        self.rating = rating
+        self.cost = cost
+        self.distance = distance
+
+    def __repr__(self) -> str:
+        return f"POIRecord(id={self.id!r}, name={self.name!r}, lon={self.lon}, lat={self.lat})"
+
+    @property
+    def has_location(self) -> bool:
+        """是否有有效坐标"""
+        return bool(self.lon) and bool(self.lat)
+
+    def to_poi_info(self) -> POIInfo:
+        """转换为 POIInfo(API边界使用)"""
+        return POIInfo(
+            id=self.id,
+            name=self.name,
+            type=self.type,
+            address=self.address,
+            location=Location(longitude=self.lon, latitude=self.lat),
+            tel=self.tel,
+            rating=self.rating,
+            cost=self.cost,
+            distance=self.distance,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为与 POIInfo.dict() 结构相同的字典(用于SSE事件和JSON输出)"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "type": self.type,
+            "address": self.address,
+            "location": {"longitude": self.lon, "latitude": self.lat},
+            "tel": self.tel,
+            "rating": self.rating,
+            "cost": self.cost,
+            "distance": self.distance,
+        }
+
+
+class POICollection:
+    """
+    POI记录集合
+
+    记录按顺序保存在 records 中，坐标另存为 float64 数组 lons / lats，
+    供距离矩阵、聚类等向量化计算直接使用。
+    """
+
+    __slots__ = ("records", "lons", "lats")
+
+    def __init__(self, records: Sequence[POIRecord] = ()):
+        """
+        初始化集合
+
+        Args:
+            records: POI记录列表
+        """
+        self.records: List[POIRecord] = list(records)
+        self.lons = np.fromiter((r.lon for r in self.records), dtype=np.float64, count=len(self.records))
+        self.lats = np.fromiter((r.lat for r in self.records), dtype=np.float64, count=len(self.records))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[POIRecord]:
+        return iter(self.records)
+
+    def __bool__(self) -> bool:
+        return bool(self.records)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[POIRecord, "POICollection"]:
+        if isinstance(key, slice):
+            return self._view(self.records[key], self.lons[key], self.lats[key])
+        return self.records[key]
+
+    @classmethod
+    def _view(cls, records: List[POIRecord], lons: np.ndarray, lats: np.ndarray) -> "POICollection":
+        """复用已有坐标数组构建子集合"""
+        collection = cls.__new__(cls)
+        collection.records = records
+        collection.lons = lons
+        collection.lats = lats
+        return collection
+
+    def take(self, indices: Sequence[int]) -> "POICollection":
+        """按下标取子集合"""
+        idx = np.asarray(indices, dtype=np.intp)
+        return self._view([self.records[i] for i in idx.tolist()], self.lons[idx], self.lats[idx])
+
+    def located(self) -> "POICollection":
+        """只保留有ID和有效坐标的POI"""
+        mask = (self.lons != 0) & (self.lats != 0)
+        return self.take([i for i in np.flatnonzero(mask).tolist() if self.records[i].id])
+
+    def to_dicts(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """转换为字典列表(API边界使用)"""
+        return [r.to_dict() for r in self.records[:limit]]
+
+
+def normalize_poi_name(name: str) -> str:
+    """规范化POI名称(去除空白和括号说明)作为匹配键"""
+    return "".join(_BRACKETED.sub("", name or "").split())
+
+
+def match_poi(name: str, records: Iterable[POIRecord]) -> Optional[POIRecord]:
+    """
+    按名称查找POI
+
+    先精确匹配规范化后的名称；没有时在名称互相包含的POI中选长度最接近的一个
+    (如 "故宫" 匹配 "故宫博物院")。
+
+    Args:
+        name: 名称(如LLM输出的景点名)
+        records: 候选POI
+
+    Returns:
+        匹配的POI，找不到时为None
+    """
+    key = normalize_poi_name(name)
+    if not key:
+        return None
+
+    best: Optional[POIRecord] = None
+    best_gap = None
+    for record in records:
+        candidate = normalize_poi_name(record.name)
+        if candidate == key:
+            return record
+        shorter = min(len(candidate), len(key))
+        if shorter >= MIN_PARTIAL_NAME and (key in candidate or candidate in key):
+            gap = abs(len(candidate) - len(key))
+            if best_gap is None or gap < best_gap:
+                best, best_gap = record, gap
+    return best
+
+
+def resolve_poi_ids(plan: TripPlan, pois: Sequence[POIRecord]) -> int:
+    """
+    为缺少POI ID的景点按名称补全ID(原地修改)
+
+    LLM输出的景点通常没有 poi_id，补全后距离矩阵、高德类型等按ID索引的数据才能对上。
+
+    Args:
+        plan: 旅行计划
+        pois: 搜索到的候选景点
+
+    Returns:
+        补全的景点数量
+    """
+    resolved = 0
+    for day in plan.days:
+        for attraction in day.attractions:
+            if attraction.poi_id:
+                continue
+            record = match_poi(attraction.name, pois)
+            if record is not None and record.id:
+                attraction.poi_id = record.id
+                resolved += 1
+    return resolved
@@ -70,6 +70,8 @@ class Attraction(BaseModel):
     poi_id: Optional[str] = Field(default="", description="POI ID")
     image_url: Optional[str] = Field(default=None, description="图片URL")
     ticket_price: int = Field(default=0, description="门票价格(元)")
+    start_time: Optional[str] = Field(default=None, description="开始游览时间 HH:MM")
+    end_time: Optional[str] = Field(default=None, description="结束游览时间 HH:MM")
 
 
 class Meal(BaseModel):
@@ -80,6 +82,8 @@ class Meal(BaseModel):
     location: Optional[Location] = Field(default=None, description="经纬度坐标")
     description: Optional[str] = Field(default=None, description="描述")
     estimated_cost: int = Field(default=0, description="预估费用(元)")
+    start_time: Optional[str] = Field(default=None, description="用餐开始时间 HH:MM")
+    end_time: Optional[str] = Field(default=None, description="用餐结束时间 HH:MM")
 
 
 class Hotel(BaseModel):
@@ -94,6 +98,13 @@ class Hotel(BaseModel):
     estimated_cost: int = Field(default=0, description="预估费用(元/晚)")
 
 
+class DayRoute(BaseModel):
+    """当日实际路线(酒店 → 景点 → 酒店)"""
+    distance: int = Field(default=0, description="总路程(米)")
+    duration: int = Field(default=0, description="总耗时(秒)")
+    polyline: str = Field(default="", description="简化后的路线坐标(Encoded Polyline，精度1e-5，纬度在前)")
+
+
 class DayPlan(BaseModel):
     """单日行程"""
     date: str = Field(..., description="日期 YYYY-MM-DD")
@@ -104,6 +115,10 @@ class DayPlan(BaseModel):
     hotel: Optional[Hotel] = Field(default=None, description="推荐酒店")
     attractions: List[Attraction] = Field(default=[], description="景点列表")
     meals: List[Meal] = Field(default=[], description="餐饮列表")
+    route: Optional[DayRoute] = Field(default=None, description="当日实际路线")
+    start_time: Optional[str] = Field(default=None, description="当日开始时间 HH:MM")
+    end_time: Optional[str] = Field(default=None, description="当日结束时间 HH:MM")
+    dropped_attractions: List[Attraction] = Field(default=[], description="时间不足未能安排的景点")
 
 
 class WeatherInfo(BaseModel):
@@ -168,6 +183,9 @@ class POIInfo(BaseModel):
     address: str = Field(..., description="地址")
     location: Location = Field(..., description="经纬度坐标")
     tel: Optional[str] = Field(default=None, description="电话")
+    rating: Optional[str] = Field(default=None, description="评分")
+    cost: Optional[str] = Field(default=None, description="人均消费")
+    distance: Optional[str] = Field(default=None, description="距离(米)")
 
 
 class POISearchResponse(BaseModel):
@@ -0,0 +1,145 @@
+"""高德批量请求服务 - 将短时间窗口内的请求合并为一次 /v3/batch 调用"""
+
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# 批量请求: [(url, params)] -> 每个子请求的响应(None 表示该子请求需要单独重发)
+BatchSender = Callable[[List[Tuple[str, Dict[str, Any]]]], Awaitable[List[Optional[Dict[str, Any]]]]]
+# 单个请求: (url, params) -> 响应
+SingleSender = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class AmapBatcher:
+    """
+    高德批量请求合并器
+
+    在 window 秒内提交的请求会被合并为一次批量调用(最多 max_size 个子请求)，
+    再把各子请求的响应分发回对应调用方。批量调用只发送一次，失败时退回逐个请求
+    (重试和熔断由 send_single 负责)，并在 cooldown 秒内不再尝试批量。
+    """
+
+    def __init__(
+        self,
+        send_batch: BatchSender,
+        send_single: SingleSender,
+        window: float = 0.01,
+        max_size: int = 20,
+        cooldown: float = 60,
+    ):
+        """
+        初始化合并器
+
+        Args:
+            send_batch: 发送批量请求的协程函数
+            send_single: 发送单个请求的协程函数
+            window: 合并窗口(秒)
+            max_size: 单次批量最大子请求数
+            cooldown: 批量失败后暂停批量的时间(秒)
+        """
+        self.send_batch = send_batch
+        self.send_single = send_single
+        self.window = window
+        self.max_size = max_size
+        self.cooldown = cooldown
+
+        self._pending: List[Tuple[str, Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self._disabled_until = 0.0
+
+        self.batches = 0
+        self.batched_requests = 0
+        self.single_requests = 0
+        self.fallbacks = 0
+
+    async def submit(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        提交请求，等待所在批次返回
+
+        Args:
+            url: 请求URL
+            params: 请求参数(不含Key)
+
+        Returns:
+            高德响应JSON
+        """
+        if time.monotonic() < self._disabled_until:
+            self.single_requests += 1
+            return await self.send_single(url, params)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((url, params, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """发送当前窗口内的请求"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, Dict[str, Any], asyncio.Future]]):
+        """执行批量请求并分发结果"""
+        if len(batch) == 1:
+            self.single_requests += 1
+            url, params, future = batch[0]
+            await self._resolve_single(url, params, future)
+            return
+
+        try:
+            results = await self.send_batch([(url, params) for url, params, _ in batch])
+            self.batches += 1
+            self.batched_requests += len(batch)
+        except Exception as e:
+            print(f"⚠️ 高德批量请求失败，改为逐个请求: {str(e)}")
+            self._disabled_until = time.monotonic() + self.cooldown
+            results = [None] * len(batch)
+
+        # 批量失败或子请求失败的，单独重发
+        retries = []
+        for (url, params, future), result in zip(batch, results):
+            if result is None:
+                self.fallbacks += 1
+                retries.append(self._resolve_single(url, params, future))
+            elif not future.done():
+                future.set_result(result)
+
+        if retries:
+            await asyncio.gather(*retries)
+
+    async def _resolve_single(self, url: str, params: Dict[str, Any], future: asyncio.Future):
+        """发送单个请求并设置结果"""
+        try:
+            result = await self.send_single(url, params)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取批量请求统计信息"""
+        return {
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "single_requests": self.single_requests,
+            "fallbacks": self.fallbacks,
+            "batching_paused": time.monotonic() < self._disabled_until,
+        }
@@ -1,10 +1,54 @@
 """高德地图服务封装"""
 
-import json
 from typing import List, Dict, Any, Optional
 from ..config import get_settings
 from ..models.schemas import Location, POIInfo, WeatherInfo
-from ..tools import AmapPOISearchTool, AmapWeatherTool, AmapRouteTool
+from ..tools import AmapPOISearchTool, AmapWeatherTool, AmapRouteTool, AmapAPIError
+from ..tools.amap_tools import geocode_address, ageocode_address, amap_get, amap_aget
+
+POI_DETAIL_URL = "https://restapi.amap.com/v3/place/detail"
+
+
+def _full_address(address: str, city: Optional[str]) -> str:
+    """拼接城市与地址"""
+    return f"{city}{address}" if city else address
+
+
+def _geocode_location(geocode: Optional[Dict[str, str]]) -> Optional[Location]:
+    """从地理编码结果中解析经纬度"""
+    if not geocode:
+        return None
+    
+    location_str = geocode.get("location", "")
+    if location_str:
+        try:
+            lon, lat = location_str.split(",")
+            return Location(longitude=float(lon), latitude=float(lat))
+        except:
+            pass
+    
+    return None
+
+
+def _poi_detail_params(poi_id: str) -> Dict[str, Any]:
+    """构建POI详情请求参数"""
+    return {
+        "id": poi_id,
+        "output": "json",
+        "extensions": "all"
+    }
+
+
+def _parse_poi_detail(data: Dict[str, Any]) -> Dict[str, Any]:
+    """解析POI详情响应，失败或为空时返回空字典"""
+    if data.get("status") != "1":
+        return {}
+    
+    pois = data.get("pois", [])
+    if not pois:
+        return {}
+    
+    return pois[0]
 
 # 全局工具实例
 _amap_tools = None
@@ -22,7 +66,7 @@ def get_amap_tools_list():
     if _amap_tools is None:
         settings = get_settings()
         
-        if not settings.amap_api_key:
+        if not settings.get_amap_api_keys():
             raise ValueError("高德地图API Key未配置,请在.env文件中设置AMAP_API_KEY")
         
         # 创建LangChain工具
@@ -60,55 +104,13 @@ class AmapService:
             POI信息列表
         """
         try:
-            # 调用LangChain工具
-            result_str = self.poi_tool._run(keywords=keywords, city=city, citylimit=citylimit)
-            result = json.loads(result_str)
-            
-            if result.get("error"):
-                print(f"❌ POI搜索失败: {result['error']}")
-                return []
-            
-            # 解析POI数据
-            pois_data = result.get("pois", [])
-            poi_list = []
-            
-            for poi_data in pois_data:
-                location = Location(
-                    longitude=poi_data.get("location", {}).get("longitude", 0.0),
-                    latitude=poi_data.get("location", {}).get("latitude", 0.0)
-                )
-                
-                # 处理 tel 字段：可能是字符串、列表或 None
-                tel_value = poi_data.get("tel", "")
-                if isinstance(tel_value, list):
-                    # 如果是列表，取第一个元素或转为字符串
-                    tel_value = tel_value[0] if tel_value else None
-                elif not tel_value or tel_value == "":
-                    tel_value = None
-                
-                # 处理 address 字段：可能是字符串、列表或 None
-                address_value = poi_data.get("address", "")
-                if isinstance(address_value, list):
-                    # 如果是列表，取第一个元素或转为字符串
-                    address_value = address_value[0] if address_value else ""
-                elif not address_value:
-                    address_value = ""
-                
-                poi_info = POIInfo(
-                    id=poi_data.get("id", ""),
-                    name=poi_data.get("name", ""),
-                    address=address_value,
-                    location=location,
-                    type=poi_data.get("type", ""),
-                    tel=tel_value,
-                    distance=poi_data.get("distance", ""),
-                    rating=poi_data.get("rating", "")
-                )
-                poi_list.append(poi_info)
-            
-            print(f"✅ POI搜索成功，找到 {len(poi_list)} 个结果")
-            return poi_list
+            result = self.poi_tool.search(keywords=keywords, city=city, citylimit=citylimit)
+            print(f"✅ POI搜索成功，找到 {len(result.pois)} 个结果")
+            return [poi.to_poi_info() for poi in result.pois]
             
+        except AmapAPIError as e:
+            print(f"❌ POI搜索失败: {str(e)}")
+            return []
         except Exception as e:
             print(f"❌ POI搜索失败: {str(e)}")
             import traceback
@@ -126,41 +128,18 @@ class AmapService:
             天气信息列表
         """
         try:
-            # 调用LangChain工具
-            result_str = self.weather_tool._run(city=city)
-            print(f"🔍 天气API原始响应: {result_str}")
-            result = json.loads(result_str)
-            
-            if result.get("error"):
-                print(f"❌ 天气查询失败: {result['error']}")
-                return []
+            weather_list = self.weather_tool.get_forecasts(city)
             
-            # 解析天气数据
-            forecasts = result.get("forecasts", [])
-            print(f"📊 解析到的forecasts数量: {len(forecasts)}")
-            
-            if not forecasts:
+            if not weather_list:
                 print(f"⚠️ 警告: 天气API返回成功但forecasts为空")
-                print(f"完整响应数据: {result}")
                 return []
             
-            weather_list = []
-            
-            for forecast in forecasts:
-                weather_info = WeatherInfo(
-                    date=forecast.get("date", ""),
-                    day_weather=forecast.get("dayweather", ""),
-                    night_weather=forecast.get("nightweather", ""),
-                    day_temp=int(forecast.get("daytemp", 0)) if forecast.get("daytemp") else 0,
-                    night_temp=int(forecast.get("nighttemp", 0)) if forecast.get("nighttemp") else 0,
-                    wind_direction=forecast.get("daywind", ""),
-                    wind_power=forecast.get("daypower", "")
-                )
-                weather_list.append(weather_info)
-            
             print(f"✅ 天气查询成功，获取 {len(weather_list)} 天天气")
             return weather_list
             
+        except AmapAPIError as e:
+            print(f"❌ 天气查询失败: {str(e)}")
+            return []
         except Exception as e:
             print(f"❌ 天气查询失败: {str(e)}")
             import traceback
@@ -190,25 +169,20 @@ class AmapService:
         """
         try:
             # 构建起点和终点
-            origin = f"{origin_city}{origin_address}" if origin_city else origin_address
-            destination = f"{destination_city}{destination_address}" if destination_city else destination_address
+            origin = _full_address(origin_address, origin_city)
+            destination = _full_address(destination_address, destination_city)
             
-            # 调用LangChain工具
-            result_str = self.route_tool._run(
+            route_data = self.route_tool.plan(
                 origin=origin,
                 destination=destination,
                 strategy=0
             )
-            result = json.loads(result_str)
-            
-            if result.get("error"):
-                print(f"❌ 路线规划失败: {result['error']}")
-                return {}
-            
-            route_data = result.get("route", {})
             print(f"✅ 路线规划成功，距离: {route_data.get('distance', 'N/A')}米")
             return route_data
             
+        except AmapAPIError as e:
+            print(f"❌ 路线规划失败: {str(e)}")
+            return {}
         except Exception as e:
             print(f"❌ 路线规划失败: {str(e)}")
             import traceback
@@ -227,36 +201,11 @@ class AmapService:
             经纬度坐标
         """
         try:
-            import httpx
             settings = get_settings()
-            if not settings.amap_api_key:
+            if not settings.get_amap_api_keys():
                 return None
             
-            url = "https://restapi.amap.com/v3/geocode/geo"
-            full_address = f"{city}{address}" if city else address
-            params = {
-                "key": settings.amap_api_key,
-                "address": full_address,
-                "output": "json"
-            }
-            
-            with httpx.Client(timeout=10.0) as client:
-                response = client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            
-            if data.get("status") != "1" or not data.get("geocodes"):
-                return None
-            
-            location_str = data["geocodes"][0].get("location", "")
-            if location_str:
-                try:
-                    lon, lat = location_str.split(",")
-                    return Location(longitude=float(lon), latitude=float(lat))
-                except:
-                    pass
-            
-            return None
+            return _geocode_location(geocode_address(_full_address(address, city)))
 
         except Exception as e:
             print(f"❌ 地理编码失败: {str(e)}")
@@ -273,32 +222,106 @@ class AmapService:
             POI详情信息
         """
         try:
-            import httpx
             settings = get_settings()
-            if not settings.amap_api_key:
+            if not settings.get_amap_api_keys():
                 return {}
             
-            url = "https://restapi.amap.com/v3/place/detail"
-            params = {
-                "key": settings.amap_api_key,
-                "id": poi_id,
-                "output": "json",
-                "extensions": "all"
-            }
+            data = amap_get(POI_DETAIL_URL, _poi_detail_params(poi_id))
+            return _parse_poi_detail(data)
+
+        except Exception as e:
+            print(f"❌ 获取POI详情失败: {str(e)}")
+            return {}
+
+    async def asearch_poi(self, keywords: str, city: str, citylimit: bool = True) -> List[POIInfo]:
+        """异步搜索POI，参数与返回值同 search_poi"""
+        try:
+            result = await self.poi_tool.asearch(keywords=keywords, city=city, citylimit=citylimit)
+            print(f"✅ POI搜索成功，找到 {len(result.pois)} 个结果")
+            return [poi.to_poi_info() for poi in result.pois]
             
-            with httpx.Client(timeout=10.0) as client:
-                response = client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+        except AmapAPIError as e:
+            print(f"❌ POI搜索失败: {str(e)}")
+            return []
+        except Exception as e:
+            print(f"❌ POI搜索失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return []
+    
+    async def aget_weather(self, city: str) -> List[WeatherInfo]:
+        """异步查询天气，参数与返回值同 get_weather"""
+        try:
+            weather_list = await self.weather_tool.aget_forecasts(city)
             
-            if data.get("status") != "1":
-                return {}
+            if not weather_list:
+                print(f"⚠️ 警告: 天气API返回成功但forecasts为空")
+                return []
+            
+            print(f"✅ 天气查询成功，获取 {len(weather_list)} 天天气")
+            return weather_list
+            
+        except AmapAPIError as e:
+            print(f"❌ 天气查询失败: {str(e)}")
+            return []
+        except Exception as e:
+            print(f"❌ 天气查询失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return []
+    
+    async def aplan_route(
+        self,
+        origin_address: str,
+        destination_address: str,
+        origin_city: Optional[str] = None,
+        destination_city: Optional[str] = None,
+        route_type: str = "walking"
+    ) -> Dict[str, Any]:
+        """异步规划路线，参数与返回值同 plan_route"""
+        try:
+            origin = _full_address(origin_address, origin_city)
+            destination = _full_address(destination_address, destination_city)
             
-            pois = data.get("pois", [])
-            if not pois:
+            route_data = await self.route_tool.aplan(
+                origin=origin,
+                destination=destination,
+                strategy=0
+            )
+            print(f"✅ 路线规划成功，距离: {route_data.get('distance', 'N/A')}米")
+            return route_data
+            
+        except AmapAPIError as e:
+            print(f"❌ 路线规划失败: {str(e)}")
+            return {}
+        except Exception as e:
+            print(f"❌ 路线规划失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return {}
+    
+    async def ageocode(self, address: str, city: Optional[str] = None) -> Optional[Location]:
+        """异步地理编码，参数与返回值同 geocode"""
+        try:
+            settings = get_settings()
+            if not settings.get_amap_api_keys():
+                return None
+            
+            return _geocode_location(await ageocode_address(_full_address(address, city)))
+
+        except Exception as e:
+            print(f"❌ 地理编码失败: {str(e)}")
+            return None
+
+    async def aget_poi_detail(self, poi_id: str) -> Dict[str, Any]:
+        """异步获取POI详情，参数与返回值同 get_poi_detail"""
+        try:
+            settings = get_settings()
+            if not settings.get_amap_api_keys():
                 return {}
             
-            return pois[0]
+            data = await amap_aget(POI_DETAIL_URL, _poi_detail_params(poi_id))
+            return _parse_poi_detail(data)
 
         except Exception as e:
             print(f"❌ 获取POI详情失败: {str(e)}")
@@ -0,0 +1,506 @@
+"""高德API本地模拟服务 - 离线压测/CI 使用的进程内 httpx transport"""
+
+import json
+import math
+import time
+import zlib
+import random
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+import httpx
+from ..config import get_settings
+from .rate_limiter import TokenBucket
+
+AMAP_BASE_URL = "https://restapi.amap.com"
+
+FIXTURES_PATH = Path(__file__).resolve().parent.parent / "fixtures" / "amap_cities.json"
+
+_CST = timezone(timedelta(hours=8))
+
+# 关键词包含这些词时按酒店生成POI
+HOTEL_KEYWORDS = ("酒店", "宾馆", "住宿", "民宿", "客栈")
+HOTEL_TYPE = "住宿服务;宾馆酒店;经济型连锁酒店"
+ATTRACTION_TYPES = [
+    "风景名胜;风景名胜;国家级景点",
+    "科教文化服务;博物馆;博物馆",
+    "风景名胜;公园广场;公园",
+    "购物服务;特色商业街;步行街",
+    "风景名胜;风景名胜相关;旅游景点",
+]
+
+# 估算路程/耗时的参数(与距离矩阵服务一致)
+DETOUR_FACTOR = 1.3
+DRIVING_SPEED_MPS = 25 / 3.6
+WALKING_SPEED_MPS = 4.5 / 3.6
+EARTH_RADIUS_M = 6371008.8
+
+
+def _seeded(*parts: Any) -> random.Random:
+    """按参数生成确定的随机数发生器(跨进程稳定)"""
+    return random.Random(zlib.crc32("|".join(str(p) for p in parts).encode("utf-8")))
+
+
+def _haversine(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """两点间球面距离(米)"""
+    dlon = math.radians(b[0] - a[0])
+    dlat = math.radians(b[1] - a[1])
+    h = math.sin(dlat / 2) ** 2 + math.cos(math.radians(a[1])) * math.cos(math.radians(b[1])) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _parse_coord(value: str) -> Optional[Tuple[float, float]]:
+    """解析 "经度,纬度" """
+    try:
+        lon, lat = value.split(",")
+        return (float(lon), float(lat))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _ok(**payload: Any) -> Dict[str, Any]:
+    """成功响应"""
+    return {"status": "1", "info": "OK", "infocode": "10000", **payload}
+
+
+def _error(info: str, infocode: str) -> Dict[str, Any]:
+    """错误响应"""
+    return {"status": "0", "info": info, "infocode": infocode}
+
+
+class AmapStub:
+    """
+    高德API模拟器
+
+    从 fixtures/amap_cities.json 加载城市数据，按请求参数确定性地生成POI、天气、路线等响应，
+    并按配置注入延迟(对数正态分布)、HTTP错误和QPS超限错误。
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        quota_error_rate: float = 0.0,
+        qps: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        初始化模拟器
+
+        Args:
+            latency_ms: 延迟中位数(毫秒)
+            latency_sigma: 延迟对数正态分布的sigma(0为固定延迟)
+            error_rate: 返回HTTP 503的概率
+            quota_error_rate: 返回QPS超限错误的概率
+            qps: 单Key QPS上限(0为不限制)
+            seed: 随机种子(用于复现注入的延迟和错误)
+        """
+        with open(FIXTURES_PATH, encoding="utf-8") as f:
+            self.fixtures = json.load(f)
+
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.quota_error_rate = quota_error_rate
+        self.qps = qps
+        self._rng = random.Random(seed)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+        # 生成过的搜索条件，POI ID 中记录其下标以便详情查询
+        self._queries: List[Tuple[str, Optional[Tuple[float, float]], float]] = []
+        self._query_ids: Dict[Tuple[str, Optional[Tuple[float, float]], float], int] = {}
+
+        self.requests = 0
+        self.injected_errors = 0
+        self.injected_quota_errors = 0
+
+        self._handlers = {
+            "/v3/place/text": self._place_text,
+            "/v3/place/around": self._place_around,
+            "/v3/place/detail": self._place_detail,
+            "/v3/geocode/geo": self._geocode,
+            "/v3/weather/weatherInfo": self._weather,
+            "/v3/direction/driving": self._driving,
+            "/v3/distance": self._distance,
+        }
+
+    # ============ 注入 ============
+
+    def latency(self) -> float:
+        """本次请求的模拟延迟(秒)"""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return self.latency_ms / 1000
+        return self._rng.lognormvariate(math.log(self.latency_ms), self.latency_sigma) / 1000
+
+    def _check_quota(self, key: str) -> Optional[Dict[str, Any]]:
+        """检查Key和QPS，返回错误响应或None"""
+        if not key:
+            return _error("INVALID_USER_KEY", "10001")
+
+        if self.qps > 0:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.qps, max(1.0, self.qps))
+            now = time.monotonic()
+            if bucket.available(now) < 1:
+                self.injected_quota_errors += 1
+                return _error("CUQPS_HAS_EXCEEDED_THE_LIMIT", "10020")
+            bucket.reserve(now)
+
+        if self.quota_error_rate > 0 and self._rng.random() < self.quota_error_rate:
+            self.injected_quota_errors += 1
+            return _error("CUQPS_HAS_EXCEEDED_THE_LIMIT", "10020")
+
+        return None
+
+    # ============ 请求分发 ============
+
+    def handle(self, method: str, url: str, body: bytes = b"") -> Tuple[int, Any]:
+        """
+        处理一个请求
+
+        Args:
+            method: HTTP方法
+            url: 完整URL或路径(含查询参数)
+            body: 请求体
+
+        Returns:
+            (HTTP状态码, 响应JSON)
+        """
+        self.requests += 1
+        parts = urlsplit(url)
+        params = dict(parse_qsl(parts.query))
+
+        if self.error_rate > 0 and self._rng.random() < self.error_rate:
+            self.injected_errors += 1
+            return 503, {"status": "0", "info": "SERVICE_UNAVAILABLE"}
+
+        if parts.path == "/v3/batch" and method == "POST":
+            return 200, self._batch(params, body)
+
+        handler = self._handlers.get(parts.path)
+        if handler is None:
+            return 404, _error("INVALID_REQUEST", "20003")
+
+        error = self._check_quota(params.get("key", ""))
+        if error is not None:
+            return 200, error
+        return 200, handler(params)
+
+    def _batch(self, params: Dict[str, str], body: bytes) -> Any:
+        """批量接口: 逐个执行子请求(子请求各自计入QPS)"""
+        if not params.get("key"):
+            return _error("INVALID_USER_KEY", "10001")
+        try:
+            ops = json.loads(body or b"{}").get("ops", [])
+        except ValueError:
+            return _error("INVALID_PARAMS", "20000")
+
+        results = []
+        for op in ops:
+            status, payload = self.handle("GET", op.get("url", ""))
+            results.append({"status": status, "body": payload if status == 200 else None})
+        return results
+
+    # ============ 数据生成 ============
+
+    def _city(self, value: str) -> Optional[Dict[str, Any]]:
+        """按城市名、别名、adcode 或地址前缀查找城市"""
+        value = (value or "").strip().lower()
+        if not value:
+            return None
+        for city in self.fixtures["cities"]:
+            if value == city["adcode"]:
+                return city
+            for name in [city["name"], *city["aliases"]]:
+                if value.startswith(name.lower()) or name.lower() == value:
+                    return city
+        return None
+
+    def _nearest_city(self, point: Tuple[float, float]) -> Dict[str, Any]:
+        """距离坐标最近的城市"""
+        return min(self.fixtures["cities"], key=lambda c: _haversine(point, tuple(c["center"])))
+
+    def _query_id(self, keywords: str, center: Optional[Tuple[float, float]], spread: float) -> int:
+        """登记搜索条件，返回其编号"""
+        key = (keywords, center, spread)
+        query_id = self._query_ids.get(key)
+        if query_id is None:
+            query_id = self._query_ids[key] = len(self._queries)
+            self._queries.append(key)
+        return query_id
+
+    def _poi(
+        self,
+        city: Dict[str, Any],
+        keywords: str,
+        index: int,
+        center: Optional[Tuple[float, float]] = None,
+        spread: float = 0.05,
+    ) -> Dict[str, Any]:
+        """确定性地生成第 index 个POI"""
+        query_id = self._query_id(keywords, center, spread)
+        rng = _seeded(city["adcode"], keywords, center, spread, index)
+        hotel = any(word in keywords for word in HOTEL_KEYWORDS)
+
+        names = city["hotels"] if hotel else city["attractions"]
+        if center is None and index < len(names):
+            name = names[index]
+        else:
+            name = f"{city['name']}{keywords or '地点'}{index + 1}号"
+
+        base = center or tuple(city["center"])
+        lon = base[0] + rng.gauss(0, spread)
+        lat = base[1] + rng.gauss(0, spread * 0.8)
+        poi = {
+            "id": f"STUB-{city['adcode']}-{query_id}-{index}",
+            "name": name,
+            "type": HOTEL_TYPE if hotel else rng.choice(ATTRACTION_TYPES),
+            "address": f"{city['name']}{rng.choice(['中山', '人民', '解放', '建设', '和平'])}路{rng.randint(1, 999)}号",
+            "location": f"{lon:.6f},{lat:.6f}",
+            "tel": f"0{rng.randint(10, 99)}-{rng.randint(10000000, 99999999)}",
+            "pname": city["name"],
+            "cityname": city["name"],
+            "adcode": city["adcode"],
+            "biz_ext": {
+                "rating": f"{rng.uniform(3.5, 5.0):.1f}",
+                "cost": f"{rng.randint(150, 1200)}" if hotel else (f"{rng.randint(0, 150)}" if rng.random() < 0.7 else []),
+            },
+        }
+        if center is not None:
+            poi["distance"] = str(int(_haversine(center, (lon, lat))))
+        return poi
+
+    def _page(self, params: Dict[str, str], total: int) -> Tuple[int, int]:
+        """计算分页范围"""
+        offset = max(1, min(int(params.get("offset", 20) or 20), 25))
+        page = max(1, int(params.get("page", 1) or 1))
+        start = (page - 1) * offset
+        return start, min(start + offset, total)
+
+    def _place_text(self, params: Dict[str, str]) -> Dict[str, Any]:
+        city = self._city(params.get("city", ""))
+        if city is None:
+            return _ok(count="0", suggestion={"keywords": [], "cities": []}, pois=[])
+
+        keywords = params.get("keywords", "")
+        total = self.fixtures["poi_total"]
+        start, end = self._page(params, total)
+        pois = [self._poi(city, keywords, i) for i in range(start, end)]
+        return _ok(count=str(total), suggestion={"keywords": [], "cities": []}, pois=pois)
+
+    def _place_around(self, params: Dict[str, str]) -> Dict[str, Any]:
+        center = _parse_coord(params.get("location", ""))
+        if center is None:
+            return _error("INVALID_PARAMS", "20000")
+
+        radius = min(float(params.get("radius", 3000) or 3000), 50000)
+        city = self._nearest_city(center)
+        keywords = params.get("keywords", "") or params.get("types", "")
+        # 生成的点大多落在半径内
+        spread = radius / 111_320 / 2
+        total = self.fixtures["poi_total"]
+        start, end = self._page(params, total)
+        pois = [self._poi(city, keywords, i, center=center, spread=spread) for i in range(start, end)]
+        pois.sort(key=lambda p: int(p["distance"]))
+        return _ok(count=str(total), pois=pois)
+
+    def _place_detail(self, params: Dict[str, str]) -> Dict[str, Any]:
+        poi_id = params.get("id", "")
+        try:
+            prefix, adcode, query_id, index = poi_id.split("-")
+            if prefix != "STUB":
+                raise ValueError(poi_id)
+            keywords, center, spread = self._queries[int(query_id)]
+            index = int(index)
+        except (ValueError, IndexError):
+            return _ok(count="0", pois=[])
+
+        city = self._city(adcode)
+        if city is None:
+            return _ok(count="0", pois=[])
+        return _ok(count="1", pois=[self._poi(city, keywords, index, center=center, spread=spread)])
+
+    def _geocode(self, params: Dict[str, str]) -> Dict[str, Any]:
+        address = params.get("address", "")
+        city = self._city(address)
+        if city is None:
+            return _ok(count="0", geocodes=[])
+
+        lon, lat = city["center"]
+        # 详细地址在城市中心附近确定性偏移
+        if address.strip() not in [city["name"], *city["aliases"]]:
+            rng = _seeded("geo", address)
+            lon += rng.gauss(0, 0.03)
+            lat += rng.gauss(0, 0.03)
+
+        return _ok(count="1", geocodes=[{
+            "formatted_address": address if address.startswith(city["name"]) else f"{city['name']}{address}",
+            "country": "中国",
+            "province": city["aliases"][0],
+            "city": city["aliases"][0],
+            "adcode": city["adcode"],
+            "location": f"{lon:.6f},{lat:.6f}",
+            "level": "市" if address.strip() in [city["name"], *city["aliases"]] else "兴趣点",
+        }])
+
+    def _weather(self, params: Dict[str, str]) -> Dict[str, Any]:
+        city = self._city(params.get("city", ""))
+        if city is None:
+            return _error("INVALID_PARAMS", "20000")
+
+        now = datetime.now(_CST)
+        report_time = now.replace(minute=0, second=0, microsecond=0)
+        casts = []
+        for offset in range(4):
+            day = now.date() + timedelta(days=offset)
+            rng = _seeded("weather", city["adcode"], day.isoformat())
+            day_temp = rng.randint(5, 33)
+            casts.append({
+                "date": day.isoformat(),
+                "week": str(day.isoweekday()),
+                "dayweather": rng.choice(self.fixtures["weather"]),
+                "nightweather": rng.choice(self.fixtures["weather"]),
+                "daytemp": str(day_temp),
+                "nighttemp": str(day_temp - rng.randint(3, 10)),
+                "daywind": rng.choice(self.fixtures["wind"]),
+                "nightwind": rng.choice(self.fixtures["wind"]),
+                "daypower": f"{rng.randint(1, 4)}",
+                "nightpower": f"{rng.randint(1, 4)}",
+            })
+
+        return _ok(count="1", forecasts=[{
+            "city": city["aliases"][0],
+            "adcode": city["adcode"],
+            "province": city["aliases"][0],
+            "reporttime": report_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "casts": casts,
+        }])
+
+    def _driving(self, params: Dict[str, str]) -> Dict[str, Any]:
+        origin = _parse_coord(params.get("origin", ""))
+        destination = _parse_coord(params.get("destination", ""))
+        waypoints = [_parse_coord(w) for w in params.get("waypoints", "").split(";") if w]
+        if origin is None or destination is None or None in waypoints:
+            return _error("INVALID_PARAMS", "20000")
+
+        stops = [origin, *waypoints, destination]
+        steps = []
+        for i, (start, end) in enumerate(zip(stops, stops[1:])):
+            distance = _haversine(start, end) * DETOUR_FACTOR
+            # 沿直线插值并加少量确定性偏移，模拟道路形状
+            rng = _seeded("route", start, end)
+            segments = 12
+            points = [
+                (
+                    start[0] + (end[0] - start[0]) * k / segments + (rng.gauss(0, 0.0008) if 0 < k < segments else 0),
+                    start[1] + (end[1] - start[1]) * k / segments + (rng.gauss(0, 0.0008) if 0 < k < segments else 0),
+                )
+                for k in range(segments + 1)
+            ]
+            steps.append({
+                "instruction": f"沿模拟道路行驶{int(distance)}米到达第{i + 1}站",
+                "road": "模拟道路",
+                "distance": str(int(distance)),
+                "duration": str(int(distance / DRIVING_SPEED_MPS)),
+                "polyline": ";".join(f"{lon:.6f},{lat:.6f}" for lon, lat in points),
+            })
+
+        total_distance = sum(int(step["distance"]) for step in steps)
+        total_duration = sum(int(step["duration"]) for step in steps)
+        return _ok(count="1", route={
+            "origin": params["origin"],
+            "destination": params["destination"],
+            "paths": [{
+                "distance": str(total_distance),
+                "duration": str(total_duration),
+                "strategy": "速度最快",
+                "tolls": "0",
+                "toll_distance": "0",
+                "steps": steps,
+            }],
+        })
+
+    def _distance(self, params: Dict[str, str]) -> Dict[str, Any]:
+        origins = [_parse_coord(o) for o in params.get("origins", "").split("|") if o]
+        destination = _parse_coord(params.get("destination", ""))
+        if not origins or destination is None or None in origins:
+            return _error("INVALID_PARAMS", "20000")
+
+        straight = params.get("type") == "0"
+        speed = WALKING_SPEED_MPS if params.get("type") == "3" else DRIVING_SPEED_MPS
+        results = []
+        for i, origin in enumerate(origins):
+            distance = _haversine(origin, destination) * (1.0 if straight else DETOUR_FACTOR)
+            results.append({
+                "origin_id": str(i + 1),
+                "dest_id": "1",
+                "distance": str(int(distance)),
+                "duration": "0" if straight else str(int(distance / speed)),
+            })
+        return _ok(count=str(len(results)), results=results)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取模拟器统计信息"""
+        return {
+            "requests": self.requests,
+            "injected_errors": self.injected_errors,
+            "injected_quota_errors": self.injected_quota_errors,
+            "latency_ms": self.latency_ms,
+            "error_rate": self.error_rate,
+            "quota_error_rate": self.quota_error_rate,
+            "qps": self.qps,
+        }
+
+
+class AmapStubTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """将请求交给 AmapStub 处理的 httpx transport(同步/异步客户端通用)"""
+
+    def __init__(self, stub: AmapStub):
+        self.stub = stub
+
+    def _respond(self, request: httpx.Request) -> httpx.Response:
+        status, payload = self.stub.handle(request.method, str(request.url), request.content)
+        return httpx.Response(status, json=payload, request=request)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        time.sleep(self.stub.latency())
+        return self._respond(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        await asyncio.sleep(self.stub.latency())
+        return self._respond(request)
+
+
+# 全局模拟器实例
+_amap_stub: Optional[AmapStub] = None
+
+
+def get_amap_stub() -> AmapStub:
+    """获取高德模拟器实例(单例模式)"""
+    global _amap_stub
+
+    if _amap_stub is None:
+        settings = get_settings()
+        _amap_stub = AmapStub(
+            latency_ms=settings.amap_stub_latency_ms,
+            latency_sigma=settings.amap_stub_latency_sigma,
+            error_rate=settings.amap_stub_error_rate,
+            quota_error_rate=settings.amap_stub_quota_error_rate,
+            qps=settings.amap_stub_qps,
+            seed=settings.amap_stub_seed,
+        )
+
+    return _amap_stub
+
+
+def is_amap_stub_enabled() -> bool:
+    """是否使用本地模拟代替真实高德API"""
+    return get_settings().amap_backend == "stub"
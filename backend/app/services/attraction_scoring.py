@@ -0,0 +1,161 @@
+"""景点打分 - 从候选池中选出最值得放进规划提示词的景点"""
+
+import math
+import asyncio
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..config import get_settings
+from .spatial_index import haversine_cross
+
+# 偏好标签 → 高德类型/名称中的关键词(标签本身也参与匹配)
+PREFERENCE_KEYWORDS = {
+    "历史文化": ("博物馆", "纪念馆", "古迹", "遗址", "故居", "寺", "庙", "祠", "古镇", "城墙", "文物"),
+    "自然风光": ("风景", "公园", "山", "湖", "湿地", "森林", "植物园", "海滩", "瀑布", "峡谷"),
+    "美食": ("餐饮", "美食", "小吃", "夜市", "食街"),
+    "购物": ("购物", "商场", "商业街", "步行街", "市场"),
+    "艺术": ("美术馆", "艺术", "展览", "画廊", "剧院", "音乐厅"),
+    "休闲": ("休闲", "公园", "广场", "茶馆", "咖啡", "度假", "温泉"),
+}
+
+# 各项得分的权重
+TAG_WEIGHT = 1.0
+RATING_WEIGHT = 0.6
+POPULARITY_WEIGHT = 0.4
+RELEVANCE_WEIGHT = 0.5
+
+# 搜索结果中排第 r 位的相关度 1 / (1 + r * RELEVANCE_DECAY)
+RELEVANCE_DECAY = 0.05
+
+# 缺少评分时按该评分计算
+DEFAULT_RATING = 4.0
+
+# 与已选景点相距 d 米时扣 SPREAD_WEIGHT * exp(-d / SPREAD_SCALE)，避免选中同一景区的多个入口/子景点
+SPREAD_WEIGHT = 0.5
+SPREAD_SCALE = 1000.0
+
+
+@lru_cache(maxsize=256)
+def preference_keywords(preferences: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    展开偏好标签为匹配关键词
+
+    Args:
+        preferences: 偏好标签
+
+    Returns:
+        去重后的关键词(包含标签本身)
+    """
+    keywords = []
+    for tag in preferences:
+        for keyword in (tag,) + PREFERENCE_KEYWORDS.get(tag, ()):
+            if keyword and keyword not in keywords:
+                keywords.append(keyword)
+    return tuple(keywords)
+
+
+def score_attractions(
+    types: List[str],
+    names: List[str],
+    ratings: np.ndarray,
+    popularity: np.ndarray,
+    preferences: List[str],
+) -> np.ndarray:
+    """
+    计算候选景点得分
+
+    得分 = 偏好匹配 + 评分 + 历史热度 + 搜索相关度(传入顺序)，各项归一化到 0~1 后加权。
+
+    Args:
+        types: 高德类型
+        names: 名称
+        ratings: 评分(NaN 表示未知)
+        popularity: 在历史行程中出现的次数
+        preferences: 偏好标签
+
+    Returns:
+        每个景点的得分
+    """
+    n = len(types)
+    keywords = preference_keywords(tuple(preferences))
+    tag = np.fromiter(
+        (any(k in t or k in name for k in keywords) for t, name in zip(types, names)),
+        dtype=np.float64, count=n
+    ) if keywords else np.zeros(n)
+
+    rating = np.clip(np.where(np.isnan(ratings), DEFAULT_RATING, ratings), 0.0, 5.0) / 5.0
+
+    top = float(popularity.max()) if n else 0.0
+    popular = np.log1p(popularity) / math.log1p(top) if top > 0 else np.zeros(n)
+
+    relevance = 1.0 / (1.0 + np.arange(n) * RELEVANCE_DECAY)
+
+    return (
+        TAG_WEIGHT * tag
+        + RATING_WEIGHT * rating
+        + POPULARITY_WEIGHT * popular
+        + RELEVANCE_WEIGHT * relevance
+    )
+
+
+def select_spread(lons: np.ndarray, lats: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    按得分贪心选出 k 个景点，离已选景点过近的扣分
+
+    Args:
+        lons: 经度数组(0 表示无坐标，不参与距离扣分)
+        lats: 纬度数组
+        scores: 得分
+        k: 选出数量
+
+    Returns:
+        选中的下标(按选中顺序，即调整后得分由高到低)
+    """
+    n = len(scores)
+    k = min(k, n)
+    located = (lons != 0) & (lats != 0)
+    nearest = np.full(n, np.inf)
+    available = np.ones(n, dtype=bool)
+    chosen = []
+
+    for _ in range(k):
+        adjusted = np.where(available, scores - SPREAD_WEIGHT * np.exp(-nearest / SPREAD_SCALE), -np.inf)
+        i = int(np.argmax(adjusted))
+        chosen.append(i)
+        available[i] = False
+        if located[i]:
+            distances = haversine_cross(lons[i:i + 1], lats[i:i + 1], lons, lats)[0]
+            nearest = np.where(located, np.minimum(nearest, distances), nearest)
+
+    return np.array(chosen, dtype=np.intp)
+
+
+def popularity_counts(ids: List[str], names: List[str], counts: Optional[Dict[str, int]]) -> np.ndarray:
+    """按POI ID(其次名称)查找历史出现次数"""
+    if not counts:
+        return np.zeros(len(ids))
+    return np.array([counts.get(poi_id) or counts.get(name, 0) for poi_id, name in zip(ids, names)], dtype=np.float64)
+
+
+def load_popularity(city: str) -> Dict[str, int]:
+    """读取该城市历史行程中的景点热度(同步数据库查询，失败时返回空字典)"""
+    limit = get_settings().attraction_popularity_trips
+    if limit <= 0:
+        return {}
+
+    from ..models.database import SessionLocal
+    from .memory_service import get_attraction_popularity
+
+    db = SessionLocal()
+    try:
+        return get_attraction_popularity(db, city, limit)
+    except Exception as e:
+        print(f"⚠️ 景点热度统计失败: {str(e)}")
+        return {}
+    finally:
+        db.close()
+
+
+async def aload_popularity(city: str) -> Dict[str, int]:
+    """异步读取景点热度(数据库查询放到线程中执行，避免阻塞事件循环)"""
+    return await asyncio.to_thread(load_popularity, city)
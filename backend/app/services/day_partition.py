@@ -0,0 +1,65 @@
+"""按天划分候选景点 - 为逐天并行规划分配每天的景点"""
+
+from typing import List
+import numpy as np
+
+
+def partition_by_day(lons: np.ndarray, lats: np.ndarray, days: int) -> List[np.ndarray]:
+    """
+    按方位角扇区把景点均分到每一天
+
+    以所有景点的中心为原点，按方位角排序后切成 days 段连续扇区，
+    相邻景点落在同一天，各天数量最多相差1个。
+
+    Args:
+        lons: 经度数组
+        lats: 纬度数组
+        days: 天数
+
+    Returns:
+        每天分到的景点下标数组(长度为 days，景点不足时部分天为空)
+    """
+    n = len(lons)
+    if days <= 0:
+        return []
+    if n == 0:
+        return [np.empty(0, dtype=np.intp) for _ in range(days)]
+
+    lat0 = np.radians(lats.mean())
+    dx = (lons - lons.mean()) * np.cos(lat0)
+    dy = lats - lats.mean()
+    angles = np.arctan2(dy, dx)
+
+    # 从最大空隙处起切，避免把紧挨着的景点分到首尾两天
+    order = np.argsort(angles, kind="stable")
+    if n > 1:
+        sorted_angles = angles[order]
+        gaps = np.diff(np.append(sorted_angles, sorted_angles[0] + 2 * np.pi))
+        order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+
+    return [part.astype(np.intp) for part in np.array_split(order, days)]
+
+
+def nearest_indices(lons: np.ndarray, lats: np.ndarray, lon: float, lat: float, k: int) -> np.ndarray:
+    """
+    离目标点最近的 k 个点(等距投影近似，仅用于排序)
+
+    Args:
+        lons: 经度数组
+        lats: 纬度数组
+        lon: 目标经度
+        lat: 目标纬度
+        k: 返回数量
+
+    Returns:
+        下标数组(由近到远)
+    """
+    if len(lons) == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    dx = (lons - lon) * np.cos(np.radians(lat))
+    dy = lats - lat
+    dist = dx * dx + dy * dy
+    k = min(k, len(dist))
+    top = np.argpartition(dist, k - 1)[:k]
+    return top[np.argsort(dist[top], kind="stable")]
@@ -0,0 +1,285 @@
+"""日程时间安排 - 为每天的景点和三餐生成起止时间"""
+
+import math
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from ..config import get_settings
+from ..models.poi_record import POIRecord, match_poi
+from ..models.schemas import Attraction, DayPlan, Meal, TripPlan
+from .distance_matrix import AVERAGE_SPEED_MPS, DETOUR_FACTOR, DistanceMatrix, distance_type_for
+from .spatial_index import haversine
+
+# 时间取整粒度(分钟)
+TIME_STEP = 5
+
+# 早餐时长(分钟)，从每日开始时间起安排
+BREAKFAST_DURATION = 30
+
+# 午餐/晚餐可提前或推后的弹性(分钟)
+MEAL_FLEX = 30
+
+# 两点之间的行程耗时估算: (起点, 终点) -> 分钟
+TravelEstimator = Callable[[Any, Any], float]
+
+
+def parse_clock(value: str) -> int:
+    """把 "HH:MM" 转为当天的分钟数"""
+    hours, minutes = value.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def format_clock(minutes: int) -> str:
+    """把当天的分钟数转为 "HH:MM" """
+    minutes = max(0, min(int(minutes), 24 * 60 - 1))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _round_up(minutes: float) -> int:
+    """按 TIME_STEP 向上取整"""
+    return int(math.ceil(minutes / TIME_STEP) * TIME_STEP)
+
+
+class ScheduleConfig(NamedTuple):
+    """每日时间窗口配置(单位: 当天的分钟数)"""
+    day_start: int
+    day_end: int
+    lunch_time: int
+    dinner_time: int
+    meal_duration: int
+
+    @classmethod
+    def from_settings(cls) -> "ScheduleConfig":
+        """从配置读取"""
+        settings = get_settings()
+        return cls(
+            day_start=parse_clock(settings.schedule_day_start),
+            day_end=parse_clock(settings.schedule_day_end),
+            lunch_time=parse_clock(settings.schedule_lunch_time),
+            dinner_time=parse_clock(settings.schedule_dinner_time),
+            meal_duration=settings.schedule_meal_duration,
+        )
+
+
+def straight_line_estimator(transportation: str) -> TravelEstimator:
+    """
+    按直线距离估算行程耗时
+
+    Args:
+        transportation: 交通方式(步行按步行速度，其余按城市驾车速度)
+
+    Returns:
+        行程耗时估算函数，任一端缺少坐标时返回0
+    """
+    speed = AVERAGE_SPEED_MPS[distance_type_for(transportation)]
+
+    def estimate(origin: Any, destination: Any) -> float:
+        a = getattr(origin, "location", None)
+        b = getattr(destination, "location", None)
+        if a is None or b is None or not (a.longitude and a.latitude and b.longitude and b.latitude):
+            return 0.0
+        meters = haversine(a.longitude, a.latitude, b.longitude, b.latitude) * DETOUR_FACTOR
+        return meters / speed / 60
+
+    return estimate
+
+
+def matrix_estimator(
+    matrix: Optional[DistanceMatrix],
+    fallback: TravelEstimator,
+    pois: Sequence[POIRecord] = (),
+) -> TravelEstimator:
+    """
+    优先使用距离矩阵中的实测耗时
+
+    Args:
+        matrix: 候选POI距离矩阵(可为None)
+        fallback: 两端任一不在矩阵中时使用的估算
+        pois: 矩阵中的POI，没有 poi_id 的地点(如LLM输出的酒店)按名称在其中查找
+
+    Returns:
+        行程耗时估算函数
+    """
+    if matrix is None:
+        return fallback
+
+    by_name: Dict[str, Optional[str]] = {}
+
+    def key(stop: Any) -> Optional[str]:
+        poi_id = getattr(stop, "poi_id", None)
+        if poi_id:
+            return poi_id
+        name = getattr(stop, "name", None)
+        if not name or not pois:
+            return None
+        if name not in by_name:
+            record = match_poi(name, pois)
+            by_name[name] = record.id if record is not None else None
+        return by_name[name]
+
+    def estimate(origin: Any, destination: Any) -> float:
+        a = key(origin)
+        b = key(destination)
+        if a in matrix.index and b in matrix.index:
+            return matrix.duration(a, b) / 60
+        return fallback(origin, destination)
+
+    return estimate
+
+
+def schedule_day(
+    day: DayPlan,
+    config: ScheduleConfig,
+    travel: TravelEstimator,
+    carried: Optional[List[Attraction]] = None,
+) -> Tuple[List[Attraction], List[Attraction]]:
+    """
+    为单日行程安排起止时间(按景点顺序线性扫描)
+
+    早餐从开始时间起安排；每个景点开始前，若该景点会结束在午餐/晚餐弹性时间之后，先安排用餐。
+    往返餐厅的路程计入时间；景点(及其前面的用餐、之后尚未安排的用餐)超过当日结束时间时，
+    该景点不安排、移出当天，其前面试排的用餐也一并撤销。所有安排都在 [开始时间, 结束时间] 内。
+
+    Args:
+        day: 单日行程(原地写入时间，移出放不下的景点)
+        config: 时间窗口配置
+        travel: 行程耗时估算
+        carried: 前一天顺延过来的景点(排在当天景点之后，仍放不下时丢弃)
+
+    Returns:
+        (当天放不下、可顺延到下一天的景点, 顺延过来但仍放不下的景点)
+    """
+    meals = {meal.type: meal for meal in day.meals}
+    pending: List[Meal] = [meals[t] for t in ("lunch", "dinner") if t in meals]
+    meal_times = {"lunch": config.lunch_time, "dinner": config.dinner_time}
+
+    def leg(origin: Any, destination: Any) -> int:
+        return _round_up(travel(origin, destination)) if origin is not None else 0
+
+    def eat(meal: Meal, clock: int, origin: Any) -> Tuple[int, int]:
+        """返回用餐的(开始, 结束)时间"""
+        earliest = meal_times.get(meal.type, clock) - MEAL_FLEX
+        start = max(clock + leg(origin, meal), earliest)
+        return start, start + config.meal_duration
+
+    clock = config.day_start
+    previous: Any = day.hotel
+
+    breakfast = meals.get("breakfast")
+    if breakfast is not None:
+        start = clock + leg(previous, breakfast)
+        breakfast.start_time = format_clock(start)
+        breakfast.end_time = format_clock(start + BREAKFAST_DURATION)
+        clock = start + BREAKFAST_DURATION
+        previous = _after(breakfast, previous)
+
+    scheduled: List[Attraction] = []
+    overflow: List[Attraction] = []
+    lost: List[Attraction] = []
+    carried = carried or []
+
+    for position, attraction in enumerate(list(day.attractions) + carried):
+        is_carried = position >= len(day.attractions)
+        visit = attraction.visit_duration or 0
+
+        # 试排: 该景点会拖过用餐时间时先用餐
+        trial_clock, trial_previous = clock, previous
+        remaining = list(pending)
+        eaten: List[Tuple[Meal, int, int]] = []
+        while remaining and trial_clock + leg(trial_previous, attraction) + visit > (
+            meal_times[remaining[0].type] + MEAL_FLEX
+        ):
+            meal = remaining.pop(0)
+            meal_start, trial_clock = eat(meal, trial_clock, trial_previous)
+            eaten.append((meal, meal_start, trial_clock))
+            trial_previous = _after(meal, trial_previous)
+
+        start = trial_clock + leg(trial_previous, attraction)
+        end = start + visit
+
+        # 之后尚未安排的用餐(含路程)也要在结束时间前完成
+        finish, origin = end, attraction
+        for meal in remaining:
+            _, finish = eat(meal, finish, origin)
+            origin = _after(meal, origin)
+
+        if finish > config.day_end:
+            # 顺延过来的景点不再继续顺延；试排的用餐撤销
+            (lost if is_carried else overflow).append(attraction)
+            continue
+
+        for meal, meal_start, meal_end in eaten:
+            meal.start_time = format_clock(meal_start)
+            meal.end_time = format_clock(meal_end)
+        attraction.start_time = format_clock(start)
+        attraction.end_time = format_clock(end)
+        scheduled.append(attraction)
+        pending = remaining
+        clock = end
+        previous = attraction
+
+    for meal in pending:
+        meal_start, meal_end = eat(meal, clock, previous)
+        # 没有景点可排时用餐也不能超出结束时间
+        meal_start = max(clock, min(meal_start, config.day_end - config.meal_duration))
+        meal_end = meal_start + config.meal_duration
+        meal.start_time = format_clock(meal_start)
+        meal.end_time = format_clock(meal_end)
+        clock = meal_end
+        previous = _after(meal, previous)
+
+    day.attractions = scheduled
+    day.start_time = format_clock(config.day_start)
+    day.end_time = format_clock(clock)
+    return overflow, lost
+
+
+def _after(stop: Any, previous: Any) -> Any:
+    """经过 stop 之后的位置: 没有坐标的地点(如未定位的餐厅)不改变当前位置"""
+    location = getattr(stop, "location", None)
+    if location is not None and location.longitude and location.latitude:
+        return stop
+    return previous
+
+
+def schedule_plan(
+    plan: TripPlan,
+    transportation: str,
+    travel: Optional[TravelEstimator] = None,
+    config: Optional[ScheduleConfig] = None,
+) -> int:
+    """
+    为整个计划安排时间
+
+    逐天调用 schedule_day，当天放不下的景点顺延到下一天末尾，
+    下一天仍放不下(或已是最后一天)时记入 dropped_attractions。
+
+    Args:
+        plan: 旅行计划(原地修改)
+        transportation: 交通方式(未提供 travel 时用于直线估算)
+        travel: 行程耗时估算
+        config: 时间窗口配置，默认读取配置
+
+    Returns:
+        未能安排的景点数量
+    """
+    config = config or ScheduleConfig.from_settings()
+    travel = travel or straight_line_estimator(transportation)
+
+    dropped = 0
+    carried: List[Attraction] = []
+    for i, day in enumerate(plan.days):
+        count_before = len(day.attractions) + len(carried)
+        overflow, lost = schedule_day(day, config, travel, carried)
+
+        if i + 1 < len(plan.days):
+            carried = overflow
+            day.dropped_attractions = lost
+        else:
+            carried = []
+            day.dropped_attractions = lost + overflow
+        dropped += len(day.dropped_attractions)
+
+        if count_before != len(day.attractions):
+            print(f"⏰ 第{i + 1}天时间不足: 安排 {len(day.attractions)} 个景点，"
+                  f"顺延 {len(carried)} 个，放弃 {len(day.dropped_attractions)} 个")
+
+    return dropped
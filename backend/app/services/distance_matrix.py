@@ -0,0 +1,278 @@
+"""距离矩阵服务 - 计划内POI两两之间的路程/耗时矩阵"""
+
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from ..config import get_settings
+from .cache import TTLCache
+from .rate_limiter import get_amap_key_pool
+from ..tools.amap_tools import amap_aget
+
+DISTANCE_URL = "https://restapi.amap.com/v3/distance"
+
+# 高德测距类型
+DISTANCE_TYPE_DRIVING = 1
+DISTANCE_TYPE_WALKING = 3
+
+# 单次测距请求最多的起点数
+MAX_ORIGINS = 100
+
+# 坐标量化精度(小数位数，4位约11米)，相近坐标共享缓存
+COORD_PRECISION = 4
+
+# 直线距离估算参数: 路程 = 直线距离 * 绕行系数，耗时 = 路程 / 平均速度
+EARTH_RADIUS_M = 6371008.8
+DETOUR_FACTOR = 1.3
+AVERAGE_SPEED_MPS = {
+    DISTANCE_TYPE_DRIVING: 25 / 3.6,  # 城市道路约25km/h
+    DISTANCE_TYPE_WALKING: 4.5 / 3.6,
+}
+
+# 矩阵中的点: (id, 经度, 纬度)
+Point = Tuple[str, float, float]
+
+
+def distance_type_for(transportation: str) -> int:
+    """根据用户选择的交通方式确定测距类型(高德测距不支持公交，按驾车估算)"""
+    return DISTANCE_TYPE_WALKING if "步行" in (transportation or "") else DISTANCE_TYPE_DRIVING
+
+
+def haversine_matrix(lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+    """
+    计算两两之间的球面直线距离
+
+    Args:
+        lons: 经度数组(度)
+        lats: 纬度数组(度)
+
+    Returns:
+        n×n 距离矩阵(米)
+    """
+    lon = np.radians(lons)[:, None]
+    lat = np.radians(lats)[:, None]
+    dlon = lon - lon.T
+    dlat = lat - lat.T
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(lat.T) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _quantize(lon: float, lat: float) -> Tuple[float, float]:
+    """量化坐标"""
+    return (round(lon, COORD_PRECISION), round(lat, COORD_PRECISION))
+
+
+def _coord(lon: float, lat: float) -> str:
+    """格式化为高德坐标参数"""
+    return f"{lon:.6f},{lat:.6f}"
+
+
+class DistanceMatrix:
+    """
+    路程/耗时矩阵
+
+    distances[i, j] / durations[i, j] 为从第 i 个点到第 j 个点的路程(米)和耗时(秒)，
+    estimated[i, j] 为 True 表示该值由直线距离估算而非高德测距返回。
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        distances: np.ndarray,
+        durations: np.ndarray,
+        estimated: np.ndarray,
+    ):
+        self.ids = ids
+        self.index: Dict[str, int] = {poi_id: i for i, poi_id in enumerate(ids)}
+        self.distances = distances
+        self.durations = durations
+        self.estimated = estimated
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def distance(self, from_id: str, to_id: str) -> float:
+        """两点间路程(米)"""
+        return float(self.distances[self.index[from_id], self.index[to_id]])
+
+    def duration(self, from_id: str, to_id: str) -> float:
+        """两点间耗时(秒)"""
+        return float(self.durations[self.index[from_id], self.index[to_id]])
+
+    def nearest(self, i: int, k: int = 3, among: Optional[Sequence[int]] = None) -> List[int]:
+        """
+        第 i 个点最近的 k 个点(按耗时)
+
+        Args:
+            i: 点下标
+            k: 返回数量
+            among: 候选点下标(默认全部)
+
+        Returns:
+            点下标列表(由近到远，不含自身)
+        """
+        candidates = np.arange(len(self.ids)) if among is None else np.asarray(among, dtype=np.intp)
+        candidates = candidates[candidates != i]
+        if len(candidates) == 0:
+            return []
+
+        row = self.durations[i, candidates]
+        k = min(k, len(candidates))
+        top = np.argpartition(row, k - 1)[:k]
+        return candidates[top[np.argsort(row[top])]].tolist()
+
+
+class DistanceMatrixService:
+    """
+    距离矩阵服务
+
+    先按直线距离估算整张矩阵，再对前 max_points 个点通过高德 /v3/distance 获取实际路程/耗时
+    (每个终点一次请求，所有请求并发并经批量接口合并)。结果按量化后的坐标点对缓存。
+    批量接口中每个子请求仍各占一个限流令牌，因此只测量限流器在 max_wait 秒内能放行的请求数，
+    放不下时减少测距点数，其余点对保留直线距离估算，避免在规划关键路径上排队等待。
+    """
+
+    def __init__(self, max_points: int, cache: TTLCache, max_wait: float = 1.0):
+        """
+        初始化服务
+
+        Args:
+            max_points: 通过高德测距的最大点数
+            cache: 点对距离缓存
+            max_wait: 可接受的限流等待时间(秒)
+        """
+        self.max_points = max_points
+        self.cache = cache
+        self.max_wait = max_wait
+
+    async def abuild(self, points: List[Point], distance_type: int = DISTANCE_TYPE_DRIVING) -> DistanceMatrix:
+        """
+        构建距离矩阵
+
+        Args:
+            points: (id, 经度, 纬度) 列表，前面的点优先使用高德测距
+            distance_type: 测距类型(驾车/步行)
+
+        Returns:
+            距离矩阵
+        """
+        n = len(points)
+        lons = np.array([p[1] for p in points], dtype=np.float64)
+        lats = np.array([p[2] for p in points], dtype=np.float64)
+
+        # 直线距离估算作为基线
+        distances = haversine_matrix(lons, lats) * DETOUR_FACTOR
+        durations = distances / AVERAGE_SPEED_MPS[distance_type]
+        estimated = np.ones((n, n), dtype=bool)
+        np.fill_diagonal(estimated, False)
+
+        measured = min(n, self.max_points)
+        if measured > 1:
+            keys = [_quantize(lon, lat) for _, lon, lat in points[:measured]]
+
+            # 缓存命中的点对直接填入
+            hit = np.zeros((measured, measured), dtype=bool)
+            for j in range(measured):
+                for i in range(measured):
+                    if i == j:
+                        continue
+                    cached = self.cache.get((keys[i], keys[j], distance_type))
+                    if cached is not None:
+                        distances[i, j], durations[i, j] = cached
+                        estimated[i, j] = False
+                        hit[i, j] = True
+
+            # 限流预算内放不下时，从后往前减少测距点数(前面的点更重要)
+            budget = int(get_amap_key_pool().tokens_within(self.max_wait))
+            np.fill_diagonal(hit, True)
+            while measured > 1 and _request_count(hit[:measured, :measured]) > budget:
+                measured -= 1
+            if measured < min(n, self.max_points):
+                print(f"📏 限流预算 {budget} 次请求，高德测距点数减少到 {measured if measured > 1 else 0}")
+
+            # 按终点列出缓存未命中的起点
+            missing: Dict[int, List[int]] = {}
+            if measured > 1:
+                for j in range(measured):
+                    origins = np.flatnonzero(~hit[:measured, j]).tolist()
+                    if origins:
+                        missing[j] = origins
+
+            results = await asyncio.gather(*[
+                self._fetch_column(points, origins[start:start + MAX_ORIGINS], j, distance_type)
+                for j, origins in missing.items()
+                for start in range(0, len(origins), MAX_ORIGINS)
+            ], return_exceptions=True)
+
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"⚠️ 高德测距失败，使用直线距离估算: {str(result)}")
+                    continue
+                for i, j, distance, duration in result:
+                    distances[i, j] = distance
+                    durations[i, j] = duration
+                    estimated[i, j] = False
+                    self.cache.set((keys[i], keys[j], distance_type), (distance, duration), size=64)
+
+        return DistanceMatrix([p[0] for p in points], distances, durations, estimated)
+
+    async def _fetch_column(
+        self,
+        points: List[Point],
+        origins: List[int],
+        dest: int,
+        distance_type: int,
+    ) -> List[Tuple[int, int, float, float]]:
+        """
+        请求多个起点到同一终点的路程/耗时
+
+        Returns:
+            (起点下标, 终点下标, 路程, 耗时) 列表
+        """
+        params = {
+            "origins": "|".join(_coord(points[i][1], points[i][2]) for i in origins),
+            "destination": _coord(points[dest][1], points[dest][2]),
+            "type": str(distance_type),
+            "output": "json",
+        }
+        data = await amap_aget(DISTANCE_URL, params)
+        if data.get("status") != "1":
+            raise ValueError(data.get("info", "未知错误"))
+
+        rows = []
+        for item in data.get("results", []):
+            try:
+                origin = origins[int(item["origin_id"]) - 1]
+                rows.append((origin, dest, float(item["distance"]), float(item["duration"])))
+            except (KeyError, IndexError, TypeError, ValueError):
+                # 单个点对不可达(如步行距离过远)时保留估算值
+                continue
+        return rows
+
+
+def _request_count(hit: np.ndarray) -> int:
+    """测量未命中缓存的点对需要的请求数(每个终点每 MAX_ORIGINS 个起点一次)"""
+    misses = (~hit).sum(axis=0)
+    return int(np.ceil(misses / MAX_ORIGINS).sum())
+
+
+# 全局服务实例
+_distance_matrix_service: Optional[DistanceMatrixService] = None
+
+
+def get_distance_matrix_service() -> DistanceMatrixService:
+    """获取距离矩阵服务实例(单例模式)"""
+    global _distance_matrix_service
+
+    if _distance_matrix_service is None:
+        settings = get_settings()
+        cache = TTLCache(
+            name="amap_distance",
+            max_entries=settings.distance_cache_max_entries,
+            max_bytes=settings.distance_cache_max_entries * 64,
+            default_ttl=settings.distance_cache_ttl,
+        )
+        _distance_matrix_service = DistanceMatrixService(
+            settings.distance_matrix_max_points, cache, settings.distance_matrix_max_wait
+        )
+
+    return _distance_matrix_service
@@ -0,0 +1,172 @@
+"""地理编码缓存服务 - 城市/地址 → adcode 与坐标的持久化缓存"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Any
+from ..config import get_settings
+from ..models.database import SessionLocal, GeocodeCacheEntry
+
+
+def normalize_address(address: str) -> str:
+    """规范化地址(去除空白)作为缓存键"""
+    return "".join(address.split())
+
+
+class GeocodeCache:
+    """
+    地理编码缓存
+
+    成功的查询结果写入SQLite并常驻内存；查询失败的地址只在内存中短暂缓存(负缓存)，
+    避免错误输入反复请求高德API。负缓存按写入顺序排列(即按过期时间排列)，
+    写入时清除已过期的条目，超出容量时淘汰最早写入的条目。
+    """
+
+    def __init__(self, negative_ttl: float = 300, negative_max_entries: int = 10000):
+        """
+        初始化缓存
+
+        Args:
+            negative_ttl: 负缓存过期时间(秒)
+            negative_max_entries: 负缓存最大条目数
+        """
+        self.negative_ttl = negative_ttl
+        self.negative_max_entries = negative_max_entries
+        self._entries: Dict[str, Dict[str, str]] = {}
+        self._negative: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def load(self) -> int:
+        """
+        从数据库加载全部缓存条目到内存
+
+        Returns:
+            加载的条目数
+        """
+        db = SessionLocal()
+        try:
+            rows = db.query(GeocodeCacheEntry).all()
+            with self._lock:
+                for row in rows:
+                    self._entries[row.address] = {
+                        "adcode": row.adcode or "",
+                        "location": row.location or "",
+                        "formatted_address": row.formatted_address or "",
+                        "city": row.city or "",
+                    }
+            return len(rows)
+        finally:
+            db.close()
+
+    def lookup(self, address: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """
+        查询缓存
+
+        Args:
+            address: 地址
+
+        Returns:
+            (是否命中, 地理编码结果)。命中负缓存时返回 (True, None)
+        """
+        key = normalize_address(address)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                return True, entry
+
+            expires_at = self._negative.get(key)
+            if expires_at is not None:
+                if expires_at > time.monotonic():
+                    self.negative_hits += 1
+                    return True, None
+                del self._negative[key]
+
+            self.misses += 1
+            return False, None
+
+    def put(self, address: str, entry: Dict[str, str]):
+        """
+        写入成功的地理编码结果(内存 + 数据库)
+
+        Args:
+            address: 地址
+            entry: 地理编码结果(adcode/location/formatted_address/city)
+        """
+        key = normalize_address(address)
+        with self._lock:
+            self._entries[key] = entry
+            self._negative.pop(key, None)
+
+        db = SessionLocal()
+        try:
+            db.merge(GeocodeCacheEntry(
+                address=key,
+                adcode=entry.get("adcode", ""),
+                location=entry.get("location", ""),
+                formatted_address=entry.get("formatted_address", ""),
+                city=entry.get("city", ""),
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ 地理编码缓存持久化失败: {str(e)}")
+        finally:
+            db.close()
+
+    def put_negative(self, address: str):
+        """记录查询失败的地址(仅内存，短时间有效)"""
+        key = normalize_address(address)
+        now = time.monotonic()
+        with self._lock:
+            self._negative.pop(key, None)
+            self._negative[key] = now + self.negative_ttl
+
+            # 最早写入的条目最先过期
+            while self._negative:
+                oldest_key, expires_at = next(iter(self._negative.items()))
+                if expires_at > now and len(self._negative) <= self.negative_max_entries:
+                    break
+                del self._negative[oldest_key]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "negative_entries": len(self._negative),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+            }
+
+
+# 全局缓存实例
+_geocode_cache: Optional[GeocodeCache] = None
+
+
+def get_geocode_cache() -> GeocodeCache:
+    """获取地理编码缓存实例(单例模式)"""
+    global _geocode_cache
+
+    if _geocode_cache is None:
+        settings = get_settings()
+        _geocode_cache = GeocodeCache(
+            negative_ttl=settings.geocode_negative_ttl,
+            negative_max_entries=settings.geocode_negative_max_entries
+        )
+
+    return _geocode_cache
+
+
+def load_geocode_cache():
+    """应用启动时从数据库预热地理编码缓存"""
+    try:
+        count = get_geocode_cache().load()
+        print(f"✅ 地理编码缓存加载完成，共 {count} 条")
+    except Exception as e:
+        print(f"⚠️ 地理编码缓存加载失败: {str(e)}")
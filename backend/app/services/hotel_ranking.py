@@ -0,0 +1,130 @@
+"""酒店排序 - 按离每天景点的距离、评分和价格为每天选择酒店"""
+
+from typing import List, NamedTuple, Optional
+import numpy as np
+from ..models.schemas import TripPlan
+from .spatial_index import haversine_cross
+
+# 评分每低1分折合的路程(米)
+RATING_WEIGHT = 1000.0
+
+# 价格每高出候选中位价1倍折合的路程(米)
+COST_WEIGHT = 2000.0
+
+# 缺少评分时按该评分计算
+DEFAULT_RATING = 4.0
+
+
+class HotelChoice(NamedTuple):
+    """酒店选择结果(下标指向传入的酒店数组)"""
+    hotels: List[int]  # 每天的酒店
+    distances: List[float]  # 每天酒店到当天景点中心的直线距离(米)
+    switches: int  # 换酒店的次数
+
+
+def parse_numbers(values: List[Optional[str]]) -> np.ndarray:
+    """把高德返回的评分/价格字符串转为数组，无法解析的为NaN"""
+    result = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            result[i] = float(value) if value else np.nan
+        except ValueError:
+            pass
+    return result
+
+
+def hotel_quality_cost(ratings: np.ndarray, costs: np.ndarray) -> np.ndarray:
+    """
+    评分和价格折合的路程代价(米)
+
+    Args:
+        ratings: 评分数组(NaN 表示未知)
+        costs: 每晚价格数组(NaN 表示未知)
+
+    Returns:
+        每个酒店的代价
+    """
+    ratings = np.where(np.isnan(ratings), DEFAULT_RATING, ratings)
+    quality = (5.0 - np.clip(ratings, 0.0, 5.0)) * RATING_WEIGHT
+
+    known = costs[~np.isnan(costs) & (costs > 0)]
+    if len(known):
+        median = float(np.median(known))
+        relative = np.where(np.isnan(costs) | (costs <= 0), 1.0, costs / median)
+        quality = quality + np.maximum(relative - 1.0, 0.0) * COST_WEIGHT
+    return quality
+
+
+def choose_hotels(
+    hotel_lons: np.ndarray,
+    hotel_lats: np.ndarray,
+    quality_cost: np.ndarray,
+    center_lons: np.ndarray,
+    center_lats: np.ndarray,
+    switch_penalty: float,
+) -> HotelChoice:
+    """
+    为每天选择酒店
+
+    每天的代价 = 往返当天景点中心的路程 + 评分/价格代价，每换一次酒店加 switch_penalty。
+    按天动态规划求总代价最小的酒店序列：换酒店省下的路程不足以抵消换酒店代价时，
+    整个行程住同一家酒店。
+
+    Args:
+        hotel_lons: 酒店经度数组
+        hotel_lats: 酒店纬度数组
+        quality_cost: 每个酒店的评分/价格代价(米)
+        center_lons: 每天景点中心经度(NaN 表示当天没有景点)
+        center_lats: 每天景点中心纬度
+        switch_penalty: 每次换酒店的代价(米)
+
+    Returns:
+        每天的酒店选择，没有候选酒店时 hotels 为空
+    """
+    days = len(center_lons)
+    if len(hotel_lons) == 0 or days == 0:
+        return HotelChoice(hotels=[], distances=[], switches=0)
+
+    distances = haversine_cross(hotel_lons, hotel_lats, center_lons, center_lats)
+    # 没有景点的天不计路程
+    distances = np.where(np.isnan(distances), 0.0, distances)
+    day_cost = 2 * distances + quality_cost[:, None]
+
+    # total[h]: 截至当天住在酒店 h 的最小总代价；back[d][h]: 前一天的酒店
+    total = day_cost[:, 0].copy()
+    back = np.zeros((days, len(hotel_lons)), dtype=np.intp)
+    for d in range(1, days):
+        best = int(np.argmin(total))
+        switch = total[best] + switch_penalty
+        stay = total <= switch
+        back[d] = np.where(stay, np.arange(len(hotel_lons)), best)
+        total = np.where(stay, total, switch) + day_cost[:, d]
+
+    hotels = [int(np.argmin(total))]
+    for d in range(days - 1, 0, -1):
+        hotels.append(int(back[d, hotels[-1]]))
+    hotels.reverse()
+
+    return HotelChoice(
+        hotels=hotels,
+        distances=[float(distances[h, d]) for d, h in enumerate(hotels)],
+        switches=sum(a != b for a, b in zip(hotels, hotels[1:])),
+    )
+
+
+def update_hotel_budget(plan: TripPlan):
+    """
+    按每天的酒店重新计算预算中的住宿费用(原地修改)
+
+    总计按各项之和重新计算，与 LLM 给出的原总计无关。
+
+    Args:
+        plan: 旅行计划，没有预算时不做改动
+    """
+    budget = plan.budget
+    if budget is None:
+        return
+    budget.total_hotels = sum(day.hotel.estimated_cost for day in plan.days if day.hotel)
+    budget.total = (
+        budget.total_attractions + budget.total_hotels + budget.total_meals + budget.total_transportation
+    )
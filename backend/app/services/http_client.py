@@ -0,0 +1,137 @@
+"""HTTP连接池服务 - 应用级共享的 httpx 客户端"""
+
+import json
+from typing import Any, Dict, Optional
+import httpx
+from ..config import get_settings
+from .amap_stub import AMAP_BASE_URL, AmapStubTransport, get_amap_stub, is_amap_stub_enabled
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库
+    orjson = None
+
+# 全局客户端实例
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_client: Optional[httpx.Client] = None
+
+
+def _build_limits() -> httpx.Limits:
+    """根据配置构建连接池限制"""
+    settings = get_settings()
+    return httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+
+
+def _http2_enabled() -> bool:
+    """检查是否启用HTTP/2(需要安装 h2 依赖)"""
+    settings = get_settings()
+    if not settings.http2_enabled:
+        return False
+
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("⚠️  已配置HTTP/2但未安装 h2 依赖，回退到HTTP/1.1 (pip install 'httpx[http2]')")
+        return False
+
+    return True
+
+
+def _amap_mounts() -> Optional[Dict[str, Any]]:
+    """配置为本地模拟时，将高德域名的请求路由到模拟 transport"""
+    if not is_amap_stub_enabled():
+        return None
+    return {AMAP_BASE_URL: AmapStubTransport(get_amap_stub())}
+
+
+def json_loads(content: bytes) -> Any:
+    """
+    解析JSON响应体(已安装 orjson 时使用 orjson)
+
+    Args:
+        content: 响应体字节
+
+    Returns:
+        解析后的对象
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    获取共享的异步HTTP客户端(单例模式)
+
+    Returns:
+        长连接复用的 httpx.AsyncClient
+    """
+    global _async_client
+
+    if _async_client is None or _async_client.is_closed:
+        settings = get_settings()
+        _async_client = httpx.AsyncClient(
+            timeout=settings.http_timeout,
+            limits=_build_limits(),
+            http2=_http2_enabled(),
+            mounts=_amap_mounts(),
+        )
+
+    return _async_client
+
+
+def get_sync_http_client() -> httpx.Client:
+    """
+    获取共享的同步HTTP客户端(单例模式)
+
+    Returns:
+        长连接复用的 httpx.Client
+    """
+    global _sync_client
+
+    if _sync_client is None or _sync_client.is_closed:
+        settings = get_settings()
+        _sync_client = httpx.Client(
+            timeout=settings.http_timeout,
+            limits=_build_limits(),
+            http2=_http2_enabled(),
+            mounts=_amap_mounts(),
+        )
+
+    return _sync_client
+
+
+async def init_http_clients():
+    """应用启动时创建连接池"""
+    settings = get_settings()
+    get_async_http_client()
+    get_sync_http_client()
+    print(
+        f"✅ HTTP连接池初始化完成 "
+        f"(最大连接数: {settings.http_max_connections}, "
+        f"keep-alive: {settings.http_max_keepalive_connections})"
+    )
+    if is_amap_stub_enabled():
+        print(
+            f"⚠️  高德API使用本地模拟 (延迟中位数: {settings.amap_stub_latency_ms}ms, "
+            f"错误率: {settings.amap_stub_error_rate}, 超限率: {settings.amap_stub_quota_error_rate})"
+        )
+
+
+async def close_http_clients():
+    """应用关闭时释放连接池"""
+    global _async_client, _sync_client
+
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+    print("✅ HTTP连接池已关闭")
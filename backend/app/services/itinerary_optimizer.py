@@ -0,0 +1,310 @@
+"""行程优化器 - 不依赖LLM的景点分天、游览排序和酒店分配"""
+
+import math
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# 每度纬度对应的米数(城市范围内按等距投影计算平面距离)
+METERS_PER_DEGREE = 111_320.0
+
+# 均衡 k-means 的最大迭代次数
+KMEANS_ITERATIONS = 8
+
+# 2-opt 最多扫描轮数
+TWO_OPT_MAX_PASSES = 20
+
+
+class DayAssignment(NamedTuple):
+    """单日优化结果(下标均指向传入的坐标数组)"""
+    attractions: List[int]  # 当天景点，按游览顺序
+    hotel: Optional[int]  # 当天酒店，无酒店候选时为None
+    hotel_distance: float  # 酒店到当天景点中心的直线距离(米)
+    route_distance: float  # 酒店 → 景点 → 酒店(无酒店时为景点之间)的直线路程(米)
+
+
+def project(lons: np.ndarray, lats: np.ndarray, lat0: float) -> np.ndarray:
+    """
+    等距投影到平面(米)
+
+    Args:
+        lons: 经度数组
+        lats: 纬度数组
+        lat0: 投影基准纬度
+
+    Returns:
+        n×2 平面坐标
+    """
+    return np.column_stack((
+        lons * METERS_PER_DEGREE * math.cos(math.radians(lat0)),
+        lats * METERS_PER_DEGREE,
+    ))
+
+
+def _sq_distances(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """点到中心的平方距离矩阵"""
+    diff = points[:, None, :] - centers[None, :, :]
+    return np.einsum("ijk,ijk->ij", diff, diff)
+
+
+def _init_centers(xy: np.ndarray, k: int) -> np.ndarray:
+    """最远点初始化(从最靠近整体中心的点开始，结果确定)"""
+    first = int(np.argmin(_sq_distances(xy, xy.mean(axis=0, keepdims=True))[:, 0]))
+    chosen = [first]
+    min_dist = _sq_distances(xy, xy[[first]])[:, 0]
+    for _ in range(1, k):
+        nxt = int(np.argmax(min_dist))
+        chosen.append(nxt)
+        min_dist = np.minimum(min_dist, _sq_distances(xy, xy[[nxt]])[:, 0])
+    return xy[chosen].copy()
+
+
+def _balanced_assign(dist: np.ndarray, capacity: int) -> np.ndarray:
+    """
+    带容量限制的贪心分配
+
+    "次优与最优之差"(regret)大的点先选，每个点分到仍有空位的最近中心。
+    """
+    n, k = dist.shape
+    prefs = np.argsort(dist, axis=1, kind="stable")
+    if k > 1:
+        ranked = np.take_along_axis(dist, prefs[:, :2], axis=1)
+        order = np.argsort(ranked[:, 0] - ranked[:, 1], kind="stable")
+    else:
+        order = np.arange(n)
+
+    labels = np.empty(n, dtype=np.intp)
+    counts = [0] * k
+    pref_rows = prefs.tolist()
+    for p in order.tolist():
+        for c in pref_rows[p]:
+            if counts[c] < capacity:
+                labels[p] = c
+                counts[c] += 1
+                break
+    return labels
+
+
+def _fill_deficient(xy: np.ndarray, labels: np.ndarray, centers: np.ndarray, k: int, minimum: int):
+    """
+    为成员少于 minimum 的簇补足成员(原地修改)
+
+    每次从成员多于 minimum 的簇中移入离该簇中心最近的点。
+    点数不少于 minimum * k 时总能补足(总有簇多于 minimum)。
+    """
+    counts = np.bincount(labels, minlength=k)
+    for c in np.flatnonzero(counts < minimum).tolist():
+        while counts[c] < minimum:
+            movable = np.flatnonzero(counts[labels] > minimum)
+            if len(movable) == 0:
+                return
+            p = movable[int(np.argmin(_sq_distances(xy[movable], centers[[c]])[:, 0]))]
+            counts[labels[p]] -= 1
+            labels[p] = c
+            counts[c] += 1
+
+
+def balanced_kmeans(xy: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS) -> np.ndarray:
+    """
+    均衡 k-means 聚类
+
+    Args:
+        xy: n×2 平面坐标
+        k: 簇数(超过点数时按点数计)
+        iterations: 最大迭代次数
+
+    Returns:
+        每个点的簇编号(每簇 floor(n/k) ~ ceil(n/k) 个点)
+    """
+    n = len(xy)
+    k = min(k, n)
+    if k <= 1:
+        return np.zeros(n, dtype=np.intp)
+
+    capacity = math.ceil(n / k)
+    minimum = n // k
+    centers = _init_centers(xy, k)
+    labels = np.full(n, -1, dtype=np.intp)
+
+    for _ in range(iterations):
+        new_labels = _balanced_assign(_sq_distances(xy, centers), capacity)
+        _fill_deficient(xy, new_labels, centers, k, minimum)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        counts = np.bincount(labels, minlength=k).astype(np.float64)
+        centers = np.column_stack((
+            np.bincount(labels, weights=xy[:, 0], minlength=k),
+            np.bincount(labels, weights=xy[:, 1], minlength=k),
+        )) / np.maximum(counts, 1.0)[:, None]
+
+    return labels
+
+
+def _pairwise(xy: np.ndarray) -> np.ndarray:
+    """平面坐标两两距离"""
+    return np.sqrt(_sq_distances(xy, xy))
+
+
+def _nearest_neighbour(dist: np.ndarray, start: int) -> np.ndarray:
+    """最近邻构造初始路线"""
+    m = len(dist)
+    visited = np.zeros(m, dtype=bool)
+    route = [start]
+    visited[start] = True
+    for _ in range(m - 1):
+        row = np.where(visited, np.inf, dist[route[-1]])
+        nxt = int(np.argmin(row))
+        route.append(nxt)
+        visited[nxt] = True
+    return np.array(route, dtype=np.intp)
+
+
+def two_opt(route: np.ndarray, dist: np.ndarray, closed: bool) -> np.ndarray:
+    """
+    2-opt 改进(起点固定)
+
+    Args:
+        route: 初始路线(节点下标)
+        dist: 对称距离矩阵
+        closed: 是否回到起点(环路)
+
+    Returns:
+        改进后的路线
+    """
+    route = route.copy()
+    m = len(route)
+    if m < 4:
+        return route
+
+    for _ in range(TWO_OPT_MAX_PASSES):
+        improved = False
+        for i in range(m - 2):
+            a, b = route[i], route[i + 1]
+            js = np.arange(i + 2, m)
+            c = route[js]
+            if closed:
+                d = route[(js + 1) % m]
+                gain = dist[a, b] + dist[c, d] - dist[a, c] - dist[b, d]
+            else:
+                # 开放路线最后一个点之后没有边
+                nxt = np.minimum(js + 1, m - 1)
+                tail = js < m - 1
+                d = route[nxt]
+                gain = dist[a, b] - dist[a, c] + np.where(tail, dist[c, d] - dist[b, d], 0.0)
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-9:
+                j = int(js[best])
+                route[i + 1:j + 1] = route[i + 1:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return route
+
+
+def route_length(route: np.ndarray, dist: np.ndarray, closed: bool) -> float:
+    """路线总长度"""
+    if len(route) < 2:
+        return 0.0
+    total = float(dist[route[:-1], route[1:]].sum())
+    if closed:
+        total += float(dist[route[-1], route[0]])
+    return total
+
+
+def order_stops(xy: np.ndarray, hotel_xy: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float]:
+    """
+    排定单日游览顺序(最近邻 + 2-opt)
+
+    Args:
+        xy: m×2 景点平面坐标(m ≥ 1)
+        hotel_xy: 酒店平面坐标，提供时为从酒店出发并返回的环路，否则为从最外侧景点出发的开放路线
+
+    Returns:
+        (游览顺序(xy 的行下标), 路线长度(米))
+    """
+    if hotel_xy is not None:
+        nodes = np.vstack((hotel_xy[None, :], xy))
+        dist = _pairwise(nodes)
+        route = two_opt(_nearest_neighbour(dist, 0), dist, closed=True)
+        return route[1:] - 1, route_length(route, dist, closed=True)
+
+    dist = _pairwise(xy)
+    start = int(np.argmax(_sq_distances(xy, xy.mean(axis=0, keepdims=True))[:, 0]))
+    route = two_opt(_nearest_neighbour(dist, start), dist, closed=False)
+    return route, route_length(route, dist, closed=False)
+
+
+def _order_day(xy: np.ndarray, members: np.ndarray, hotel_xy: Optional[np.ndarray]):
+    """单日排序"""
+    order, length = order_stops(xy[members], hotel_xy)
+    return members[order], length
+
+
+def optimize_itinerary(
+    lons: np.ndarray,
+    lats: np.ndarray,
+    days: int,
+    hotel_lons: Optional[np.ndarray] = None,
+    hotel_lats: Optional[np.ndarray] = None,
+    per_day: Optional[int] = None,
+) -> List[DayAssignment]:
+    """
+    分天、排序并分配酒店
+
+    1. 均衡 k-means 把景点分成 days 个紧凑的簇；
+    2. 每簇按传入顺序(即相关度)保留前 per_day 个景点；
+    3. 为每天分配离景点中心最近的酒店；
+    4. 最近邻 + 2-opt 确定游览顺序。
+    距离按等距投影的平面直线距离计算。各天按所含最靠前(最相关)的景点排序。
+
+    Args:
+        lons: 景点经度数组(按相关度排序)
+        lats: 景点纬度数组
+        days: 天数
+        hotel_lons: 酒店经度数组
+        hotel_lats: 酒店纬度数组
+        per_day: 每天最多景点数(None表示不限)
+
+    Returns:
+        长度为 days 的单日结果列表(景点不足时后面的天没有景点)
+    """
+    n = len(lons)
+    if days <= 0:
+        return []
+
+    has_hotels = hotel_lons is not None and hotel_lats is not None and len(hotel_lons) > 0
+    all_lats = np.concatenate((lats, hotel_lats)) if has_hotels else lats
+    lat0 = float(all_lats.mean()) if len(all_lats) else 0.0
+
+    xy = project(lons, lats, lat0)
+    hotel_xy = project(hotel_lons, hotel_lats, lat0) if has_hotels else None
+
+    labels = balanced_kmeans(xy, days) if n else np.empty(0, dtype=np.intp)
+    clusters = [np.flatnonzero(labels == c) for c in range(min(days, n))]
+    clusters.sort(key=lambda members: int(members[0]))
+
+    result = []
+    for members in clusters:
+        if per_day is not None:
+            members = members[:per_day]
+
+        hotel = None
+        hotel_distance = 0.0
+        if hotel_xy is not None:
+            center = xy[members].mean(axis=0, keepdims=True)
+            hotel_dist = _sq_distances(hotel_xy, center)[:, 0]
+            hotel = int(np.argmin(hotel_dist))
+            hotel_distance = float(math.sqrt(hotel_dist[hotel]))
+
+        ordered, length = _order_day(xy, members, hotel_xy[hotel] if hotel is not None else None)
+        result.append(DayAssignment(
+            attractions=ordered.tolist(),
+            hotel=hotel,
+            hotel_distance=hotel_distance,
+            route_distance=length,
+        ))
+
+    while len(result) < days:
+        result.append(DayAssignment(attractions=[], hotel=None, hotel_distance=0.0, route_distance=0.0))
+    return result
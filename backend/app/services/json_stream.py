@@ -0,0 +1,121 @@
+"""增量JSON解析 - 从流式LLM输出中提取已完整的数组元素"""
+
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JSONArrayStreamParser:
+    """
+    增量解析顶层对象中某个数组字段的元素
+
+    逐段喂入LLM输出的文本，每当目标数组(如 "days")中的一个对象元素闭合时，
+    立即解析并返回该元素。只维护括号栈和字符串状态，每个字符只扫描一次；
+    JSON之前的说明文字或 ```json 代码块标记会被忽略。
+    """
+
+    def __init__(self, key: str):
+        """
+        初始化解析器
+
+        Args:
+            key: 顶层对象中要提取的数组字段名
+        """
+        self.key = key
+        self.count = 0  # 已闭合的元素数量(含解析失败的)
+
+        self._chunks: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._last_string: Optional[str] = None
+        self._array_depth: Optional[int] = None  # 目标数组内元素所在的栈深度，-1 表示数组已结束
+        # 跨片段未闭合的元素 / 顶层字符串在之前片段中的部分(None 表示当前不在其中)
+        self._element_parts: Optional[List[str]] = None
+        self._string_parts: Optional[List[str]] = None
+
+    @property
+    def text(self) -> str:
+        """已喂入的全部文本"""
+        if len(self._chunks) > 1:
+            self._chunks[:] = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, chunk: str) -> List[Tuple[int, Any]]:
+        """
+        喂入一段文本
+
+        只扫描新片段；未闭合的元素和顶层字符串按片段暂存，闭合时才拼接，总耗时与文本长度成线性。
+
+        Args:
+            chunk: 新的输出片段
+
+        Returns:
+            本次新闭合的 (元素下标, 元素) 列表，解析失败的元素会被跳过
+        """
+        self._chunks.append(chunk)
+        completed = []
+        # 未闭合的元素 / 顶层字符串在本片段中的起始位置
+        element_from = 0 if self._element_parts is not None else None
+        string_from = 0 if self._string_parts is not None else None
+
+        for i, char in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._string_parts is not None:
+                        self._last_string = "".join(self._string_parts) + chunk[string_from:i]
+                        self._string_parts = None
+                continue
+
+            if char == '"':
+                self._in_string = True
+                # 只需记住顶层对象中的字符串(可能是字段名)
+                if len(self._stack) == 1:
+                    self._string_parts = []
+                    string_from = i + 1
+            elif char in "{[":
+                if (
+                    char == "["
+                    and self._array_depth is None
+                    and self._stack == ["{"]
+                    and self._last_string == self.key
+                ):
+                    self._array_depth = 2
+                elif char == "{" and self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._element_parts = []
+                    element_from = i
+                self._stack.append(char)
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if self._array_depth is None:
+                    continue
+                if len(self._stack) == self._array_depth and self._element_parts is not None:
+                    element = self._parse("".join(self._element_parts) + chunk[element_from:i + 1])
+                    self._element_parts = None
+                    if element is not None:
+                        completed.append((self.count, element))
+                    self.count += 1
+                elif len(self._stack) < self._array_depth:
+                    # 目标数组结束
+                    self._array_depth = -1
+            elif char == "," and len(self._stack) == 1:
+                self._last_string = None
+
+        if self._element_parts is not None:
+            self._element_parts.append(chunk[element_from:])
+        if self._string_parts is not None:
+            self._string_parts.append(chunk[string_from:])
+        return completed
+
+    def _parse(self, raw: str) -> Optional[Any]:
+        """解析单个元素"""
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
@@ -1,15 +1,50 @@
 """LLM服务模块"""
 
 import os
-from typing import Optional
+from typing import Any, AsyncIterator, Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
 from ..config import get_settings
+from .resilience import call_with_resilience, call_with_resilience_sync, get_circuit_breaker, is_retryable
 
 # 全局LLM实例
 _llm_instance: Optional[BaseChatModel] = None
 
 
+class ResilientChatOpenAI(ChatOpenAI):
+    """
+    带重试和熔断的 ChatOpenAI
+
+    重试由 resilience 统一处理(底层客户端不再自行重试)；
+    流式调用只做熔断检查，已输出内容后不再重试。
+    """
+
+    def _generate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        generate = super()._generate
+        return call_with_resilience_sync("llm", lambda: generate(*args, **kwargs))
+
+    async def _agenerate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        agenerate = super()._agenerate
+        return await call_with_resilience("llm", lambda: agenerate(*args, **kwargs))
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        breaker = get_circuit_breaker("llm")
+        probe = breaker.allow()
+        try:
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+        except Exception as e:
+            if is_retryable(e):
+                breaker.record_failure()
+            raise
+        else:
+            breaker.record_success()
+        finally:
+            # 被取消或提前关闭(GeneratorExit)时释放探测名额
+            breaker.release(probe)
+
+
 def get_llm() -> BaseChatModel:
     """
     获取LLM实例(单例模式)
@@ -33,12 +68,13 @@ def get_llm() -> BaseChatModel:
             )
         
         # 创建 ChatOpenAI 实例
-        _llm_instance = ChatOpenAI(
+        _llm_instance = ResilientChatOpenAI(
             api_key=api_key,
             base_url=base_url if base_url else None,
             model=model,
             temperature=0.7,
             timeout=60,
+            max_retries=0,  # 重试由 ResilientChatOpenAI 统一处理
         )
         
         print(f"✅ LLM服务初始化成功")
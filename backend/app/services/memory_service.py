@@ -218,6 +218,24 @@ def delete_trip_history(db: Session, trip_id: int, user_id: int) -> bool:
     return True
 
 
+def get_attraction_popularity(db: Session, city: str, limit: int = 200) -> Dict[str, int]:
+    """统计某城市最近的历史行程(所有用户)中各景点出现的次数，按POI ID计，缺少ID时按名称"""
+    trips = db.query(TripHistory.plan_data).filter(
+        TripHistory.city == city
+    ).order_by(
+        TripHistory.created_at.desc()
+    ).limit(limit).all()
+    
+    counts: Dict[str, int] = {}
+    for (plan_data,) in trips:
+        for day in (plan_data or {}).get("days", []):
+            for attraction in day.get("attractions", []):
+                key = attraction.get("poi_id") or attraction.get("name")
+                if key:
+                    counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
 def extract_user_preferences_from_request(request: TripRequest) -> Dict[str, Any]:
     """从请求中提取用户偏好"""
     preferences = {
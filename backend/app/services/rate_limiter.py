@@ -0,0 +1,221 @@
+"""限流服务 - 高德API Key 令牌桶限流与多Key轮换"""
+
+import time
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import get_settings
+
+# 高德返回的配额/QPS超限错误(info字段)
+AMAP_QPS_EXCEEDED = {
+    "CUQPS_HAS_EXCEEDED_THE_LIMIT",
+    "CKQPS_HAS_EXCEEDED_THE_LIMIT",
+    "CQPS_HAS_EXCEEDED_THE_LIMIT",
+    "ACCESS_TOO_FREQUENT",
+}
+AMAP_DAILY_EXCEEDED = {
+    "DAILY_QUERY_OVER_LIMIT",
+    "USER_DAILY_QUERY_OVER_LIMIT",
+}
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    采用预约方式：调用方立即扣减令牌(允许为负)，并按欠账计算需要等待的时间，
+    从而保证排队顺序且不会拒绝请求。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数(QPS)
+            capacity: 桶容量(突发量)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._disabled_until = 0.0
+
+    def _refill(self, now: float):
+        """按流逝时间补充令牌"""
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def available(self, now: float) -> float:
+        """当前可用令牌数(被禁用时视为无可用令牌)"""
+        self._refill(now)
+        if self._disabled_until > now:
+            return float("-inf")
+        return self._tokens
+
+    def reserve(self, now: float, tokens: float = 1) -> float:
+        """
+        预约令牌
+
+        Returns:
+            需要等待的秒数
+        """
+        self._refill(now)
+        self._tokens -= tokens
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    def drain(self):
+        """清空令牌(收到QPS超限错误时调用)"""
+        self._tokens = min(self._tokens, 0.0)
+
+    def disable(self, seconds: float):
+        """在一段时间内不再选择该桶(日配额用尽时调用)"""
+        self._disabled_until = time.monotonic() + seconds
+
+
+class AmapKeyPool:
+    """
+    高德API Key 池
+
+    每个Key一个令牌桶，按剩余令牌数选择Key，令牌不足时排队等待而不是直接失败。
+    """
+
+    def __init__(self, keys: List[str], qps: float, burst: int):
+        """
+        初始化Key池
+
+        Args:
+            keys: API Key 列表
+            qps: 单个Key的QPS上限
+            burst: 单个Key的突发量
+        """
+        self.keys = keys
+        self._buckets: Dict[str, TokenBucket] = {key: TokenBucket(qps, burst) for key in keys}
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.waited_calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.quota_errors = 0
+
+    def _reserve(self, tokens: float) -> Tuple[str, float]:
+        """选择剩余令牌最多的Key并预约"""
+        now = time.monotonic()
+        with self._lock:
+            key = max(self.keys, key=lambda k: self._buckets[k].available(now))
+            wait = self._buckets[key].reserve(now, tokens)
+        return key, wait
+
+    def _record(self, wait: float):
+        """记录等待时间指标"""
+        self.calls += 1
+        if wait > 0:
+            self.waited_calls += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    async def acquire(self, tokens: float = 1) -> str:
+        """
+        异步获取可用的API Key(必要时等待)
+
+        Args:
+            tokens: 需要的令牌数
+
+        Returns:
+            API Key
+        """
+        key, wait = self._reserve(tokens)
+        self._record(wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return key
+
+    def acquire_sync(self, tokens: float = 1) -> str:
+        """同步获取可用的API Key(必要时阻塞等待)"""
+        key, wait = self._reserve(tokens)
+        self._record(wait)
+        if wait > 0:
+            time.sleep(wait)
+        return key
+
+    def tokens_within(self, seconds: float) -> float:
+        """
+        在给定等待时间内所有Key合计可获得的令牌数(不预约)
+
+        Args:
+            seconds: 可接受的等待时间(秒)
+
+        Returns:
+            令牌数
+        """
+        now = time.monotonic()
+        with self._lock:
+            return sum(
+                max(0.0, bucket.available(now) + bucket.rate * seconds)
+                for bucket in self._buckets.values()
+            )
+
+    def report_error(self, key: str, info: str) -> bool:
+        """
+        根据高德返回的错误信息调整Key状态
+
+        Args:
+            key: 使用的API Key
+            info: 高德响应中的 info 字段
+
+        Returns:
+            该错误是否可以通过稍后(或换Key)重试解决
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return False
+
+        if info in AMAP_QPS_EXCEEDED:
+            self.quota_errors += 1
+            with self._lock:
+                bucket.drain()
+            return True
+
+        if info in AMAP_DAILY_EXCEEDED and len(self.keys) > 1:
+            self.quota_errors += 1
+            print(f"⚠️ 高德API Key 日配额已用尽，暂停使用: {key[:6]}***")
+            with self._lock:
+                bucket.disable(3600)
+            return True
+
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """获取限流统计信息"""
+        return {
+            "keys": len(self.keys),
+            "calls": self.calls,
+            "waited_calls": self.waited_calls,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "avg_wait_seconds": round(self.total_wait / self.waited_calls, 4) if self.waited_calls else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3),
+            "quota_errors": self.quota_errors,
+        }
+
+
+# 全局Key池实例
+_key_pool: Optional[AmapKeyPool] = None
+
+
+def get_amap_key_pool() -> AmapKeyPool:
+    """获取高德API Key池(单例模式)"""
+    global _key_pool
+
+    if _key_pool is None:
+        settings = get_settings()
+        keys = settings.get_amap_api_keys()
+        if not keys:
+            raise ValueError("高德地图API Key未配置,请在.env文件中设置AMAP_API_KEY")
+        _key_pool = AmapKeyPool(keys, qps=settings.amap_qps, burst=settings.amap_burst)
+
+    return _key_pool
@@ -0,0 +1,301 @@
+"""容错服务 - 外部调用的重试退避与熔断"""
+
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from ..config import get_settings
+
+T = TypeVar("T")
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开时快速失败"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} 服务暂时不可用(熔断中，{retry_after:.1f}秒后重试)")
+
+
+class RetryableError(Exception):
+    """
+    上游返回的可重试错误(如高德QPS超限)
+
+    Attributes:
+        payload: 原始响应，重试耗尽后调用方可直接使用
+        trip_breaker: 是否计入熔断失败次数
+    """
+
+    def __init__(self, message: str, payload: Any = None, trip_breaker: bool = True):
+        super().__init__(message)
+        self.payload = payload
+        self.trip_breaker = trip_breaker
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """判断异常是否值得重试(网络错误、超时、429/5xx)"""
+    if isinstance(exc, RetryableError):
+        return True
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+
+    # httpx / requests / openai 的状态码错误
+    status_code = getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    if status_code is None and response is not None:
+        status_code = getattr(response, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+
+    # httpx.TransportError / requests.ConnectionError / openai.APIConnectionError 等
+    name = type(exc).__name__
+    return any(marker in name for marker in ("Timeout", "Connect", "Transport", "Network", "Protocol"))
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    - closed: 正常放行，连续失败达到阈值后打开
+    - open: 快速失败，recovery_timeout 后进入半开
+    - half_open: 只放行一个探测请求，成功则关闭，失败则重新打开；
+      探测被取消或遇到不可重试错误时只释放探测名额，状态不变
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30):
+        """
+        初始化熔断器
+
+        Args:
+            name: 依赖名称
+            failure_threshold: 连续失败多少次后打开
+            recovery_timeout: 打开后多久进入半开(秒)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.total_failures = 0
+        self.total_rejected = 0
+
+    def allow(self) -> bool:
+        """
+        检查是否放行请求
+
+        Returns:
+            是否为半开状态下的探测请求(调用结束后须通过 release 释放)
+
+        Raises:
+            CircuitOpenError: 熔断器打开时
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self.total_rejected += 1
+            retry_after = max(0.0, self.recovery_timeout - (now - self.opened_at))
+            raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        """记录成功调用"""
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            if self.state != self.CLOSED:
+                print(f"✅ 熔断器恢复: {self.name}")
+            self.state = self.CLOSED
+
+    def release(self, probe: bool):
+        """
+        释放探测名额，不改变熔断状态和失败计数
+
+        Args:
+            probe: allow() 的返回值，非探测请求时不做任何事
+        """
+        if not probe:
+            return
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """记录失败调用"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"⚠️ 熔断器打开: {self.name} (连续失败 {self.consecutive_failures} 次)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        with self._lock:
+            state = self.state
+            if state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                state = self.HALF_OPEN
+            return {
+                "state": state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "total_rejected": self.total_rejected,
+            }
+
+
+# 全局熔断器注册表
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """获取指定依赖的熔断器(按名称单例)"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            settings = get_settings()
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=settings.circuit_failure_threshold,
+                recovery_timeout=settings.circuit_recovery_timeout,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def get_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """获取所有熔断器状态(用于健康检查)"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def _backoff_delay(attempt: int) -> float:
+    """指数退避 + 抖动(equal jitter)"""
+    settings = get_settings()
+    delay = min(settings.retry_max_delay, settings.retry_delay * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _on_error(breaker: CircuitBreaker, exc: Exception, probe: bool) -> bool:
+    """更新熔断器并返回该异常是否可重试"""
+    retryable = is_retryable(exc)
+    if retryable and getattr(exc, "trip_breaker", True):
+        breaker.record_failure()
+    else:
+        # 4xx/解析错误等既不说明依赖故障，也不能证明依赖已恢复
+        breaker.release(probe)
+    return retryable
+
+
+async def call_with_resilience(
+    name: str,
+    fn: Callable[[], Awaitable[T]],
+    max_retries: Optional[int] = None
+) -> T:
+    """
+    异步调用外部依赖(重试 + 熔断)
+
+    Args:
+        name: 依赖名称(amap/unsplash/llm)
+        fn: 发起调用的协程函数，每次重试都会重新调用
+        max_retries: 最大重试次数，默认使用配置 max_retries
+
+    Returns:
+        调用结果
+    """
+    settings = get_settings()
+    retries = settings.max_retries if max_retries is None else max_retries
+    deadline = time.monotonic() + settings.task_timeout
+    breaker = get_circuit_breaker(name)
+
+    attempt = 0
+    while True:
+        probe = breaker.allow()
+        try:
+            result = await fn()
+        except Exception as e:
+            retryable = _on_error(breaker, e, probe)
+            delay = _backoff_delay(attempt)
+            if not retryable or attempt >= retries or time.monotonic() + delay > deadline:
+                raise
+            print(f"🔁 {name} 调用失败，{delay:.2f}秒后重试({attempt + 1}/{retries}): {str(e)}")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # 被取消(如SSE客户端断开)时不计成功或失败，只释放探测名额
+            breaker.release(probe)
+            raise
+
+        breaker.record_success()
+        return result
+
+
+def call_with_resilience_sync(
+    name: str,
+    fn: Callable[[], T],
+    max_retries: Optional[int] = None
+) -> T:
+    """
+    同步调用外部依赖(重试 + 熔断)
+
+    Args:
+        name: 依赖名称(amap/unsplash/llm)
+        fn: 发起调用的函数，每次重试都会重新调用
+        max_retries: 最大重试次数，默认使用配置 max_retries
+
+    Returns:
+        调用结果
+    """
+    settings = get_settings()
+    retries = settings.max_retries if max_retries is None else max_retries
+    deadline = time.monotonic() + settings.task_timeout
+    breaker = get_circuit_breaker(name)
+
+    attempt = 0
+    while True:
+        probe = breaker.allow()
+        try:
+            result = fn()
+        except Exception as e:
+            retryable = _on_error(breaker, e, probe)
+            delay = _backoff_delay(attempt)
+            if not retryable or attempt >= retries or time.monotonic() + delay > deadline:
+                raise
+            print(f"🔁 {name} 调用失败，{delay:.2f}秒后重试({attempt + 1}/{retries}): {str(e)}")
+            time.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            breaker.release(probe)
+            raise
+
+        breaker.record_success()
+        return result
@@ -0,0 +1,171 @@
+"""每日路线服务 - 获取每天的实际路线并压缩为 Encoded Polyline"""
+
+import asyncio
+from typing import List, Optional
+import numpy as np
+from ..config import get_settings
+from ..models.schemas import DayPlan, DayRoute, Location, TripPlan
+from ..tools.amap_tools import AmapAPIError, AmapRouteTool
+
+# 高德驾车路线规划最多支持的途经点数
+MAX_WAYPOINTS = 16
+
+# 每度纬度对应的米数(等距投影近似，用于路线简化)
+METERS_PER_DEGREE = 111_320.0
+
+
+def simplify_polyline(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas–Peucker 路线简化
+
+    Args:
+        points: n×2 坐标数组(经度, 纬度)
+        tolerance: 容差(米)
+
+    Returns:
+        保留的坐标数组(首尾点始终保留)
+    """
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return points
+
+    # 投影到以路线中心纬度为基准的平面(米)
+    lat0 = np.radians(points[:, 1].mean())
+    xy = np.column_stack((
+        points[:, 0] * METERS_PER_DEGREE * np.cos(lat0),
+        points[:, 1] * METERS_PER_DEGREE,
+    ))
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        segment = xy[end] - xy[start]
+        offsets = xy[start + 1:end] - xy[start]
+        length = np.hypot(segment[0], segment[1])
+        if length == 0:
+            dists = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            dists = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+
+        farthest = int(np.argmax(dists))
+        if dists[farthest] > tolerance:
+            mid = start + 1 + farthest
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+
+    return points[keep]
+
+
+def encode_polyline(points: np.ndarray, precision: int = 5) -> str:
+    """
+    编码为 Encoded Polyline 字符串(纬度在前)
+
+    Args:
+        points: n×2 坐标数组(经度, 纬度)
+        precision: 小数精度
+
+    Returns:
+        编码后的字符串
+    """
+    if len(points) == 0:
+        return ""
+
+    coords = np.round(points[:, ::-1] * (10 ** precision)).astype(np.int64)
+    deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+
+    chars = []
+    for value in deltas.ravel().tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return "".join(chars)
+
+
+def _valid(location: Optional[Location]) -> bool:
+    """坐标是否可用于路线规划"""
+    return location is not None and bool(location.longitude) and bool(location.latitude)
+
+
+def _coord(location: Location) -> str:
+    """格式化为高德坐标参数"""
+    return f"{location.longitude:.6f},{location.latitude:.6f}"
+
+
+def day_stops(day: DayPlan) -> List[Location]:
+    """当日途经的坐标: 酒店 → 景点 → 酒店(无酒店时从第一个景点到最后一个景点)"""
+    stops = [a.location for a in day.attractions if _valid(a.location)]
+    if day.hotel is not None and _valid(day.hotel.location) and stops:
+        stops = [day.hotel.location] + stops + [day.hotel.location]
+    return stops
+
+
+async def abuild_day_route(day: DayPlan, route_tool: AmapRouteTool, tolerance: float) -> Optional[DayRoute]:
+    """
+    获取单日路线(一次带途经点的路线规划请求)
+
+    Args:
+        day: 单日行程
+        route_tool: 路线规划工具
+        tolerance: 简化容差(米)
+
+    Returns:
+        当日路线，途经点不足时返回None
+    """
+    stops = day_stops(day)
+    if len(stops) < 2:
+        return None
+
+    waypoints = stops[1:-1]
+    if len(waypoints) > MAX_WAYPOINTS:
+        print(f"⚠️ 第{day.day_index + 1}天途经点超过{MAX_WAYPOINTS}个，只规划前{MAX_WAYPOINTS}个")
+        waypoints = waypoints[:MAX_WAYPOINTS]
+
+    distance, duration, points = await route_tool.aroute_geometry(
+        origin=_coord(stops[0]),
+        destination=_coord(stops[-1]),
+        waypoints=";".join(_coord(w) for w in waypoints) or None,
+    )
+
+    simplified = simplify_polyline(np.asarray(points, dtype=np.float64).reshape(-1, 2), tolerance)
+    return DayRoute(distance=distance, duration=duration, polyline=encode_polyline(simplified))
+
+
+async def attach_day_routes(plan: TripPlan) -> int:
+    """
+    为计划中的每一天获取实际路线(所有天并发)，写入 DayPlan.route
+
+    Args:
+        plan: 旅行计划
+
+    Returns:
+        成功获取路线的天数
+    """
+    settings = get_settings()
+    if not settings.day_route_enabled or not plan.days:
+        return 0
+
+    route_tool = AmapRouteTool()
+    results = await asyncio.gather(*[
+        abuild_day_route(day, route_tool, settings.route_simplify_tolerance)
+        for day in plan.days
+    ], return_exceptions=True)
+
+    routed = 0
+    for day, result in zip(plan.days, results):
+        if isinstance(result, AmapAPIError):
+            print(f"⚠️ 第{day.day_index + 1}天路线规划失败: {str(result)}")
+        elif isinstance(result, Exception):
+            print(f"⚠️ 第{day.day_index + 1}天路线规划异常: {str(result)}")
+        elif result is not None:
+            day.route = result
+            routed += 1
+    return routed
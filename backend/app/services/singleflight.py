@@ -0,0 +1,77 @@
+"""请求合并服务 - 相同的并发请求共享同一个上游调用(single-flight)"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+# 已注册的实例(用于统计展示)
+_flights: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """
+    single-flight 请求合并
+
+    同一个键在上游请求进行中时，后续调用方直接等待同一个任务的结果，
+    请求结束后立即移除，不引入任何缓存陈旧性。
+    """
+
+    def __init__(self, name: str):
+        """
+        初始化
+
+        Args:
+            name: 名称(用于统计)
+        """
+        self.name = name
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+        self.calls = 0  # 实际发起的上游调用数
+        self.coalesced = 0  # 被合并的调用方数量
+
+        _flights[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行(或加入进行中的)调用
+
+        Args:
+            key: 请求键，相同键的并发请求会被合并
+            fn: 发起上游请求的协程函数
+
+        Returns:
+            上游调用结果(异常会传播给所有调用方)
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.create_task(self._run(key, fn))
+            self._tasks[key] = task
+        else:
+            self.coalesced += 1
+
+        # shield: 单个调用方被取消时不影响其他等待者
+        return await asyncio.shield(task)
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """执行上游调用，结束后移除键"""
+        try:
+            return await fn()
+        finally:
+            self._tasks.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        total = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._tasks),
+            "coalesce_rate": round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+
+def get_singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """获取所有 single-flight 实例的统计信息"""
+    return {name: flight.stats() for name, flight in _flights.items()}
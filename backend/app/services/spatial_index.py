@@ -0,0 +1,244 @@
+"""空间索引服务 - 基于 geohash 分桶的本地POI邻近查询"""
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+from ..config import get_settings
+from ..models.poi_record import POIRecord
+
+# geohash 精度(经度/纬度各15位，相当于6位geohash，单元约1.1km×0.6km)
+GEOHASH_BITS = 15
+CELL_LON = 360.0 / (1 << GEOHASH_BITS)
+CELL_LAT = 180.0 / (1 << GEOHASH_BITS)
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 111_320.0
+
+# kNN 查询最多向外扩展的环数(约 30km)
+MAX_RINGS = 48
+
+
+def geohash_cell(lon: float, lat: float) -> Tuple[int, int]:
+    """坐标所在的 geohash 单元(经度格号, 纬度格号)"""
+    x = int((lon + 180.0) / CELL_LON)
+    y = int((lat + 90.0) / CELL_LAT)
+    return (min(x, (1 << GEOHASH_BITS) - 1), min(y, (1 << GEOHASH_BITS) - 1))
+
+
+def haversine(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    """两点间球面距离(米)"""
+    dlon = math.radians(lon2 - lon1)
+    dlat = math.radians(lat2 - lat1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_cross(lons1: np.ndarray, lats1: np.ndarray, lons2: np.ndarray, lats2: np.ndarray) -> np.ndarray:
+    """
+    计算两组点之间的球面直线距离
+
+    Args:
+        lons1: 第一组经度(度)
+        lats1: 第一组纬度(度)
+        lons2: 第二组经度(度)
+        lats2: 第二组纬度(度)
+
+    Returns:
+        n×m 距离矩阵(米)
+    """
+    lon1 = np.radians(lons1)[:, None]
+    lat1 = np.radians(lats1)[:, None]
+    lon2 = np.radians(lons2)[None, :]
+    lat2 = np.radians(lats2)[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class SpatialIndex:
+    """
+    geohash 分桶空间索引
+
+    每个POI按坐标放入对应的 geohash 单元，查询时只检查目标附近的单元。
+    超出容量时按写入顺序淘汰最旧的POI。本地覆盖不足时由调用方回退到高德周边搜索
+    (见 AmapPOISearchTool.anearby)。
+    """
+
+    def __init__(self, max_points: int = 50000):
+        """
+        初始化索引
+
+        Args:
+            max_points: 最大POI数量
+        """
+        self.max_points = max_points
+        self._pois: "OrderedDict[str, Tuple[POIRecord, Tuple[int, int]]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self._lock = threading.Lock()
+
+        self.queries = 0
+        self.fallbacks = 0
+
+    def __len__(self) -> int:
+        return len(self._pois)
+
+    def add(self, poi: POIRecord):
+        """加入(或更新)一个POI，无坐标的POI会被忽略"""
+        lon, lat = poi.lon, poi.lat
+        if not poi.id or not lon or not lat:
+            return
+
+        cell = geohash_cell(lon, lat)
+        with self._lock:
+            old = self._pois.pop(poi.id, None)
+            if old is not None:
+                self._remove_from_bucket(poi.id, old[1])
+
+            self._pois[poi.id] = (poi, cell)
+            self._buckets.setdefault(cell, set()).add(poi.id)
+
+            while len(self._pois) > self.max_points:
+                evicted_id, (_, evicted_cell) = self._pois.popitem(last=False)
+                self._remove_from_bucket(evicted_id, evicted_cell)
+
+    def add_many(self, pois: List[POIRecord]):
+        """批量加入POI"""
+        for poi in pois:
+            self.add(poi)
+
+    def _remove_from_bucket(self, poi_id: str, cell: Tuple[int, int]):
+        """从单元中移除POI(调用方持有锁)"""
+        bucket = self._buckets.get(cell)
+        if bucket is not None:
+            bucket.discard(poi_id)
+            if not bucket:
+                del self._buckets[cell]
+
+    def _ring(self, cx: int, cy: int, r: int) -> List[Tuple[int, int]]:
+        """以(cx, cy)为中心、切比雪夫距离为 r 的一圈单元"""
+        if r == 0:
+            return [(cx, cy)]
+        cells = [(cx + dx, cy + dy) for dx in range(-r, r + 1) for dy in (-r, r)]
+        cells += [(cx + dx, cy + dy) for dx in (-r, r) for dy in range(-r + 1, r)]
+        return cells
+
+    def _scan(
+        self,
+        cells: List[Tuple[int, int]],
+        lon: float,
+        lat: float,
+        type_filter: Optional[str],
+    ) -> List[Tuple[float, POIRecord]]:
+        """计算单元内POI到目标点的距离(调用方持有锁)"""
+        found = []
+        for cell in cells:
+            for poi_id in self._buckets.get(cell, ()):
+                poi = self._pois[poi_id][0]
+                if type_filter and type_filter not in poi.type:
+                    continue
+                found.append((haversine(lon, lat, poi.lon, poi.lat), poi))
+        return found
+
+    def nearest(
+        self,
+        lon: float,
+        lat: float,
+        k: int = 5,
+        type_filter: Optional[str] = None,
+        max_distance: Optional[float] = None,
+    ) -> List[Tuple[float, POIRecord]]:
+        """
+        k 近邻查询
+
+        Args:
+            lon: 经度
+            lat: 纬度
+            k: 返回数量
+            type_filter: 只返回类型包含该字符串的POI(如"住宿服务")
+            max_distance: 最大距离(米)
+
+        Returns:
+            [(距离(米), POI)]，由近到远
+        """
+        self.queries += 1
+        cx, cy = geohash_cell(lon, lat)
+        # 单元的最短边(米)，用于判断外圈是否可能有更近的点
+        cell_m = min(CELL_LON * METERS_PER_DEGREE * math.cos(math.radians(lat)), CELL_LAT * METERS_PER_DEGREE)
+
+        found: List[Tuple[float, POIRecord]] = []
+        with self._lock:
+            if not self._pois:
+                return []
+            for r in range(MAX_RINGS + 1):
+                found.extend(self._scan(self._ring(cx, cy, r), lon, lat, type_filter))
+                # 第 r 圈以外的点距离至少为 r * cell_m
+                reach = r * cell_m
+                if max_distance is not None and reach > max_distance:
+                    break
+                if len(found) >= k:
+                    found.sort(key=lambda item: item[0])
+                    if found[k - 1][0] <= reach:
+                        break
+
+        found.sort(key=lambda item: item[0])
+        if max_distance is not None:
+            found = [item for item in found if item[0] <= max_distance]
+        return found[:k]
+
+    def within(
+        self,
+        lon: float,
+        lat: float,
+        radius: float,
+        type_filter: Optional[str] = None,
+    ) -> List[Tuple[float, POIRecord]]:
+        """
+        半径查询
+
+        Args:
+            lon: 经度
+            lat: 纬度
+            radius: 半径(米)
+            type_filter: 只返回类型包含该字符串的POI
+
+        Returns:
+            [(距离(米), POI)]，由近到远
+        """
+        self.queries += 1
+        cx, cy = geohash_cell(lon, lat)
+        rx = int(radius / (CELL_LON * METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))) + 1
+        ry = int(radius / (CELL_LAT * METERS_PER_DEGREE)) + 1
+        cells = [(cx + dx, cy + dy) for dx in range(-rx, rx + 1) for dy in range(-ry, ry + 1)]
+
+        with self._lock:
+            found = [item for item in self._scan(cells, lon, lat, type_filter) if item[0] <= radius]
+
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+        with self._lock:
+            points = len(self._pois)
+            buckets = len(self._buckets)
+        return {
+            "points": points,
+            "buckets": buckets,
+            "queries": self.queries,
+            "fallbacks": self.fallbacks,
+        }
+
+
+# 全局索引实例
+_spatial_index: Optional[SpatialIndex] = None
+
+
+def get_spatial_index() -> SpatialIndex:
+    """获取POI空间索引(单例模式)"""
+    global _spatial_index
+
+    if _spatial_index is None:
+        _spatial_index = SpatialIndex(max_points=get_settings().spatial_index_max_points)
+
+    return _spatial_index
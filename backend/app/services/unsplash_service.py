@@ -3,6 +3,7 @@
 import requests
 from typing import List, Optional
 from ..config import get_settings
+from .resilience import call_with_resilience_sync
 
 class UnsplashService:
     """Unsplash图片服务类"""
@@ -44,10 +45,13 @@ class UnsplashService:
                 "client_id": self.access_key
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            def fetch() -> dict:
+                response = requests.get(url, params=params, timeout=10)
+                response.raise_for_status()
+                return response.json()
             
-            data = response.json()
+            # 重试 + 熔断
+            data = call_with_resilience_sync("unsplash", fetch)
             results = data.get("results", [])
             
             # 提取图片URL
@@ -0,0 +1,259 @@
+"""天气感知的景点分配 - 恶劣天气的日子优先安排室内景点"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..models.schemas import Attraction, DayPlan, TripPlan, WeatherInfo
+from .itinerary_optimizer import order_stops, project
+
+# 室内/户外关键词，按高德类型 "大类;中类;小类" 从最细的一级开始匹配
+INDOOR_KEYWORDS = (
+    "博物馆", "美术馆", "展览馆", "科技馆", "纪念馆", "纪念堂", "天文馆", "图书馆", "档案馆", "文化宫",
+    "海洋馆", "水族馆", "剧院", "剧场", "影剧院", "电影院", "音乐厅", "会展", "体育馆",
+    "购物", "商场", "购物中心", "百货", "室内",
+)
+OUTDOOR_KEYWORDS = (
+    "公园", "广场", "风景名胜", "景区", "动物园", "植物园", "游乐园", "海滨", "海滩", "沙滩",
+    "湿地", "森林", "古镇", "步行街", "风景区", "湖畔", "峡谷", "瀑布", "户外",
+)
+# 不使用 "山"/"湖"/"岛" 等单字: 会误中 "中山纪念堂"、"湖南省博物馆"、"青岛啤酒博物馆" 等地名
+
+# 未能判断室内/户外时的室内程度
+UNKNOWN_INDOOR_SCORE = 0.5
+
+# 好天气安排室内景点的代价(相对雨雪天安排户外景点的代价1.0)
+GOOD_WEATHER_INDOOR_COST = 0.3
+
+# 景点换到别的天时，每偏离当天景点中心多少米计1.0代价
+DISTANCE_COST_SCALE = 25_000.0
+
+
+@lru_cache(maxsize=4096)
+def indoor_score(poi_type: str) -> float:
+    """
+    根据高德类型判断室内程度(按类型字符串缓存)
+
+    Args:
+        poi_type: 高德类型，如 "科教文化服务;博物馆;博物馆"，也可以是景点类别或名称
+
+    Returns:
+        1.0 表示室内，0.0 表示户外，无法判断时为 UNKNOWN_INDOOR_SCORE
+    """
+    for level in reversed(poi_type.split(";")):
+        if any(keyword in level for keyword in INDOOR_KEYWORDS):
+            return 1.0
+        if any(keyword in level for keyword in OUTDOOR_KEYWORDS):
+            return 0.0
+    return UNKNOWN_INDOOR_SCORE
+
+
+def weather_severity(weather: Optional[WeatherInfo]) -> float:
+    """
+    天气对户外活动的不利程度(与活动建议使用相同的判断条件)
+
+    Args:
+        weather: 当天天气，None 表示无数据
+
+    Returns:
+        0.0 ~ 1.0，雨雪为1.0，高温/低温为0.5，大风为0.3
+    """
+    if weather is None:
+        return 0.0
+    text = weather.day_weather
+    if "雨" in text or "雪" in text:
+        return 1.0
+    if isinstance(weather.day_temp, int) and isinstance(weather.night_temp, int):
+        avg_temp = (weather.day_temp + weather.night_temp) / 2
+        if avg_temp >= 30 or avg_temp <= 5:
+            return 0.5
+    if "风" in text:
+        return 0.3
+    return 0.0
+
+
+def linear_sum_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    最小代价分配(匈牙利算法，O(n²m)，内层循环向量化)
+
+    Args:
+        cost: n×m 代价矩阵
+
+    Returns:
+        (行下标, 列下标)，按行下标排序，长度为 min(n, m)
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    # 下标从1开始，0号列作为哨兵
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.intp)  # 每列分配到的行
+    way = np.zeros(m + 1, dtype=np.intp)
+
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        min_reduced = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            free = np.flatnonzero(~used)
+            reduced = cost[i0 - 1, free - 1] - u[i0] - v[free]
+            better = reduced < min_reduced[free]
+            min_reduced[free[better]] = reduced[better]
+            way[free[better]] = j0
+
+            j1 = int(free[np.argmin(min_reduced[free])])
+            delta = min_reduced[j1]
+            visited = np.flatnonzero(used)
+            u[owner[visited]] += delta
+            v[visited] -= delta
+            min_reduced[free] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+
+        # 沿增广路径翻转分配
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(owner[1:])
+    rows = owner[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows, kind="stable")
+    return rows[order], cols[order]
+
+
+def assign_days(
+    severity: np.ndarray,
+    indoor: np.ndarray,
+    day_of: np.ndarray,
+    xy: np.ndarray,
+) -> np.ndarray:
+    """
+    在保持每天景点数量不变的前提下重新分配景点
+
+    代价 = 天气不匹配(恶劣天气的户外景点 / 好天气的室内景点) + 离当天原有景点中心的距离，
+    每天的景点数量展开成同样多的"位置"后求最小代价分配。
+
+    Args:
+        severity: 每天的天气不利程度(长度为天数)
+        indoor: 每个景点的室内程度
+        day_of: 每个景点原来所在的天
+        xy: 景点平面坐标(米)
+
+    Returns:
+        每个景点新分配到的天
+    """
+    days = len(severity)
+    counts = np.bincount(day_of, minlength=days)
+    centers = np.zeros((days, 2))
+    np.add.at(centers, day_of, xy)
+    centers /= np.maximum(counts, 1)[:, None]
+    # 原本没有景点的天以整体中心计
+    centers[counts == 0] = xy.mean(axis=0)
+
+    # 天气代价矩阵: 天 × 景点
+    weather_cost = (
+        severity[:, None] * (1.0 - indoor[None, :])
+        + GOOD_WEATHER_INDOOR_COST * (1.0 - severity[:, None]) * indoor[None, :]
+    )
+    offset = centers[:, None, :] - xy[None, :, :]
+    distance_cost = np.sqrt(np.einsum("dak,dak->da", offset, offset)) / DISTANCE_COST_SCALE
+    day_cost = weather_cost + distance_cost
+
+    slot_day = np.repeat(np.arange(days), counts)
+    _, slots = linear_sum_assignment(day_cost[slot_day].T)
+    return slot_day[slots]
+
+
+def apply_weather_assignment(plan: TripPlan, poi_types: Dict[str, str]) -> int:
+    """
+    按天气重新分配整个计划的景点(原地修改)
+
+    所有天都没有不利天气时不做改动；景点有增减的天按最近邻 + 2-opt 重新排定游览顺序
+    (有酒店坐标时为从酒店出发并返回的环路)。
+
+    Args:
+        plan: 旅行计划
+        poi_types: POI ID → 高德类型，找不到时按景点类别和名称判断
+
+    Returns:
+        换了天的景点数量
+    """
+    weather_by_date = {w.date: w for w in plan.weather_info}
+    severity = np.array([weather_severity(weather_by_date.get(day.date)) for day in plan.days])
+    if not severity.any():
+        return 0
+
+    stops: List[Attraction] = []
+    day_of = []
+    for d, day in enumerate(plan.days):
+        for attraction in day.attractions:
+            if attraction.location.longitude and attraction.location.latitude:
+                stops.append(attraction)
+                day_of.append(d)
+    if len(stops) < 2:
+        return 0
+
+    indoor = np.array([_attraction_indoor_score(a, poi_types) for a in stops])
+    lons = np.array([a.location.longitude for a in stops])
+    lats = np.array([a.location.latitude for a in stops])
+    day_of = np.array(day_of, dtype=np.intp)
+    new_day_of = assign_days(severity, indoor, day_of, project(lons, lats, float(lats.mean())))
+
+    moved = np.flatnonzero(new_day_of != day_of)
+    if len(moved) == 0:
+        return 0
+
+    moved_ids = {id(stops[k]) for k in moved.tolist()}
+    for day in plan.days:
+        day.attractions = [a for a in day.attractions if id(a) not in moved_ids]
+    for k in moved.tolist():
+        plan.days[new_day_of[k]].attractions.append(stops[k])
+
+    lat0 = float(lats.mean())
+    for d in set(day_of[moved].tolist()) | set(new_day_of[moved].tolist()):
+        _reorder_day(plan.days[d], lat0)
+    return len(moved)
+
+
+def _reorder_day(day: DayPlan, lat0: float):
+    """重新排定单日游览顺序，没有坐标的景点排在最后(原地修改)"""
+    located = [a for a in day.attractions if a.location.longitude and a.location.latitude]
+    if len(located) < 2:
+        return
+    unlocated = [a for a in day.attractions if not (a.location.longitude and a.location.latitude)]
+
+    xy = project(
+        np.array([a.location.longitude for a in located]),
+        np.array([a.location.latitude for a in located]),
+        lat0
+    )
+    hotel = day.hotel.location if day.hotel is not None else None
+    hotel_xy = (
+        project(np.array([hotel.longitude]), np.array([hotel.latitude]), lat0)[0]
+        if hotel is not None and hotel.longitude and hotel.latitude else None
+    )
+    order, _ = order_stops(xy, hotel_xy)
+    day.attractions = [located[i] for i in order.tolist()] + unlocated
+
+
+def _attraction_indoor_score(attraction: Attraction, poi_types: Dict[str, str]) -> float:
+    """景点的室内程度: 优先高德类型，其次景点类别，最后景点名称"""
+    for text in (poi_types.get(attraction.poi_id or ""), attraction.category, attraction.name):
+        if text:
+            score = indoor_score(text)
+            if score != UNKNOWN_INDOOR_SCORE:
+                return score
+    return UNKNOWN_INDOOR_SCORE
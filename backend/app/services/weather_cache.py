@@ -0,0 +1,207 @@
+"""天气预报缓存服务 - 按 adcode 缓存，过期时间对齐高德 report_time"""
+
+import time
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+from ..config import get_settings
+
+# 高德 report_time 为北京时间
+_CST = timezone(timedelta(hours=8))
+
+
+class _ForecastEntry:
+    """预报缓存条目"""
+
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Dict[str, Any], fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ForecastCache:
+    """
+    天气预报缓存
+
+    - 新鲜期: report_time + 刷新间隔(至少 min_ttl)，期间直接返回缓存
+    - 陈旧期: 新鲜期后 stale_ttl 内返回旧数据，同时后台只触发一次刷新(stale-while-revalidate)
+    - 超过陈旧期: 同步等待上游请求
+    """
+
+    def __init__(self, refresh_interval: float, min_ttl: float, stale_ttl: float):
+        """
+        初始化缓存
+
+        Args:
+            refresh_interval: 高德预报刷新间隔(秒)
+            min_ttl: 最短新鲜时间(秒)，避免 report_time 已过期时每次都请求
+            stale_ttl: 过期后仍可返回旧数据的时间(秒)
+        """
+        self.refresh_interval = refresh_interval
+        self.min_ttl = min_ttl
+        self.stale_ttl = stale_ttl
+
+        self._entries: Dict[str, _ForecastEntry] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def _fresh_until(self, report_time: str) -> float:
+        """根据 report_time 计算新鲜期截止时间(epoch秒)"""
+        now = time.time()
+        try:
+            reported = datetime.strptime(report_time, "%Y-%m-%d %H:%M:%S").replace(tzinfo=_CST)
+            expires = reported.timestamp() + self.refresh_interval
+        except (TypeError, ValueError):
+            expires = now + self.refresh_interval
+
+        # 限制在 [now + min_ttl, now + refresh_interval] 范围内
+        return min(max(expires, now + self.min_ttl), now + self.refresh_interval)
+
+    def get(self, adcode: str) -> Optional[_ForecastEntry]:
+        """读取缓存条目(不区分新鲜/陈旧)，超过陈旧期的条目会被移除"""
+        with self._lock:
+            entry = self._entries.get(adcode)
+            if entry is not None and entry.stale_until <= time.time():
+                del self._entries[adcode]
+                return None
+            return entry
+
+    def put(self, adcode: str, value: Dict[str, Any]):
+        """写入预报数据"""
+        fresh_until = self._fresh_until(value.get("report_time", ""))
+        with self._lock:
+            self._entries[adcode] = _ForecastEntry(value, fresh_until, fresh_until + self.stale_ttl)
+
+    def get_or_fetch(self, adcode: str, fetcher: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        同步读取预报，未命中或已过期时同步刷新
+
+        Args:
+            adcode: 城市编码
+            fetcher: 请求上游的函数，返回包含 success 或 error 的字典
+
+        Returns:
+            预报数据字典
+        """
+        entry = self.get(adcode)
+        if entry is not None and entry.fresh_until > time.time():
+            self.hits += 1
+            return entry.value
+
+        self.misses += 1
+        result = fetcher()
+        if result.get("success"):
+            self.put(adcode, result)
+            return result
+
+        # 刷新失败时退回陈旧数据
+        if entry is not None:
+            self.stale_hits += 1
+            return entry.value
+        return result
+
+    async def aget_or_fetch(
+        self,
+        adcode: str,
+        fetcher: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        异步读取预报(stale-while-revalidate)
+
+        Args:
+            adcode: 城市编码
+            fetcher: 请求上游的协程函数，返回包含 success 或 error 的字典
+
+        Returns:
+            预报数据字典
+        """
+        entry = self.get(adcode)
+        now = time.time()
+
+        if entry is not None and entry.fresh_until > now:
+            self.hits += 1
+            return entry.value
+
+        if entry is not None:
+            # 陈旧数据立即返回，后台刷新
+            self.stale_hits += 1
+            self._start_refresh(adcode, fetcher)
+            return entry.value
+
+        self.misses += 1
+        task = self._start_refresh(adcode, fetcher)
+        return await asyncio.shield(task)
+
+    def _start_refresh(
+        self,
+        adcode: str,
+        fetcher: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> asyncio.Task:
+        """启动(或复用进行中的)刷新任务，保证同一 adcode 只有一个刷新"""
+        task = self._refreshing.get(adcode)
+        if task is not None and not task.done():
+            return task
+
+        task = asyncio.create_task(self._refresh(adcode, fetcher))
+        self._refreshing[adcode] = task
+        return task
+
+    async def _refresh(
+        self,
+        adcode: str,
+        fetcher: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """执行刷新并写入缓存"""
+        self.refreshes += 1
+        try:
+            result = await fetcher()
+        except Exception as e:
+            result = {"error": f"天气查询失败: {str(e)}"}
+
+        if result.get("success"):
+            self.put(adcode, result)
+        else:
+            print(f"⚠️ 天气预报刷新失败(adcode={adcode}): {result.get('error')}")
+
+        self._refreshing.pop(adcode, None)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refreshing": len(self._refreshing),
+        }
+
+
+# 全局缓存实例
+_forecast_cache: Optional[ForecastCache] = None
+
+
+def get_forecast_cache() -> ForecastCache:
+    """获取天气预报缓存实例(单例模式)"""
+    global _forecast_cache
+
+    if _forecast_cache is None:
+        settings = get_settings()
+        _forecast_cache = ForecastCache(
+            refresh_interval=settings.weather_refresh_interval,
+            min_ttl=settings.weather_min_ttl,
+            stale_ttl=settings.weather_stale_ttl,
+        )
+
+    return _forecast_cache
@@ -4,6 +4,8 @@ from .amap_tools import (
     AmapPOISearchTool,
     AmapWeatherTool,
     AmapRouteTool,
+    AmapAPIError,
+    POIPage,
     get_amap_tools
 )
 
@@ -11,6 +13,8 @@ __all__ = [
     "AmapPOISearchTool",
     "AmapWeatherTool",
     "AmapRouteTool",
+    "AmapAPIError",
+    "POIPage",
     "get_amap_tools"
 ]
 
@@ -1,12 +1,324 @@
 """高德地图 LangChain 工具"""
 
 import json
-import httpx
-from typing import Optional, List, Dict, Any
+import math
+import asyncio
+from typing import Optional, List, Dict, Any, NamedTuple, Tuple
+from urllib.parse import urlencode, urlsplit
 from langchain_core.tools import BaseTool
 from pydantic import Field
 from ..config import get_settings
-from ..models.schemas import POIInfo, WeatherInfo, Location
+from ..models.schemas import WeatherInfo
+from ..models.poi_record import POIRecord
+from ..services.http_client import get_async_http_client, get_sync_http_client, json_loads
+from ..services.cache import TTLCache
+from ..services.geocode_cache import get_geocode_cache
+from ..services.weather_cache import get_forecast_cache
+from ..services.spatial_index import get_spatial_index
+from ..services.singleflight import SingleFlight
+from ..services.amap_batch import AmapBatcher
+from ..services.rate_limiter import get_amap_key_pool
+from ..services.resilience import RetryableError, call_with_resilience, call_with_resilience_sync
+
+# 高德API地址
+POI_SEARCH_URL = "https://restapi.amap.com/v3/place/text"
+POI_AROUND_URL = "https://restapi.amap.com/v3/place/around"
+GEOCODE_URL = "https://restapi.amap.com/v3/geocode/geo"
+WEATHER_URL = "https://restapi.amap.com/v3/weather/weatherInfo"
+DRIVING_URL = "https://restapi.amap.com/v3/direction/driving"
+
+
+class AmapAPIError(Exception):
+    """高德API返回错误或无结果"""
+
+
+def _require_api_key():
+    """
+    检查高德API Key是否已配置
+
+    Raises:
+        AmapAPIError: 未配置时
+    """
+    if not get_settings().get_amap_api_keys():
+        raise AmapAPIError("高德地图API Key未配置")
+
+
+def _raise_for_amap_error(data: Dict[str, Any], prefix: str):
+    """
+    检查高德响应状态
+
+    Raises:
+        AmapAPIError: status 不为 "1" 时
+    """
+    if data.get("status") != "1":
+        raise AmapAPIError(f"{prefix}: {data.get('info', '未知错误')}")
+
+
+def _check_quota(key: str, data: Dict[str, Any]):
+    """
+    检查高德配额/QPS超限错误
+
+    Raises:
+        RetryableError: 可通过等待或换Key解决的错误(不计入熔断)
+    """
+    if data.get("status") != "1":
+        info = data.get("info", "")
+        if get_amap_key_pool().report_error(key, info):
+            raise RetryableError(f"高德地图API错误: {info}", payload=data, trip_breaker=False)
+
+
+def amap_get(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    同步请求高德API并返回JSON
+
+    自动分配API Key并按Key限流，失败时按配置退避重试，连续失败时熔断。
+    """
+    def attempt() -> Dict[str, Any]:
+        key = get_amap_key_pool().acquire_sync()
+        client = get_sync_http_client()
+        response = client.get(url, params={**params, "key": key})
+        response.raise_for_status()
+        data = json_loads(response.content)
+        _check_quota(key, data)
+        return data
+    
+    try:
+        return call_with_resilience_sync("amap", attempt)
+    except RetryableError as e:
+        # 重试耗尽后返回高德原始错误响应，由调用方按status处理
+        if e.payload is not None:
+            return e.payload
+        raise
+
+
+# 合并相同的并发高德请求
+_amap_flight = SingleFlight("amap")
+
+
+def _request_key(url: str, params: Dict[str, Any]) -> tuple:
+    """生成请求合并键"""
+    return (url, tuple(sorted((k, str(v)) for k, v in params.items())))
+
+
+async def _amap_aget_single(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """异步发起单个高德请求(限流 + 重试 + 熔断)"""
+    async def attempt() -> Dict[str, Any]:
+        key = await get_amap_key_pool().acquire()
+        client = get_async_http_client()
+        response = await client.get(url, params={**params, "key": key})
+        response.raise_for_status()
+        data = json_loads(response.content)
+        _check_quota(key, data)
+        return data
+    
+    try:
+        return await call_with_resilience("amap", attempt)
+    except RetryableError as e:
+        if e.payload is not None:
+            return e.payload
+        raise
+
+
+async def _amap_aget_batch(
+    requests: List[Tuple[str, Dict[str, Any]]]
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    通过 /v3/batch 一次发送多个高德请求
+
+    Args:
+        requests: [(url, params)] 列表
+
+    Returns:
+        与请求一一对应的响应，子请求失败或超限的位置为 None(由调用方单独重发)
+
+    Raises:
+        Exception: 批量调用失败时(只发送一次，不重试也不计入熔断，由逐个请求负责重试)
+    """
+    base = urlsplit(requests[0][0])
+    batch_url = f"{base.scheme}://{base.netloc}/v3/batch"
+    
+    # 批量中每个子请求都计入Key的QPS
+    pool = get_amap_key_pool()
+    key = await pool.acquire(tokens=len(requests))
+    ops = [
+        {"url": f"{urlsplit(url).path}?{urlencode({**params, 'key': key})}"}
+        for url, params in requests
+    ]
+    client = get_async_http_client()
+    response = await client.post(batch_url, params={"key": key}, json={"ops": ops})
+    response.raise_for_status()
+    items = json_loads(response.content)
+    
+    if not isinstance(items, list) or len(items) != len(ops):
+        # 未开通批量接口等情况返回的是单个错误对象
+        info = items.get("info") if isinstance(items, dict) else None
+        raise ValueError(f"批量接口响应异常: {info or type(items).__name__}")
+    
+    results: List[Optional[Dict[str, Any]]] = []
+    for item in items:
+        body = item.get("body") if isinstance(item, dict) else None
+        if not isinstance(body, dict) or item.get("status") != 200:
+            results.append(None)
+        elif body.get("status") != "1" and pool.report_error(key, body.get("info", "")):
+            results.append(None)
+        else:
+            results.append(body)
+    return results
+
+
+# 全局批量请求合并器
+_amap_batcher: Optional[AmapBatcher] = None
+
+
+def get_amap_batcher() -> AmapBatcher:
+    """
+    获取高德批量请求合并器(单例模式)
+
+    一个批次使用同一个Key、一次预约全部令牌，批次大小不超过单Key突发量，
+    否则每个满批次都要先等待 (批次大小 - 突发量) / QPS 秒才能发出。
+    """
+    global _amap_batcher
+    
+    if _amap_batcher is None:
+        settings = get_settings()
+        _amap_batcher = AmapBatcher(
+            send_batch=_amap_aget_batch,
+            send_single=_amap_aget_single,
+            window=settings.amap_batch_window_ms / 1000,
+            max_size=max(1, min(settings.amap_batch_max_size, settings.amap_burst)),
+        )
+    
+    return _amap_batcher
+
+
+async def amap_aget(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    异步请求高德API并返回JSON
+
+    相同的并发请求只发起一次；短时间内的不同请求合并为一次批量调用；
+    自动分配API Key并按Key限流(排队等待而非失败)；
+    失败时按配置退避重试，连续失败时熔断。
+    """
+    async def fetch() -> Dict[str, Any]:
+        if get_settings().amap_batch_enabled:
+            return await get_amap_batcher().submit(url, params)
+        return await _amap_aget_single(url, params)
+    
+    return await _amap_flight.do(_request_key(url, params), fetch)
+
+
+# 高德POI搜索每页数量(offset)和最大页数
+POI_PAGE_SIZE = 20
+POI_MAX_PAGES = 40
+
+# 全局POI搜索缓存
+_poi_cache: Optional[TTLCache] = None
+
+
+def get_poi_cache() -> TTLCache:
+    """获取POI搜索结果缓存(单例模式)"""
+    global _poi_cache
+
+    if _poi_cache is None:
+        settings = get_settings()
+        _poi_cache = TTLCache(
+            name="amap_poi_search",
+            max_entries=settings.poi_cache_max_entries,
+            max_bytes=settings.poi_cache_max_bytes,
+            default_ttl=settings.poi_cache_ttl,
+        )
+
+    return _poi_cache
+
+
+def _poi_cache_key(keywords: str, city: str, citylimit: bool, page: int) -> tuple:
+    """生成规范化的POI缓存键(忽略大小写和多余空白)"""
+    normalized_keywords = " ".join(keywords.split()).lower()
+    normalized_city = "".join(city.split()).lower()
+    return (normalized_keywords, normalized_city, bool(citylimit), int(page))
+
+
+def _poi_params(keywords: str, city: str, citylimit: bool, page: int) -> Dict[str, Any]:
+    """构建POI搜索请求参数"""
+    return {
+        "keywords": keywords,
+        "city": city,
+        "citylimit": "true" if citylimit else "false",
+        "output": "json",
+        "offset": POI_PAGE_SIZE,  # 每页返回结果数量
+        "page": page,
+        "extensions": "all"  # 返回详细信息
+    }
+
+
+def _text(value: Any) -> str:
+    """高德字段为空时可能返回[]，统一转换为字符串"""
+    if isinstance(value, list):
+        return str(value[0]) if value else ""
+    return str(value) if value else ""
+
+
+def _parse_coords(location_str: str) -> Tuple[float, float]:
+    """解析 "经度,纬度" 格式的坐标，失败时返回(0, 0)"""
+    try:
+        lon, lat = location_str.split(",")
+        return float(lon), float(lat)
+    except (AttributeError, ValueError):
+        return 0.0, 0.0
+
+
+def _parse_poi(poi: Dict[str, Any]) -> POIRecord:
+    """将高德POI解析为 POIRecord"""
+    biz_ext = poi.get("biz_ext") or {}
+    lon, lat = _parse_coords(_text(poi.get("location")))
+    return POIRecord(
+        id=_text(poi.get("id")),
+        name=_text(poi.get("name")),
+        type=_text(poi.get("type")),
+        address=_text(poi.get("address")),
+        lon=lon,
+        lat=lat,
+        tel=_text(poi.get("tel")) or None,
+        rating=_text(biz_ext.get("rating") or poi.get("rating")) or None,
+        cost=_text(biz_ext.get("cost") or poi.get("cost")) or None,
+        distance=_text(poi.get("distance")) or None,
+    )
+
+
+class POIPage(NamedTuple):
+    """一页(或合并多页)POI搜索结果"""
+    pois: List[POIRecord]
+    total: int  # 高德返回的符合条件的POI总数
+
+
+def _parse_poi_page(data: Dict[str, Any]) -> POIPage:
+    """将高德POI搜索响应解析为 POIPage"""
+    pois = [_parse_poi(poi) for poi in data.get("pois", [])]
+    
+    try:
+        total = int(data.get("count", 0) or 0)
+    except (TypeError, ValueError):
+        total = len(pois)
+    
+    return POIPage(pois=pois, total=total)
+
+
+def _poi_page_nbytes(page: POIPage) -> int:
+    """估算POI页占用的字节数(用于缓存容量控制)"""
+    return sum(
+        len(poi.id) + len(poi.name) * 3 + len(poi.type) * 3 + len(poi.address) * 3 + 200
+        for poi in page.pois
+    )
+
+
+def _poi_page_to_json(page: POIPage) -> str:
+    """将 POIPage 序列化为工具输出的JSON字符串(仅供LangChain智能体使用)"""
+    return json.dumps({
+        "success": True,
+        "count": len(page.pois),
+        "total": page.total,
+        "pois": [poi.to_dict() for poi in page.pois]
+    }, ensure_ascii=False)
 
 
 class AmapPOISearchTool(BaseTool):
@@ -25,155 +337,394 @@ class AmapPOISearchTool(BaseTool):
     返回POI信息列表，包括名称、地址、经纬度、类型等。
     """
     
+    def search(
+        self,
+        keywords: str,
+        city: str,
+        citylimit: bool = True,
+        page: int = 1,
+    ) -> POIPage:
+        """
+        搜索一页POI(带缓存)
+
+        Args:
+            keywords: 搜索关键词
+            city: 城市
+            citylimit: 是否限制在城市范围内
+            page: 页码(从1开始)
+
+        Returns:
+            POI搜索结果
+
+        Raises:
+            AmapAPIError: 高德返回错误时
+        """
+        _require_api_key()
+        
+        # 优先读取缓存
+        cache = get_poi_cache()
+        cache_key = _poi_cache_key(keywords, city, citylimit, page)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # 调用高德地图POI搜索API
+        data = amap_get(POI_SEARCH_URL, _poi_params(keywords, city, citylimit, page))
+        _raise_for_amap_error(data, "高德地图API错误")
+        
+        # 解析POI数据，写入缓存和空间索引
+        result = _parse_poi_page(data)
+        cache.set(cache_key, result, size=_poi_page_nbytes(result))
+        get_spatial_index().add_many(result.pois)
+        return result
+    
+    async def asearch(
+        self,
+        keywords: str,
+        city: str,
+        citylimit: bool = True,
+        page: int = 1,
+    ) -> POIPage:
+        """异步搜索一页POI(带缓存)，参数与返回值同 search"""
+        _require_api_key()
+        
+        cache = get_poi_cache()
+        cache_key = _poi_cache_key(keywords, city, citylimit, page)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        data = await amap_aget(POI_SEARCH_URL, _poi_params(keywords, city, citylimit, page))
+        _raise_for_amap_error(data, "高德地图API错误")
+        
+        result = _parse_poi_page(data)
+        cache.set(cache_key, result, size=_poi_page_nbytes(result))
+        get_spatial_index().add_many(result.pois)
+        return result
+    
+    async def asearch_around(
+        self,
+        longitude: float,
+        latitude: float,
+        radius: float,
+        keywords: str = "",
+        types: str = "",
+    ) -> POIPage:
+        """
+        高德周边搜索(一页，按距离排序)，结果写入空间索引
+
+        Args:
+            longitude: 中心点经度
+            latitude: 中心点纬度
+            radius: 半径(米，高德上限50000)
+            keywords: 搜索关键词
+            types: POI类型(分类名称或编码)
+
+        Returns:
+            POI搜索结果
+
+        Raises:
+            AmapAPIError: 高德返回错误时
+        """
+        _require_api_key()
+        
+        params = {
+            "location": f"{longitude:.6f},{latitude:.6f}",
+            "radius": int(min(radius, 50000)),
+            "sortrule": "distance",
+            "output": "json",
+            "offset": POI_PAGE_SIZE,
+            "page": 1,
+            "extensions": "all"
+        }
+        if keywords:
+            params["keywords"] = keywords
+        if types:
+            params["types"] = types
+        
+        data = await amap_aget(POI_AROUND_URL, params)
+        _raise_for_amap_error(data, "高德地图API错误")
+        
+        result = _parse_poi_page(data)
+        get_spatial_index().add_many(result.pois)
+        return result
+    
+    async def anearby(
+        self,
+        longitude: float,
+        latitude: float,
+        radius: float,
+        keywords: str = "",
+        types: str = "",
+        type_filter: Optional[str] = None,
+        min_results: Optional[int] = None,
+        k: Optional[int] = None,
+    ) -> List[Tuple[float, POIRecord]]:
+        """
+        邻近POI查询: 优先使用本地空间索引，覆盖不足时回退到高德周边搜索
+
+        Args:
+            longitude: 中心点经度
+            latitude: 中心点纬度
+            radius: 半径(米)
+            keywords: 回退搜索的关键词
+            types: 回退搜索的POI类型
+            type_filter: 本地结果只保留类型包含该字符串的POI(如"住宿服务")
+            min_results: 本地结果少于该数量时回退，默认使用配置 spatial_index_min_results
+            k: 只返回半径内最近的 k 个(k 近邻查询)，None 表示返回半径内全部
+
+        Returns:
+            [(距离(米), POI)]，由近到远
+        """
+        index = get_spatial_index()
+        if min_results is None:
+            min_results = get_settings().spatial_index_min_results
+        
+        def query() -> List[Tuple[float, POIRecord]]:
+            if k is not None:
+                return index.nearest(longitude, latitude, k, type_filter, max_distance=radius)
+            return index.within(longitude, latitude, radius, type_filter)
+        
+        local = query()
+        if len(local) >= min(min_results, k or min_results):
+            return local
+        
+        index.fallbacks += 1
+        await self.asearch_around(longitude, latitude, radius, keywords=keywords, types=types)
+        return query()
+    
     def _run(
         self,
         keywords: str,
         city: str,
         citylimit: bool = True,
+        page: int = 1,
         run_manager: Optional[Any] = None,
     ) -> str:
         """执行POI搜索"""
         try:
-            settings = get_settings()
-            if not settings.amap_api_key:
-                return json.dumps({"error": "高德地图API Key未配置"})
-            
-            # 调用高德地图POI搜索API
-            url = "https://restapi.amap.com/v3/place/text"
-            params = {
-                "key": settings.amap_api_key,
-                "keywords": keywords,
-                "city": city,
-                "citylimit": "true" if citylimit else "false",
-                "output": "json",
-                "offset": 20,  # 返回结果数量
-                "page": 1,
-                "extensions": "all"  # 返回详细信息
-            }
-            
-            with httpx.Client(timeout=10.0) as client:
-                response = client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            
-            if data.get("status") != "1":
-                error_msg = data.get("info", "未知错误")
-                return json.dumps({"error": f"高德地图API错误: {error_msg}"})
-            
-            # 解析POI数据
-            pois = data.get("pois", [])
-            result = []
-            
-            for poi in pois:
-                location_str = poi.get("location", "")
-                longitude, latitude = 0.0, 0.0
-                if location_str:
-                    try:
-                        lon, lat = location_str.split(",")
-                        longitude = float(lon)
-                        latitude = float(lat)
-                    except:
-                        pass
-                
-                poi_info = {
-                    "id": poi.get("id", ""),
-                    "name": poi.get("name", ""),
-                    "address": poi.get("address", ""),
-                    "location": {
-                        "longitude": longitude,
-                        "latitude": latitude
-                    },
-                    "type": poi.get("type", ""),
-                    "tel": poi.get("tel", ""),
-                    "distance": poi.get("distance", ""),
-                    "rating": poi.get("rating", ""),
-                    "cost": poi.get("cost", ""),
-                    "business_area": poi.get("business_area", "")
-                }
-                result.append(poi_info)
-            
-            return json.dumps({
-                "success": True,
-                "count": len(result),
-                "pois": result
-            }, ensure_ascii=False)
-            
+            return _poi_page_to_json(self.search(keywords, city, citylimit, page))
+        except AmapAPIError as e:
+            return json.dumps({"error": str(e)}, ensure_ascii=False)
         except Exception as e:
-            return json.dumps({"error": f"POI搜索失败: {str(e)}"})
+            return json.dumps({"error": f"POI搜索失败: {str(e)}"}, ensure_ascii=False)
     
     async def _arun(
         self,
         keywords: str,
         city: str,
         citylimit: bool = True,
+        page: int = 1,
         run_manager: Optional[Any] = None,
     ) -> str:
         """异步执行POI搜索"""
         try:
-            settings = get_settings()
-            if not settings.amap_api_key:
-                return json.dumps({"error": "高德地图API Key未配置"})
-            
-            url = "https://restapi.amap.com/v3/place/text"
-            params = {
-                "key": settings.amap_api_key,
-                "keywords": keywords,
-                "city": city,
-                "citylimit": "true" if citylimit else "false",
-                "output": "json",
-                "offset": 20,
-                "page": 1,
-                "extensions": "all"
-            }
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            
-            if data.get("status") != "1":
-                error_msg = data.get("info", "未知错误")
-                return json.dumps({"error": f"高德地图API错误: {error_msg}"})
-            
-            pois = data.get("pois", [])
-            result = []
-            
-            for poi in pois:
-                location_str = poi.get("location", "")
-                longitude, latitude = 0.0, 0.0
-                if location_str:
-                    try:
-                        lon, lat = location_str.split(",")
-                        longitude = float(lon)
-                        latitude = float(lat)
-                    except:
-                        pass
-                
-                poi_info = {
-                    "id": poi.get("id", ""),
-                    "name": poi.get("name", ""),
-                    "address": poi.get("address", ""),
-                    "location": {
-                        "longitude": longitude,
-                        "latitude": latitude
-                    },
-                    "type": poi.get("type", ""),
-                    "tel": poi.get("tel", ""),
-                    "distance": poi.get("distance", ""),
-                    "rating": poi.get("rating", ""),
-                    "cost": poi.get("cost", ""),
-                    "business_area": poi.get("business_area", "")
-                }
-                result.append(poi_info)
-            
-            return json.dumps({
-                "success": True,
-                "count": len(result),
-                "pois": result
-            }, ensure_ascii=False)
-            
+            return _poi_page_to_json(await self.asearch(keywords, city, citylimit, page))
+        except AmapAPIError as e:
+            return json.dumps({"error": str(e)}, ensure_ascii=False)
         except Exception as e:
-            return json.dumps({"error": f"POI搜索失败: {str(e)}"})
+            return json.dumps({"error": f"POI搜索失败: {str(e)}"}, ensure_ascii=False)
+    
+    async def asearch_pages(
+        self,
+        keywords: str,
+        city: str,
+        limit: int,
+        citylimit: bool = True,
+    ) -> POIPage:
+        """
+        按需要的数量并发获取多页POI
+
+        先请求第1页得到总数，再并发请求剩余页(不超过总数)，按POI ID去重合并。
+
+        Args:
+            keywords: 搜索关键词
+            city: 城市
+            limit: 需要的POI数量
+            citylimit: 是否限制在城市范围内
+
+        Returns:
+            合并后的POI结果(最多 limit 个)
+
+        Raises:
+            AmapAPIError: 第1页请求失败时
+        """
+        first = await self.asearch(keywords, city, citylimit, page=1)
+        
+        pages = [first]
+        pages_needed = min(math.ceil(limit / POI_PAGE_SIZE), POI_MAX_PAGES)
+        last_page = min(pages_needed, math.ceil(first.total / POI_PAGE_SIZE))
+        
+        # 第1页不满一页说明已经没有更多结果
+        if last_page > 1 and len(first.pois) >= POI_PAGE_SIZE:
+            results = await asyncio.gather(*[
+                self.asearch(keywords, city, citylimit, page=page)
+                for page in range(2, last_page + 1)
+            ], return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"⚠️ POI分页搜索失败: {str(result)}")
+                    continue
+                pages.append(result)
+        
+        # 按POI ID去重
+        seen = set()
+        merged = []
+        for page in pages:
+            for poi in page.pois:
+                poi_id = poi.id or poi.name
+                if poi_id in seen:
+                    continue
+                seen.add(poi_id)
+                merged.append(poi)
+        
+        return POIPage(pois=merged[:limit], total=first.total)
+
+
+def _parse_geocode(geocode: Dict[str, Any]) -> Dict[str, str]:
+    """提取地理编码结果中需要缓存的字段"""
+    city = geocode.get("city", "")
+    return {
+        "adcode": geocode.get("adcode", "") or "",
+        "location": geocode.get("location", "") or "",
+        "formatted_address": geocode.get("formatted_address", "") or "",
+        "city": city if isinstance(city, str) else "",
+    }
+
+
+def geocode_address(address: str) -> Optional[Dict[str, str]]:
+    """
+    地理编码(带持久化缓存)
+
+    Args:
+        address: 地址或城市名称
+
+    Returns:
+        包含 adcode/location/formatted_address/city 的字典，找不到时返回None
+    """
+    cache = get_geocode_cache()
+    found, entry = cache.lookup(address)
+    if found:
+        return entry
+    
+    params = {
+        "address": address,
+        "output": "json"
+    }
+    data = amap_get(GEOCODE_URL, params)
+    
+    if data.get("status") != "1":
+        # API错误(如配额超限)不写入负缓存
+        return None
+    
+    if not data.get("geocodes"):
+        cache.put_negative(address)
+        return None
+    
+    entry = _parse_geocode(data["geocodes"][0])
+    cache.put(address, entry)
+    return entry
+
+
+async def ageocode_address(address: str) -> Optional[Dict[str, str]]:
+    """
+    异步地理编码(带持久化缓存)
+
+    Args:
+        address: 地址或城市名称
+
+    Returns:
+        包含 adcode/location/formatted_address/city 的字典，找不到时返回None
+    """
+    cache = get_geocode_cache()
+    found, entry = cache.lookup(address)
+    if found:
+        return entry
+    
+    params = {
+        "address": address,
+        "output": "json"
+    }
+    data = await amap_aget(GEOCODE_URL, params)
+    
+    if data.get("status") != "1":
+        return None
+    
+    if not data.get("geocodes"):
+        cache.put_negative(address)
+        return None
+    
+    entry = _parse_geocode(data["geocodes"][0])
+    # 数据库写入放到线程中，避免阻塞事件循环
+    await asyncio.to_thread(cache.put, address, entry)
+    return entry
+
+
+def _format_forecast(weather_data: Dict[str, Any], city: str) -> Dict[str, Any]:
+    """将高德天气响应解析为工具输出字典(成功时包含success，失败时包含error)"""
+    if weather_data.get("status") != "1":
+        error_msg = weather_data.get("info", "未知错误")
+        print(f"❌ 天气API返回错误: status={weather_data.get('status')}, info={error_msg}")
+        print(f"完整响应: {weather_data}")
+        return {"error": f"天气查询失败: {error_msg}"}
+    
+    # 解析天气数据
+    forecasts = weather_data.get("forecasts", [])
+    print(f"🔍 天气API响应 - forecasts数量: {len(forecasts)}")
+    if not forecasts:
+        print(f"⚠️ 天气API返回成功但forecasts为空，完整响应: {weather_data}")
+        return {"error": "未找到天气数据"}
+    
+    forecast = forecasts[0]
+    casts = forecast.get("casts", [])
+    print(f"🔍 天气API响应 - casts数量: {len(casts)}")
+    if not casts:
+        print(f"⚠️ forecast存在但casts为空，forecast数据: {forecast}")
+    
+    result = []
+    for cast in casts:
+        weather_info = {
+            "date": cast.get("date", ""),
+            "week": cast.get("week", ""),
+            "dayweather": cast.get("dayweather", ""),
+            "nightweather": cast.get("nightweather", ""),
+            "daytemp": cast.get("daytemp", ""),
+            "nighttemp": cast.get("nighttemp", ""),
+            "daywind": cast.get("daywind", ""),
+            "nightwind": cast.get("nightwind", ""),
+            "daypower": cast.get("daypower", ""),
+            "nightpower": cast.get("nightpower", "")
+        }
+        result.append(weather_info)
+    
+    return {
+        "success": True,
+        "city": forecast.get("city", city),
+        "report_time": forecast.get("reporttime", ""),
+        "forecasts": result
+    }
+
+
+def _weather_params(adcode: str) -> Dict[str, Any]:
+    """构建天气查询请求参数"""
+    return {
+        "city": adcode,
+        "extensions": "all",  # 获取预报天气
+        "output": "json"
+    }
+
+
+def _to_weather_info(cast: Dict[str, Any]) -> WeatherInfo:
+    """将高德单日预报转换为 WeatherInfo(温度由模型校验器解析)"""
+    return WeatherInfo(
+        date=cast.get("date", ""),
+        day_weather=cast.get("dayweather", ""),
+        night_weather=cast.get("nightweather", ""),
+        day_temp=cast.get("daytemp", 0) or 0,
+        night_temp=cast.get("nighttemp", 0) or 0,
+        wind_direction=cast.get("daywind", ""),
+        wind_power=cast.get("daypower", "")
+    )
 
 
 class AmapWeatherTool(BaseTool):
@@ -187,6 +738,71 @@ class AmapWeatherTool(BaseTool):
     返回未来几天的天气信息，包括日期、白天/夜间天气、温度、风向、风力等。
     """
     
+    def _forecast(self, city: str) -> Dict[str, Any]:
+        """同步查询预报字典(success 或 error)"""
+        _require_api_key()
+        
+        # 先进行地理编码获取城市adcode(缓存命中时无需请求)
+        geocode = geocode_address(city)
+        if not geocode:
+            return {"error": f"无法找到城市: {city}"}
+        
+        adcode = geocode.get("adcode", "")
+        if not adcode:
+            return {"error": f"无法获取城市编码: {city}"}
+        
+        # 查询天气(按adcode缓存，过期时间对齐report_time)
+        def fetch() -> Dict[str, Any]:
+            weather_data = amap_get(WEATHER_URL, _weather_params(adcode))
+            return _format_forecast(weather_data, city)
+        
+        return get_forecast_cache().get_or_fetch(adcode, fetch)
+    
+    async def _aforecast(self, city: str) -> Dict[str, Any]:
+        """异步查询预报字典(success 或 error)"""
+        _require_api_key()
+        
+        # 地理编码(缓存命中时无需请求)
+        geocode = await ageocode_address(city)
+        if not geocode:
+            return {"error": f"无法找到城市: {city}"}
+        
+        adcode = geocode.get("adcode", "")
+        if not adcode:
+            return {"error": f"无法获取城市编码: {city}"}
+        
+        # 查询天气(过期数据先返回，后台刷新)
+        async def fetch() -> Dict[str, Any]:
+            weather_data = await amap_aget(WEATHER_URL, _weather_params(adcode))
+            return _format_forecast(weather_data, city)
+        
+        return await get_forecast_cache().aget_or_fetch(adcode, fetch)
+    
+    def get_forecasts(self, city: str) -> List[WeatherInfo]:
+        """
+        查询城市天气预报
+
+        Args:
+            city: 城市名称
+
+        Returns:
+            按日期排列的天气列表
+
+        Raises:
+            AmapAPIError: 查询失败时
+        """
+        result = self._forecast(city)
+        if result.get("error"):
+            raise AmapAPIError(result["error"])
+        return [_to_weather_info(cast) for cast in result.get("forecasts", [])]
+    
+    async def aget_forecasts(self, city: str) -> List[WeatherInfo]:
+        """异步查询城市天气预报，参数与返回值同 get_forecasts"""
+        result = await self._aforecast(city)
+        if result.get("error"):
+            raise AmapAPIError(result["error"])
+        return [_to_weather_info(cast) for cast in result.get("forecasts", [])]
+    
     def _run(
         self,
         city: str,
@@ -194,88 +810,9 @@ class AmapWeatherTool(BaseTool):
     ) -> str:
         """执行天气查询"""
         try:
-            settings = get_settings()
-            if not settings.amap_api_key:
-                return json.dumps({"error": "高德地图API Key未配置"})
-            
-            # 先进行地理编码获取城市adcode
-            geocode_url = "https://restapi.amap.com/v3/geocode/geo"
-            geocode_params = {
-                "key": settings.amap_api_key,
-                "address": city,
-                "output": "json"
-            }
-            
-            with httpx.Client(timeout=10.0) as client:
-                geocode_response = client.get(geocode_url, params=geocode_params)
-                geocode_response.raise_for_status()
-                geocode_data = geocode_response.json()
-            
-            if geocode_data.get("status") != "1" or not geocode_data.get("geocodes"):
-                return json.dumps({"error": f"无法找到城市: {city}"})
-            
-            adcode = geocode_data["geocodes"][0].get("adcode", "")
-            if not adcode:
-                return json.dumps({"error": f"无法获取城市编码: {city}"})
-            
-            # 查询天气
-            weather_url = "https://restapi.amap.com/v3/weather/weatherInfo"
-            weather_params = {
-                "key": settings.amap_api_key,
-                "city": adcode,
-                "extensions": "all",  # 获取预报天气
-                "output": "json"
-            }
-            
-            with httpx.Client(timeout=10.0) as client:
-                weather_response = client.get(weather_url, params=weather_params)
-                weather_response.raise_for_status()
-                weather_data = weather_response.json()
-            
-            if weather_data.get("status") != "1":
-                error_msg = weather_data.get("info", "未知错误")
-                print(f"❌ 天气API返回错误: status={weather_data.get('status')}, info={error_msg}")
-                print(f"完整响应: {weather_data}")
-                return json.dumps({"error": f"天气查询失败: {error_msg}"})
-            
-            # 解析天气数据
-            forecasts = weather_data.get("forecasts", [])
-            print(f"🔍 天气API响应 - forecasts数量: {len(forecasts)}")
-            if not forecasts:
-                print(f"⚠️ 天气API返回成功但forecasts为空，完整响应: {weather_data}")
-                return json.dumps({"error": "未找到天气数据"})
-            
-            forecast = forecasts[0]
-            casts = forecast.get("casts", [])
-            print(f"🔍 天气API响应 - casts数量: {len(casts)}")
-            if not casts:
-                print(f"⚠️ forecast存在但casts为空，forecast数据: {forecast}")
-            
-            result = []
-            for cast in casts:
-                weather_info = {
-                    "date": cast.get("date", ""),
-                    "week": cast.get("week", ""),
-                    "dayweather": cast.get("dayweather", ""),
-                    "nightweather": cast.get("nightweather", ""),
-                    "daytemp": cast.get("daytemp", ""),
-                    "nighttemp": cast.get("nighttemp", ""),
-                    "daywind": cast.get("daywind", ""),
-                    "nightwind": cast.get("nightwind", ""),
-                    "daypower": cast.get("daypower", ""),
-                    "nightpower": cast.get("nightpower", "")
-                }
-                result.append(weather_info)
-            
-            return json.dumps({
-                "success": True,
-                "city": forecast.get("city", city),
-                "report_time": forecast.get("report_time", ""),
-                "forecasts": result
-            }, ensure_ascii=False)
-            
+            return json.dumps(self._forecast(city), ensure_ascii=False)
         except Exception as e:
-            return json.dumps({"error": f"天气查询失败: {str(e)}"})
+            return json.dumps({"error": f"天气查询失败: {str(e)}"}, ensure_ascii=False)
     
     async def _arun(
         self,
@@ -284,87 +821,90 @@ class AmapWeatherTool(BaseTool):
     ) -> str:
         """异步执行天气查询"""
         try:
-            settings = get_settings()
-            if not settings.amap_api_key:
-                return json.dumps({"error": "高德地图API Key未配置"})
-            
-            # 地理编码
-            geocode_url = "https://restapi.amap.com/v3/geocode/geo"
-            geocode_params = {
-                "key": settings.amap_api_key,
-                "address": city,
-                "output": "json"
-            }
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                geocode_response = await client.get(geocode_url, params=geocode_params)
-                geocode_response.raise_for_status()
-                geocode_data = geocode_response.json()
-            
-            if geocode_data.get("status") != "1" or not geocode_data.get("geocodes"):
-                return json.dumps({"error": f"无法找到城市: {city}"})
-            
-            adcode = geocode_data["geocodes"][0].get("adcode", "")
-            if not adcode:
-                return json.dumps({"error": f"无法获取城市编码: {city}"})
-            
-            # 查询天气
-            weather_url = "https://restapi.amap.com/v3/weather/weatherInfo"
-            weather_params = {
-                "key": settings.amap_api_key,
-                "city": adcode,
-                "extensions": "all",
-                "output": "json"
-            }
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                weather_response = await client.get(weather_url, params=weather_params)
-                weather_response.raise_for_status()
-                weather_data = weather_response.json()
-            
-            if weather_data.get("status") != "1":
-                error_msg = weather_data.get("info", "未知错误")
-                print(f"❌ 天气API返回错误: status={weather_data.get('status')}, info={error_msg}")
-                print(f"完整响应: {weather_data}")
-                return json.dumps({"error": f"天气查询失败: {error_msg}"})
-            
-            forecasts = weather_data.get("forecasts", [])
-            print(f"🔍 天气API响应(异步) - forecasts数量: {len(forecasts)}")
-            if not forecasts:
-                print(f"⚠️ 天气API返回成功但forecasts为空，完整响应: {weather_data}")
-                return json.dumps({"error": "未找到天气数据"})
-            
-            forecast = forecasts[0]
-            casts = forecast.get("casts", [])
-            print(f"🔍 天气API响应(异步) - casts数量: {len(casts)}")
-            if not casts:
-                print(f"⚠️ forecast存在但casts为空，forecast数据: {forecast}")
-            
-            result = []
-            for cast in casts:
-                weather_info = {
-                    "date": cast.get("date", ""),
-                    "week": cast.get("week", ""),
-                    "dayweather": cast.get("dayweather", ""),
-                    "nightweather": cast.get("nightweather", ""),
-                    "daytemp": cast.get("daytemp", ""),
-                    "nighttemp": cast.get("nighttemp", ""),
-                    "daywind": cast.get("daywind", ""),
-                    "nightwind": cast.get("nightwind", ""),
-                    "daypower": cast.get("daypower", ""),
-                    "nightpower": cast.get("nightpower", "")
-                }
-                result.append(weather_info)
-            
-            return json.dumps({
-                "success": True,
-                "city": forecast.get("city", city),
-                "report_time": forecast.get("report_time", ""),
-                "forecasts": result
-            }, ensure_ascii=False)
-            
+            return json.dumps(await self._aforecast(city), ensure_ascii=False)
         except Exception as e:
-            return json.dumps({"error": f"天气查询失败: {str(e)}"})
+            return json.dumps({"error": f"天气查询失败: {str(e)}"}, ensure_ascii=False)
+
+
+def _route_params(origin: str, destination: str, strategy: int, waypoints: Optional[str]) -> Dict[str, Any]:
+    """构建驾车路线规划请求参数"""
+    params = {
+        "origin": origin,
+        "destination": destination,
+        "strategy": str(strategy),
+        "output": "json",
+        "extensions": "all"
+    }
+    
+    if waypoints:
+        params["waypoints"] = waypoints
+    
+    return params
+
+
+def _parse_route(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    解析驾车路线规划响应(取第一条路线)
+
+    Raises:
+        AmapAPIError: 高德返回错误或没有路线时
+    """
+    _raise_for_amap_error(data, "路线规划失败")
+    
+    paths = data.get("route", {}).get("paths", [])
+    if not paths:
+        raise AmapAPIError("未找到路线")
+    
+    path = paths[0]
+    return {
+        "distance": path.get("distance", ""),  # 米
+        "duration": path.get("duration", ""),  # 秒
+        "strategy": path.get("strategy", ""),
+        "tolls": path.get("tolls", ""),
+        "toll_distance": path.get("toll_distance", ""),
+        "steps": [
+            {
+                "instruction": step.get("instruction", ""),
+                "road": step.get("road", ""),
+                "distance": step.get("distance", ""),
+                "duration": step.get("duration", ""),
+                "polyline": step.get("polyline", "")
+            }
+            for step in path.get("steps", [])[:10]  # 只取前10步
+        ]
+    }
+
+
+def _parse_route_geometry(data: Dict[str, Any]) -> Tuple[int, int, List[Tuple[float, float]]]:
+    """
+    解析驾车路线的完整坐标(拼接所有步骤的polyline)
+
+    Returns:
+        (总路程(米), 总耗时(秒), [(经度, 纬度)])
+
+    Raises:
+        AmapAPIError: 高德返回错误或没有路线时
+    """
+    _raise_for_amap_error(data, "路线规划失败")
+    
+    paths = data.get("route", {}).get("paths", [])
+    if not paths:
+        raise AmapAPIError("未找到路线")
+    
+    path = paths[0]
+    points = []
+    for step in path.get("steps", []):
+        polyline = step.get("polyline")
+        if not polyline or not isinstance(polyline, str):
+            continue
+        for pair in polyline.split(";"):
+            try:
+                lon, lat = pair.split(",")
+                points.append((float(lon), float(lat)))
+            except ValueError:
+                continue
+    
+    return int(float(path.get("distance") or 0)), int(float(path.get("duration") or 0)), points
 
 
 class AmapRouteTool(BaseTool):
@@ -384,6 +924,70 @@ class AmapRouteTool(BaseTool):
     返回路线信息，包括距离、时间、路线坐标等。
     """
     
+    def plan(
+        self,
+        origin: str,
+        destination: str,
+        strategy: int = 0,
+        waypoints: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        规划驾车路线
+
+        Args:
+            origin: 起点坐标或地址
+            destination: 终点坐标或地址
+            strategy: 路线策略
+            waypoints: 途经点(多个用|分隔)
+
+        Returns:
+            路线信息(distance/duration/steps等)
+
+        Raises:
+            AmapAPIError: 规划失败时
+        """
+        _require_api_key()
+        data = amap_get(DRIVING_URL, _route_params(origin, destination, strategy, waypoints))
+        return _parse_route(data)
+    
+    async def aplan(
+        self,
+        origin: str,
+        destination: str,
+        strategy: int = 0,
+        waypoints: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """异步规划驾车路线，参数与返回值同 plan"""
+        _require_api_key()
+        data = await amap_aget(DRIVING_URL, _route_params(origin, destination, strategy, waypoints))
+        return _parse_route(data)
+    
+    async def aroute_geometry(
+        self,
+        origin: str,
+        destination: str,
+        waypoints: Optional[str] = None,
+        strategy: int = 0,
+    ) -> Tuple[int, int, List[Tuple[float, float]]]:
+        """
+        异步获取驾车路线的完整坐标(不截断步骤)
+
+        Args:
+            origin: 起点坐标
+            destination: 终点坐标
+            waypoints: 途经点(多个用;分隔)
+            strategy: 路线策略
+
+        Returns:
+            (总路程(米), 总耗时(秒), [(经度, 纬度)])
+
+        Raises:
+            AmapAPIError: 规划失败时
+        """
+        _require_api_key()
+        data = await amap_aget(DRIVING_URL, _route_params(origin, destination, strategy, waypoints))
+        return _parse_route_geometry(data)
+    
     def _run(
         self,
         origin: str,
@@ -394,67 +998,12 @@ class AmapRouteTool(BaseTool):
     ) -> str:
         """执行路线规划"""
         try:
-            settings = get_settings()
-            if not settings.amap_api_key:
-                return json.dumps({"error": "高德地图API Key未配置"})
-            
-            url = "https://restapi.amap.com/v3/direction/driving"
-            params = {
-                "key": settings.amap_api_key,
-                "origin": origin,
-                "destination": destination,
-                "strategy": str(strategy),
-                "output": "json",
-                "extensions": "all"
-            }
-            
-            if waypoints:
-                params["waypoints"] = waypoints
-            
-            with httpx.Client(timeout=10.0) as client:
-                response = client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            
-            if data.get("status") != "1":
-                error_msg = data.get("info", "未知错误")
-                return json.dumps({"error": f"路线规划失败: {error_msg}"})
-            
-            route_data = data.get("route", {})
-            paths = route_data.get("paths", [])
-            
-            if not paths:
-                return json.dumps({"error": "未找到路线"})
-            
-            # 取第一条路线
-            path = paths[0]
-            result = {
-                "distance": path.get("distance", ""),  # 米
-                "duration": path.get("duration", ""),  # 秒
-                "strategy": path.get("strategy", ""),
-                "tolls": path.get("tolls", ""),
-                "toll_distance": path.get("toll_distance", ""),
-                "steps": []
-            }
-            
-            # 解析步骤
-            steps = path.get("steps", [])
-            for step in steps[:10]:  # 只取前10步
-                result["steps"].append({
-                    "instruction": step.get("instruction", ""),
-                    "road": step.get("road", ""),
-                    "distance": step.get("distance", ""),
-                    "duration": step.get("duration", ""),
-                    "polyline": step.get("polyline", "")
-                })
-            
-            return json.dumps({
-                "success": True,
-                "route": result
-            }, ensure_ascii=False)
-            
+            route = self.plan(origin, destination, strategy, waypoints)
+            return json.dumps({"success": True, "route": route}, ensure_ascii=False)
+        except AmapAPIError as e:
+            return json.dumps({"error": str(e)}, ensure_ascii=False)
         except Exception as e:
-            return json.dumps({"error": f"路线规划失败: {str(e)}"})
+            return json.dumps({"error": f"路线规划失败: {str(e)}"}, ensure_ascii=False)
     
     async def _arun(
         self,
@@ -466,71 +1015,18 @@ class AmapRouteTool(BaseTool):
     ) -> str:
         """异步执行路线规划"""
         try:
-            settings = get_settings()
-            if not settings.amap_api_key:
-                return json.dumps({"error": "高德地图API Key未配置"})
-            
-            url = "https://restapi.amap.com/v3/direction/driving"
-            params = {
-                "key": settings.amap_api_key,
-                "origin": origin,
-                "destination": destination,
-                "strategy": str(strategy),
-                "output": "json",
-                "extensions": "all"
-            }
-            
-            if waypoints:
-                params["waypoints"] = waypoints
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            
-            if data.get("status") != "1":
-                error_msg = data.get("info", "未知错误")
-                return json.dumps({"error": f"路线规划失败: {error_msg}"})
-            
-            route_data = data.get("route", {})
-            paths = route_data.get("paths", [])
-            
-            if not paths:
-                return json.dumps({"error": "未找到路线"})
-            
-            path = paths[0]
-            result = {
-                "distance": path.get("distance", ""),
-                "duration": path.get("duration", ""),
-                "strategy": path.get("strategy", ""),
-                "tolls": path.get("tolls", ""),
-                "toll_distance": path.get("toll_distance", ""),
-                "steps": []
-            }
-            
-            steps = path.get("steps", [])
-            for step in steps[:10]:
-                result["steps"].append({
-                    "instruction": step.get("instruction", ""),
-                    "road": step.get("road", ""),
-                    "distance": step.get("distance", ""),
-                    "duration": step.get("duration", ""),
-                    "polyline": step.get("polyline", "")
-                })
-            
-            return json.dumps({
-                "success": True,
-                "route": result
-            }, ensure_ascii=False)
-            
+            route = await self.aplan(origin, destination, strategy, waypoints)
+            return json.dumps({"success": True, "route": route}, ensure_ascii=False)
+        except AmapAPIError as e:
+            return json.dumps({"error": str(e)}, ensure_ascii=False)
         except Exception as e:
-            return json.dumps({"error": f"路线规划失败: {str(e)}"})
+            return json.dumps({"error": f"路线规划失败: {str(e)}"}, ensure_ascii=False)
 
 
 def get_amap_tools() -> List[BaseTool]:
     """获取所有高德地图工具"""
     settings = get_settings()
-    if not settings.amap_api_key:
+    if not settings.get_amap_api_keys():
         raise ValueError("高德地图API Key未配置,请在.env文件中设置AMAP_API_KEY")
     
     return [
@@ -0,0 +1,66 @@
+"""行程优化器基准测试
+
+用法(在 backend 目录下运行):
+    python benchmarks/bench_optimizer.py
+    python benchmarks/bench_optimizer.py --pois 500 --days 30 --hotels 40 --repeat 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.itinerary_optimizer import optimize_itinerary  # noqa: E402
+
+# 城市中心(北京)和分布范围(度)
+CENTER_LON, CENTER_LAT = 116.397428, 39.90923
+SPREAD = 0.15
+
+
+def make_points(n: int, rng: np.random.Generator):
+    """生成若干个热点区域附近的随机坐标"""
+    hubs = rng.normal(0, SPREAD, size=(8, 2))
+    which = rng.integers(0, len(hubs), size=n)
+    offsets = hubs[which] + rng.normal(0, SPREAD / 5, size=(n, 2))
+    return CENTER_LON + offsets[:, 0], CENTER_LAT + offsets[:, 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行程优化器基准测试")
+    parser.add_argument("--pois", type=int, default=500, help="候选景点数量")
+    parser.add_argument("--days", type=int, default=30, help="旅行天数")
+    parser.add_argument("--hotels", type=int, default=40, help="候选酒店数量")
+    parser.add_argument("--per-day", type=int, default=None, help="每天最多景点数(默认不限)")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    lons, lats = make_points(args.pois, rng)
+    hotel_lons, hotel_lats = make_points(args.hotels, rng)
+
+    # 预热
+    optimize_itinerary(lons, lats, args.days, hotel_lons, hotel_lats, args.per_day)
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        days = optimize_itinerary(lons, lats, args.days, hotel_lons, hotel_lats, args.per_day)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    sizes = [len(day.attractions) for day in days]
+    total_km = sum(day.route_distance for day in days) / 1000
+    timings.sort()
+    print(f"POI: {args.pois}  天数: {args.days}  酒店: {args.hotels}  每天景点: {min(sizes)}-{max(sizes)}")
+    print(f"总路程(直线): {total_km:.1f} km")
+    print(f"耗时(ms): 中位数 {statistics.median(timings):.1f}  "
+          f"p95 {timings[int(len(timings) * 0.95) - 1]:.1f}  最大 {timings[-1]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""高德批量请求合并测试"""
+
+import asyncio
+
+from app.services.amap_batch import AmapBatcher
+
+
+class FakeAmap:
+    """记录调用的批量/单个发送函数"""
+
+    def __init__(self, batch_results=None, batch_error=None):
+        self.batch_results = batch_results
+        self.batch_error = batch_error
+        self.batch_calls = []
+        self.single_calls = []
+
+    async def send_batch(self, requests):
+        self.batch_calls.append(requests)
+        if self.batch_error is not None:
+            raise self.batch_error
+        return self.batch_results(requests)
+
+    async def send_single(self, url, params):
+        self.single_calls.append(params["q"])
+        return {"status": "1", "q": params["q"], "via": "single"}
+
+
+def _submit_all(batcher, count, start=0):
+    async def run():
+        return await asyncio.gather(*(
+            batcher.submit("https://restapi.amap.com/v3/place/text", {"q": i}) for i in range(start, start + count)
+        ))
+    return asyncio.run(run())
+
+
+def test_batch_results_dispatched_and_failed_items_resent():
+    # 第2个子请求失败(None)，单独重发
+    amap = FakeAmap(batch_results=lambda requests: [
+        None if params["q"] == 1 else {"status": "1", "q": params["q"], "via": "batch"}
+        for _, params in requests
+    ])
+    batcher = AmapBatcher(amap.send_batch, amap.send_single, window=0.01, max_size=3)
+
+    results = _submit_all(batcher, 3)
+
+    assert len(amap.batch_calls) == 1 and len(amap.batch_calls[0]) == 3
+    assert [r["q"] for r in results] == [0, 1, 2]
+    assert [r["via"] for r in results] == ["batch", "single", "batch"]
+    assert amap.single_calls == [1]
+
+
+def test_failed_batch_sent_once_then_falls_back_to_single_requests():
+    amap = FakeAmap(batch_error=ConnectionError("batch down"))
+    batcher = AmapBatcher(amap.send_batch, amap.send_single, window=0.01, max_size=3, cooldown=60)
+
+    results = _submit_all(batcher, 3)
+
+    # 批量只发送一次，每个子请求各重发一次
+    assert len(amap.batch_calls) == 1
+    assert sorted(amap.single_calls) == [0, 1, 2]
+    assert [r["via"] for r in results] == ["single"] * 3
+
+    # 冷却期内不再尝试批量
+    _submit_all(batcher, 3, start=3)
+    assert len(amap.batch_calls) == 1
+    assert batcher.stats()["batching_paused"]
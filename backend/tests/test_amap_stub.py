@@ -0,0 +1,63 @@
+"""高德模拟器测试(AMAP_BACKEND=stub，无需网络和API Key)"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.config import get_settings
+from app.services import amap_stub, http_client, rate_limiter
+from app.services.amap_stub import AmapStub
+
+
+@pytest.fixture
+def stub_backend(monkeypatch):
+    """切换到模拟后端并重置相关单例"""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "amap_backend", "stub")
+    monkeypatch.setattr(settings, "amap_api_key", "")
+    monkeypatch.setattr(settings, "amap_stub_latency_ms", 0.0)
+    monkeypatch.setattr(settings, "amap_stub_error_rate", 0.0)
+    monkeypatch.setattr(settings, "amap_stub_quota_error_rate", 0.0)
+    monkeypatch.setattr(settings, "amap_stub_qps", 0.0)
+    for module, name in (
+        (amap_stub, "_amap_stub"),
+        (rate_limiter, "_key_pool"),
+        (http_client, "_async_client"),
+        (http_client, "_sync_client"),
+    ):
+        monkeypatch.setattr(module, name, None)
+    return settings
+
+
+def test_poi_detail_round_trip_after_many_queries():
+    stub = AmapStub(latency_ms=0)
+    # 搜索条件编号超过4位
+    for i in range(10001):
+        stub._query_id(f"关键词{i}", None, 0.05)
+
+    _, page = stub.handle("GET", "/v3/place/text?key=k&city=北京&keywords=博物馆&offset=5")
+    poi = page["pois"][3]
+    _, detail = stub.handle("GET", f"/v3/place/detail?key=k&id={poi['id']}")
+
+    assert detail["pois"][0] == poi
+    _, missing = stub.handle("GET", "/v3/place/detail?key=k&id=B000A7BD6C")
+    assert missing["pois"] == []
+
+
+def test_tools_round_trip_without_api_key(stub_backend):
+    from app.tools.amap_tools import AmapPOISearchTool, AmapWeatherTool, ageocode_address
+
+    assert stub_backend.get_amap_api_keys()
+
+    async def run():
+        page = await AmapPOISearchTool().asearch("景点", "北京")
+        geocode = await ageocode_address("北京")
+        forecast = json.loads(await AmapWeatherTool()._arun("北京"))
+        return page, geocode, forecast
+
+    page, geocode, forecast = asyncio.run(run())
+
+    assert page.pois and all(poi.id and poi.lon and poi.lat for poi in page.pois)
+    assert geocode["adcode"] == "110000"
+    assert forecast.get("success") and forecast["forecasts"] and forecast["report_time"]
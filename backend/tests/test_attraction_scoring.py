@@ -0,0 +1,46 @@
+"""景点打分测试"""
+
+import asyncio
+import threading
+
+import numpy as np
+
+from app.services import attraction_scoring
+from app.services.attraction_scoring import popularity_counts, score_attractions, select_spread
+
+
+def test_top_k_prefers_matching_rated_popular_attractions():
+    names = ["国家博物馆", "无名小公园", "人气公园", "美术馆"]
+    types = ["科教文化服务;博物馆", "风景名胜;公园", "风景名胜;公园", "科教文化服务;美术馆"]
+    ratings = np.array([4.8, 3.0, np.nan, 4.6])
+    popularity = popularity_counts(["B1", "B2", "B3", ""], names, {"B3": 50, "美术馆": 2})
+
+    scores = score_attractions(types, names, ratings, popularity, ["历史文化"])
+
+    # 偏好匹配最重要，其次评分/热度
+    assert int(np.argmax(scores)) == 0
+    assert scores[2] > scores[1]
+
+    # 与已选景点挨在一起的被挤到后面
+    lons = np.array([116.40, 116.4001, 116.50, 116.30])
+    lats = np.array([39.90, 39.9001, 39.95, 39.85])
+    chosen = select_spread(lons, lats, np.array([2.0, 1.6, 1.5, 1.2]), k=3)
+    assert chosen.tolist() == [0, 2, 3]
+
+
+def test_popularity_loaded_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def fake_load(city):
+        threads.append(threading.get_ident())
+        return {city: 1}
+
+    monkeypatch.setattr(attraction_scoring, "load_popularity", fake_load)
+
+    async def run():
+        return threading.get_ident(), await attraction_scoring.aload_popularity("北京")
+
+    loop_thread, counts = asyncio.run(run())
+
+    assert counts == {"北京": 1}
+    assert threads and threads[0] != loop_thread
@@ -0,0 +1,44 @@
+"""TTL + LRU 缓存测试"""
+
+import time
+
+from app.services.cache import TTLCache
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache("test-ttl", max_entries=10, default_ttl=60)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("long", 2)
+
+    time.sleep(0.02)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_evicted_first():
+    cache = TTLCache("test-lru", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # a 变为最近使用
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_and_skips_oversized_values():
+    cache = TTLCache("test-bytes", max_entries=100, max_bytes=10)
+    cache.set("a", "x", size=4)
+    cache.set("b", "y", size=4)
+    cache.set("c", "z", size=4)
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+
+    # 单个条目超过总容量时不缓存，也不挤掉已有条目
+    cache.set("huge", "w", size=11)
+    assert cache.get("huge") is None
+    assert len(cache) == 2
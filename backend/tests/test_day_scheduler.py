@@ -0,0 +1,107 @@
+"""日程时间安排测试"""
+
+import numpy as np
+
+from app.models.poi_record import POIRecord, resolve_poi_ids
+from app.models.schemas import Attraction, DayPlan, Hotel, Location, Meal, TripPlan
+from app.services.day_scheduler import ScheduleConfig, matrix_estimator, parse_clock, schedule_day
+from app.services.distance_matrix import DistanceMatrix
+
+CONFIG = ScheduleConfig(
+    day_start=parse_clock("09:00"),
+    day_end=parse_clock("21:00"),
+    lunch_time=parse_clock("12:00"),
+    dinner_time=parse_clock("18:00"),
+    meal_duration=60,
+)
+
+
+def _travel(origin, destination) -> float:
+    # 去餐厅30分钟，其余路程忽略
+    return 30.0 if isinstance(destination, Meal) else 0.0
+
+
+def _attraction(name: str, minutes: int) -> Attraction:
+    return Attraction(
+        name=name,
+        address="",
+        location=Location(longitude=116.4, latitude=39.9),
+        visit_duration=minutes,
+        description="",
+    )
+
+
+def _day(attractions) -> DayPlan:
+    meals = [
+        Meal(type=t, name=t, location=Location(longitude=116.4, latitude=39.9))
+        for t in ("breakfast", "lunch", "dinner")
+    ]
+    return DayPlan(
+        date="2026-10-16",
+        day_index=0,
+        description="",
+        transportation="公共交通",
+        accommodation="",
+        attractions=attractions,
+        meals=meals,
+    )
+
+
+def test_overflowing_attraction_does_not_consume_meal():
+    day = _day([_attraction("A", 120), _attraction("B", 600), _attraction("C", 60)])
+
+    overflow, lost = schedule_day(day, CONFIG, _travel)
+
+    assert [a.name for a in overflow] == ["B"] and lost == []
+    breakfast, lunch, dinner = day.meals
+    assert (breakfast.start_time, breakfast.end_time) == ("09:00", "09:30")
+    # B 放不下时为它试排的午餐撤销，C 紧接 A
+    assert [(a.name, a.start_time, a.end_time) for a in day.attractions] == [
+        ("A", "09:30", "11:30"), ("C", "11:30", "12:30")
+    ]
+    # 去餐厅的路程计入时间
+    assert (lunch.start_time, lunch.end_time) == ("13:00", "14:00")
+    assert (dinner.start_time, dinner.end_time) == ("17:30", "18:30")
+    assert day.end_time == "18:30"
+
+
+def test_all_stops_stay_within_day_window():
+    day = _day([_attraction(f"景点{i}", 90) for i in range(10)])
+
+    overflow, _ = schedule_day(day, CONFIG, _travel)
+
+    assert overflow
+    stops = list(day.attractions) + list(day.meals)
+    for stop in stops:
+        assert CONFIG.day_start <= parse_clock(stop.start_time) <= parse_clock(stop.end_time) <= CONFIG.day_end
+    # 时间段互不重叠
+    spans = sorted((parse_clock(s.start_time), parse_clock(s.end_time)) for s in stops)
+    assert all(a_end <= b_start for (_, a_end), (b_start, _) in zip(spans, spans[1:]))
+
+
+def test_matrix_used_for_llm_stops_without_poi_id():
+    pois = [
+        POIRecord(id="B001", name="故宫博物院", type="风景名胜", address="", lon=116.397, lat=39.918),
+        POIRecord(id="B002", name="景山公园", type="风景名胜", address="", lon=116.396, lat=39.925),
+        POIRecord(id="B003", name="北京饭店(王府井店)", type="住宿服务", address="", lon=116.410, lat=39.909),
+    ]
+    # 实测耗时(秒)与直线估算明显不同
+    durations = np.array([[0, 1800, 2400], [1800, 0, 3000], [2400, 3000, 0]], dtype=np.float64)
+    matrix = DistanceMatrix([p.id for p in pois], durations * 5, durations, np.zeros((3, 3), dtype=bool))
+
+    # LLM输出的景点没有 poi_id，名称也不完全一致
+    day = _day([_attraction("故宫", 60), _attraction("景山公园", 60)])
+    day.hotel = Hotel(name="北京饭店", location=Location(longitude=116.410, latitude=39.909))
+    plan = TripPlan(
+        city="北京", start_date="2026-10-16", end_date="2026-10-16", days=[day],
+        weather_info=[], overall_suggestions="",
+    )
+    assert resolve_poi_ids(plan, pois) == 2
+    assert [a.poi_id for a in day.attractions] == ["B001", "B002"]
+
+    travel = matrix_estimator(matrix, lambda origin, destination: 0.0, pois)
+    # 酒店没有 poi_id 字段，按名称匹配
+    assert travel(day.hotel, day.attractions[0]) == 40.0
+    assert travel(day.attractions[0], day.attractions[1]) == 30.0
+    # 匹配不到的地点回退到估算
+    assert travel(day.attractions[1], day.meals[1]) == 0.0
@@ -0,0 +1,38 @@
+"""地理编码缓存测试"""
+
+import time
+
+from app.services.geocode_cache import GeocodeCache
+
+
+def test_negative_cache_hits_until_expiry():
+    cache = GeocodeCache(negative_ttl=0.05)
+    cache.put_negative(" 不存在的 地址 ")
+
+    # 键按去除空白后的地址计
+    assert cache.lookup("不存在的地址") == (True, None)
+    time.sleep(0.06)
+    assert cache.lookup("不存在的地址") == (False, None)
+    assert cache.stats()["negative_entries"] == 0
+
+
+def test_negative_cache_is_bounded():
+    cache = GeocodeCache(negative_ttl=60, negative_max_entries=3)
+    for i in range(10):
+        cache.put_negative(f"错误地址{i}")
+
+    assert cache.stats()["negative_entries"] == 3
+    # 超出容量时淘汰最早写入的条目
+    assert cache.lookup("错误地址9") == (True, None)
+    assert cache.lookup("错误地址0") == (False, None)
+
+
+def test_expired_negative_entries_dropped_on_insert():
+    cache = GeocodeCache(negative_ttl=0.05, negative_max_entries=100)
+    for i in range(5):
+        cache.put_negative(f"错误地址{i}")
+    time.sleep(0.06)
+
+    cache.put_negative("新地址")
+
+    assert cache.stats()["negative_entries"] == 1
@@ -0,0 +1,36 @@
+"""酒店排序测试"""
+
+from app.models.schemas import Budget, DayPlan, Hotel, TripPlan
+from app.services.hotel_ranking import update_hotel_budget
+
+
+def _day(index: int, hotel_cost: int) -> DayPlan:
+    return DayPlan(
+        date=f"2026-10-{16 + index}",
+        day_index=index,
+        description="",
+        transportation="公共交通",
+        accommodation="经济型酒店",
+        hotel=Hotel(name=f"酒店{index}", estimated_cost=hotel_cost),
+    )
+
+
+def test_budget_total_equals_sum_of_components_after_hotel_update():
+    # LLM 给出的总计与各项之和不一致
+    plan = TripPlan(
+        city="北京",
+        start_date="2026-10-16",
+        end_date="2026-10-18",
+        days=[_day(0, 1120), _day(1, 1120), _day(2, 1120)],
+        weather_info=[],
+        overall_suggestions="",
+        budget=Budget(total_attractions=1, total_hotels=900, total_meals=1, total_transportation=1, total=2464),
+    )
+
+    update_hotel_budget(plan)
+
+    budget = plan.budget
+    assert budget.total_hotels == 3360
+    assert budget.total == (
+        budget.total_attractions + budget.total_hotels + budget.total_meals + budget.total_transportation
+    )
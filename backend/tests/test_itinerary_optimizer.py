@@ -0,0 +1,34 @@
+"""行程优化器测试"""
+
+import numpy as np
+from app.services.itinerary_optimizer import balanced_kmeans, optimize_itinerary, project
+
+
+def _city_points(n: int, seed: int):
+    """模拟城市内的景点分布: 几个热点区域 + 零散景点"""
+    rng = np.random.default_rng(seed)
+    hubs = rng.uniform([116.2, 39.8], [116.6, 40.05], size=(5, 2))
+    clustered = hubs[rng.integers(0, 5, size=n - n // 4)] + rng.normal(0, 0.01, size=(n - n // 4, 2))
+    scattered = rng.uniform([116.0, 39.6], [116.8, 40.3], size=(n // 4, 2))
+    points = np.vstack((clustered, scattered))
+    return points[:, 0], points[:, 1]
+
+
+def test_balanced_kmeans_enforces_minimum_cluster_size():
+    for seed in range(5):
+        lons, lats = _city_points(95, seed)
+        labels = balanced_kmeans(project(lons, lats, 39.9), 30)
+        counts = np.bincount(labels, minlength=30)
+        assert counts.min() >= 95 // 30
+        assert counts.max() <= -(-95 // 30)
+
+
+def test_every_day_gets_full_share_on_large_input():
+    lons, lats = _city_points(95, seed=7)
+    hotel_lons, hotel_lats = _city_points(12, seed=8)
+    days = optimize_itinerary(lons, lats, 30, hotel_lons, hotel_lats, per_day=3)
+
+    assert len(days) == 30
+    assert all(len(day.attractions) >= 95 // 30 for day in days)
+    visited = [i for day in days for i in day.attractions]
+    assert len(visited) == len(set(visited))
@@ -0,0 +1,31 @@
+"""增量JSON解析测试"""
+
+import json
+
+from app.services.json_stream import JSONArrayStreamParser
+
+RESPONSE = "下面是行程：\n```json\n" + json.dumps({
+    "city": "北京",
+    "note": "含 {括号} 和 \"days\" 的字符串",
+    "days": [
+        {"day_index": 0, "description": "故宫 → 景山 {北门}", "meals": [{"type": "lunch"}]},
+        {"day_index": 1, "description": "带转义的 \\\" 引号"},
+        {"day_index": 2, "description": "颐和园"},
+    ],
+    "budget": {"total": 100},
+}, ensure_ascii=False) + "\n```"
+
+
+def test_elements_split_across_chunks():
+    expected = [(i, day) for i, day in enumerate(json.loads(RESPONSE.split("```json\n")[1][:-4])["days"])]
+
+    whole = JSONArrayStreamParser("days")
+    assert whole.feed(RESPONSE) == expected
+
+    # 逐字符喂入，元素和字段名都跨片段
+    parser = JSONArrayStreamParser("days")
+    streamed = []
+    for char in RESPONSE:
+        streamed.extend(parser.feed(char))
+    assert streamed == expected
+    assert parser.text == RESPONSE
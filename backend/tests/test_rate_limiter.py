@@ -0,0 +1,20 @@
+"""限流器测试"""
+
+import asyncio
+import time
+from app.services.rate_limiter import AmapKeyPool
+
+
+def test_tokens_within_bounds_limiter_wait():
+    pool = AmapKeyPool(["key"], qps=3.0, burst=3)
+    budget = int(pool.tokens_within(1.0))
+    assert budget == 6
+
+    async def acquire_budget():
+        started = time.monotonic()
+        await asyncio.gather(*[pool.acquire() for _ in range(budget)])
+        return time.monotonic() - started
+
+    # 按预算发出的请求，限流等待不超过预算时间
+    assert asyncio.run(acquire_budget()) <= 1.0 + 0.1
+    assert pool.tokens_within(0.0) < 1
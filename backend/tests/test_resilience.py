@@ -0,0 +1,55 @@
+"""熔断器测试"""
+
+import asyncio
+import pytest
+from app.services import resilience
+from app.services.resilience import CircuitBreaker, CircuitOpenError, call_with_resilience
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """已打开且可立即进入半开的熔断器"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    monkeypatch.setitem(resilience._breakers, "test", breaker)
+    return breaker
+
+
+def test_cancelled_probe_releases_half_open_breaker(breaker):
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(3600)
+
+        task = asyncio.create_task(call_with_resilience("test", hang, max_retries=0))
+        await started.wait()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        async def ok():
+            return "ok"
+
+        return await call_with_resilience("test", ok, max_retries=0)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_retryable_error_does_not_close_breaker(breaker):
+    async def bad_request():
+        raise ValueError("invalid response")
+
+    with pytest.raises(ValueError):
+        asyncio.run(call_with_resilience("test", bad_request, max_retries=0))
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.consecutive_failures == 1
+    # 探测名额已释放，下一个请求仍可作为探测放行
+    assert breaker.allow() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
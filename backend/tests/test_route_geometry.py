@@ -0,0 +1,30 @@
+"""路线几何测试"""
+
+import numpy as np
+
+from app.services.route_geometry import encode_polyline, simplify_polyline
+
+
+def test_encode_polyline_matches_reference():
+    # Encoded Polyline 算法说明中的示例点(经度, 纬度)
+    points = np.array([[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]])
+
+    assert encode_polyline(points) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert encode_polyline(np.empty((0, 2))) == ""
+
+
+def test_simplify_drops_points_within_tolerance():
+    # L 形路线，两段上各有一个偏离约 2-3 米的点
+    points = np.array([
+        [116.40, 39.90],
+        [116.40003, 39.905],
+        [116.40, 39.91],
+        [116.405, 39.91002],
+        [116.41, 39.91],
+    ])
+
+    simplified = simplify_polyline(points, tolerance=20)
+
+    assert simplified.tolist() == [points[0].tolist(), points[2].tolist(), points[4].tolist()]
+    # 容差为0时不简化
+    assert len(simplify_polyline(points, tolerance=0)) == len(points)
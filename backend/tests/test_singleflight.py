@@ -0,0 +1,70 @@
+"""single-flight 请求合并测试"""
+
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight("test-coalesce")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"status": "1"}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert results == [{"status": "1"}] * 5
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_exception_propagates_to_all_waiters_and_key_is_released():
+    flight = SingleFlight("test-error")
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ConnectionError("upstream down")
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+        # 失败后键已移除，下一次调用重新发起
+        return results, await flight.do("key", ok)
+
+    results, retried = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert retried == "ok"
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    flight = SingleFlight("test-cancel")
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(flight.do("key", fetch))
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
@@ -0,0 +1,38 @@
+"""POI空间索引测试"""
+
+import random
+
+from app.models.poi_record import POIRecord
+from app.services.spatial_index import SpatialIndex, haversine
+
+
+def _index(count: int):
+    rng = random.Random(7)
+    pois = [
+        POIRecord(
+            id=f"B{i}",
+            name=f"POI{i}",
+            type="住宿服务;宾馆酒店" if i % 3 == 0 else "风景名胜;公园",
+            address="",
+            lon=116.3 + rng.random() * 0.2,
+            lat=39.85 + rng.random() * 0.15,
+        )
+        for i in range(count)
+    ]
+    index = SpatialIndex()
+    index.add_many(pois)
+    return index, pois
+
+
+def test_queries_match_brute_force():
+    index, pois = _index(2000)
+    lon, lat = 116.40, 39.92
+    hotels = sorted(
+        (haversine(lon, lat, p.lon, p.lat), p.id) for p in pois if "住宿服务" in p.type
+    )
+
+    nearest = index.nearest(lon, lat, 5, "住宿服务", max_distance=3000)
+    assert [poi.id for _, poi in nearest] == [poi_id for d, poi_id in hotels[:5] if d <= 3000]
+
+    within = index.within(lon, lat, 1500, "住宿服务")
+    assert [poi.id for _, poi in within] == [poi_id for d, poi_id in hotels if d <= 1500]
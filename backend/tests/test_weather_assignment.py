@@ -0,0 +1,85 @@
+"""天气分配测试"""
+
+from app.models.schemas import Attraction, DayPlan, Location, TripPlan, WeatherInfo
+from app.services.weather_assignment import (
+    UNKNOWN_INDOOR_SCORE,
+    _attraction_indoor_score,
+    apply_weather_assignment,
+    indoor_score,
+    linear_sum_assignment,
+)
+import numpy as np
+
+
+def _attraction(name: str, category: str, lon: float, poi_id: str = "") -> Attraction:
+    return Attraction(
+        name=name,
+        address="",
+        location=Location(longitude=lon, latitude=39.9),
+        visit_duration=60,
+        description="",
+        category=category,
+        poi_id=poi_id,
+    )
+
+
+def _day(index: int, attractions) -> DayPlan:
+    return DayPlan(
+        date=f"2026-10-{16 + index}",
+        day_index=index,
+        description="",
+        transportation="公共交通",
+        accommodation="",
+        attractions=attractions,
+    )
+
+
+def _weather(date: str, text: str) -> WeatherInfo:
+    return WeatherInfo(date=date, day_weather=text, night_weather=text, day_temp=20, night_temp=12)
+
+
+def test_linear_sum_assignment_is_optimal():
+    cost = np.array([[4.0, 1.0, 3.0], [2.0, 0.0, 5.0], [3.0, 2.0, 2.0]])
+    rows, cols = linear_sum_assignment(cost)
+    assert cost[rows, cols].sum() == 5.0
+
+
+def test_moved_stop_is_routed_in_order():
+    # 雨天全是户外景点，晴天的博物馆位于雨天景点之间
+    plan = TripPlan(
+        city="北京",
+        start_date="2026-10-16",
+        end_date="2026-10-17",
+        days=[
+            _day(0, [_attraction("西公园", "公园", 116.30), _attraction("中公园", "公园", 116.31),
+                     _attraction("东公园", "公园", 116.33)]),
+            _day(1, [_attraction("博物馆", "博物馆", 116.32), _attraction("北山", "风景名胜", 116.40),
+                     _attraction("南湖", "公园", 116.41)]),
+        ],
+        weather_info=[_weather("2026-10-16", "中雨"), _weather("2026-10-17", "晴")],
+        overall_suggestions="",
+    )
+
+    assert apply_weather_assignment(plan, {}) > 0
+
+    rainy = plan.days[0].attractions
+    assert "博物馆" in [a.name for a in rainy]
+    # 换入的景点按路线顺序插入，而不是追加在末尾
+    for day in plan.days:
+        lons = [a.location.longitude for a in day.attractions]
+        assert lons == sorted(lons) or lons == sorted(lons, reverse=True)
+
+
+def test_place_names_do_not_make_indoor_venues_outdoor():
+    for name in ("中山纪念堂", "湖南省博物馆", "青岛啤酒博物馆"):
+        assert indoor_score(name) == 1.0, name
+    assert indoor_score("风景名胜;公园;公园") == 0.0
+
+
+def test_amap_type_found_by_poi_id():
+    # 名称和类别都无法判断，只有按 poi_id 查到的高德类型说明它在室内
+    attraction = _attraction("嘉德中心", "", 116.305, poi_id="B001")
+    poi_types = {"B001": "科教文化服务;美术馆;美术馆"}
+
+    assert _attraction_indoor_score(attraction, poi_types) == 1.0
+    assert _attraction_indoor_score(attraction, {}) == UNKNOWN_INDOOR_SCORE
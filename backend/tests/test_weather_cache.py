@@ -0,0 +1,70 @@
+"""天气预报缓存测试"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.services.weather_cache import ForecastCache
+
+
+def _forecast(version: int, reported: datetime) -> dict:
+    cst = reported.astimezone(timezone(timedelta(hours=8)))
+    return {"success": True, "version": version, "report_time": cst.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def test_freshness_aligned_to_report_time():
+    cache = ForecastCache(refresh_interval=3600, min_ttl=60, stale_ttl=600)
+    now = datetime.now(timezone.utc)
+
+    # 半小时前发布的预报还剩约半小时新鲜期
+    cache.put("110000", _forecast(1, now - timedelta(minutes=30)))
+    remaining = cache.get("110000").fresh_until - time.time()
+    assert 1700 < remaining < 1900
+
+    # 早已过期的发布时间至少保留 min_ttl
+    cache.put("310000", _forecast(1, now - timedelta(hours=5)))
+    assert 50 < cache.get("310000").fresh_until - time.time() <= 60
+
+
+def test_stale_entry_served_while_single_refresh_runs():
+    cache = ForecastCache(refresh_interval=3600, min_ttl=60, stale_ttl=600)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return _forecast(len(calls) + 1, datetime.now(timezone.utc))
+
+    async def run():
+        cache.put("110000", _forecast(1, datetime.now(timezone.utc)))
+        cache.get("110000").fresh_until = time.time() - 1  # 进入陈旧期
+
+        stale = await asyncio.gather(*(cache.aget_or_fetch("110000", fetch) for _ in range(3)))
+        await asyncio.sleep(0.05)  # 等待后台刷新完成
+        fresh = await cache.aget_or_fetch("110000", fetch)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(run())
+
+    assert [r["version"] for r in stale] == [1, 1, 1]
+    assert len(calls) == 1
+    assert fresh["version"] == 2
+    assert cache.stats()["stale_hits"] == 3
+
+
+def test_failed_refresh_keeps_stale_entry():
+    cache = ForecastCache(refresh_interval=3600, min_ttl=60, stale_ttl=600)
+
+    async def failing():
+        raise ConnectionError("upstream down")
+
+    async def run():
+        cache.put("110000", _forecast(1, datetime.now(timezone.utc)))
+        cache.get("110000").fresh_until = time.time() - 1
+        first = await cache.aget_or_fetch("110000", failing)
+        await asyncio.sleep(0.01)
+        return first, await cache.aget_or_fetch("110000", failing)
+
+    first, second = asyncio.run(run())
+
+    assert first["version"] == 1 and second["version"] == 1
@@ -0,0 +1,51 @@
+"""天气预报解析与缓存测试"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from app.services.weather_cache import ForecastCache
+from app.tools.amap_tools import _format_forecast
+
+CST = timezone(timedelta(hours=8))
+
+
+def _amap_payload(report_time: str) -> dict:
+    """与高德 /v3/weather/weatherInfo?extensions=all 结构相同的响应"""
+    return {
+        "status": "1",
+        "count": "1",
+        "info": "OK",
+        "infocode": "10000",
+        "forecasts": [{
+            "city": "北京市",
+            "adcode": "110000",
+            "province": "北京",
+            "reporttime": report_time,
+            "casts": [{
+                "date": "2026-10-16",
+                "week": "5",
+                "dayweather": "晴",
+                "nightweather": "多云",
+                "daytemp": "20",
+                "nighttemp": "9",
+                "daywind": "北",
+                "nightwind": "北",
+                "daypower": "1-3",
+                "nightpower": "1-3",
+            }],
+        }],
+    }
+
+
+def test_report_time_read_from_amap_reporttime():
+    reported = datetime.now(CST).replace(microsecond=0) - timedelta(hours=1)
+    report_time = reported.strftime("%Y-%m-%d %H:%M:%S")
+
+    formatted = _format_forecast(_amap_payload(report_time), "北京")
+    assert formatted["report_time"] == report_time
+
+    cache = ForecastCache(refresh_interval=3 * 3600, min_ttl=600, stale_ttl=3600)
+    cache.put("110000", formatted)
+    entry = cache.get("110000")
+    # 新鲜期从发布时间起算，而不是从写入时间起算
+    assert abs(entry.fresh_until - (reported.timestamp() + 3 * 3600)) < 5
+    assert entry.fresh_until < time.time() + 3 * 3600 - 600
@@ -1,6 +1,6 @@
 import { defineStore } from 'pinia'
 import { ref, computed } from 'vue'
-import type { TripFormData, TripPlan, TripPlanResponse } from '@/types'
+import type { DayPlan, TripFormData, TripPlan, TripPlanResponse } from '@/types'
 
 export interface AgentProgress {
   agent: 'attractions' | 'weather' | 'hotels' | 'planning'
@@ -10,12 +10,14 @@ export interface AgentProgress {
 }
 
 export interface StreamingData {
-  type: 'start' | 'progress' | 'data' | 'complete' | 'error'
+  type: 'start' | 'progress' | 'data' | 'day' | 'complete' | 'error'
   agent?: 'attractions' | 'weather' | 'hotels' | 'planning'
   status?: 'pending' | 'running' | 'completed' | 'failed'
   progress?: number
   message?: string
   data?: any
+  day_index?: number  // day 事件: 第几天(从0开始)
+  day?: DayPlan  // day 事件: 已生成的单日行程
   plan?: TripPlan
   requires_login?: boolean  // 是否需要登录以保存计划
 }
@@ -61,10 +63,12 @@ export const useTripStore = defineStore('trip', () => {
     attractions: any[]
     weather: any[]
     hotels: any[]
+    days: DayPlan[]  // 规划过程中逐天到达的行程
   }>({
     attractions: [],
     weather: [],
-    hotels: []
+    hotels: [],
+    days: []
   })
   
   // 计算属性
@@ -102,7 +106,8 @@ export const useTripStore = defineStore('trip', () => {
     streamingData.value = {
       attractions: [],
       weather: [],
-      hotels: []
+      hotels: [],
+      days: []
     }
   }
   
@@ -122,6 +127,18 @@ export const useTripStore = defineStore('trip', () => {
       if (streamingData.value[agentKey]) {
         streamingData.value[agentKey] = update.data || []
       }
+    } else if (update.type === 'day' && update.day && update.day_index !== undefined) {
+      const days = [...streamingData.value.days]
+      days[update.day_index] = update.day
+      streamingData.value.days = days
+      if (progress.value.planning && update.progress !== undefined) {
+        progress.value.planning = {
+          agent: 'planning',
+          status: 'running',
+          progress: update.progress,
+          message: update.message || '正在生成行程计划...'
+        }
+      }
     } else if (update.type === 'complete' && update.plan) {
       console.log('🔍 [tripStore] 收到complete事件，plan数据:')
       console.log('  - plan对象:', update.plan)
@@ -185,7 +202,8 @@ export const useTripStore = defineStore('trip', () => {
     streamingData.value = {
       attractions: [],
       weather: [],
-      hotels: []
+      hotels: [],
+      days: []
     }
   }
   
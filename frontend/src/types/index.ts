@@ -15,6 +15,8 @@ export interface Attraction {
   rating?: number
   image_url?: string
   ticket_price?: number
+  start_time?: string
+  end_time?: string
 }
 
 export interface Meal {
@@ -24,6 +26,8 @@ export interface Meal {
   location?: Location
   description?: string
   estimated_cost?: number
+  start_time?: string
+  end_time?: string
 }
 
 export interface Hotel {
@@ -45,6 +49,12 @@ export interface Budget {
   total: number
 }
 
+export interface DayRoute {
+  distance: number
+  duration: number
+  polyline: string
+}
+
 export interface DayPlan {
   date: string
   day_index: number
@@ -54,6 +64,10 @@ export interface DayPlan {
   hotel?: Hotel
   attractions: Attraction[]
   meals: Meal[]
+  route?: DayRoute
+  start_time?: string
+  end_time?: string
+  dropped_attractions?: Attraction[]
 }
 
 export interface WeatherInfo {